@@ -0,0 +1,31 @@
+"""Add import fingerprints for differential import
+
+Revision ID: 004_add_import_fingerprints
+Revises: 003_add_import_jobs
+Create Date: 2025-11-24 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_add_import_fingerprints'
+down_revision = '003_add_import_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('events', sa.Column('import_fingerprint', sa.String(length=32), nullable=True))
+    op.add_column('import_jobs', sa.Column('differential', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('import_jobs', sa.Column('events_updated', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('import_jobs', sa.Column('events_cancelled', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('import_jobs', sa.Column('events_unchanged', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('import_jobs', 'events_unchanged')
+    op.drop_column('import_jobs', 'events_cancelled')
+    op.drop_column('import_jobs', 'events_updated')
+    op.drop_column('import_jobs', 'differential')
+    op.drop_column('events', 'import_fingerprint')
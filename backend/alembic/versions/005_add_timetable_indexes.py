@@ -0,0 +1,71 @@
+"""Add composite and partial indexes for timetable queries
+
+Revision ID: 005_add_timetable_indexes
+Revises: 004_add_import_fingerprints
+Create Date: 2025-11-26 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_add_timetable_indexes'
+down_revision = '004_add_import_fingerprints'
+branch_labels = None
+depends_on = None
+
+# (таблица, столбец связанной сущности) связей событий
+EVENT_LINKS = [
+    ('event_lecturers', 'lecturer_id'),
+    ('event_groups', 'group_id'),
+    ('event_subgroups', 'subgroup_id'),
+    ('event_streams', 'stream_id'),
+]
+
+# Дубли слотов (date, pair_number): id слота -> меньший id слота той же пары
+DUPLICATE_SLOTS = """
+    SELECT id, min(id) OVER (PARTITION BY date, pair_number) AS keep_id
+    FROM time_slots
+"""
+
+
+def upgrade() -> None:
+    # Перед уникальным ограничением события переносятся на один слот пары, дубли удаляются
+    op.execute(
+        f"""
+        UPDATE events SET time_slot_id = slots.keep_id
+        FROM ({DUPLICATE_SLOTS}) AS slots
+        WHERE events.time_slot_id = slots.id AND slots.id <> slots.keep_id
+        """
+    )
+    op.execute(
+        f"""
+        DELETE FROM time_slots USING ({DUPLICATE_SLOTS}) AS slots
+        WHERE time_slots.id = slots.id AND slots.id <> slots.keep_id
+        """
+    )
+    op.create_unique_constraint('uq_time_slots_date_pair_number', 'time_slots', ['date', 'pair_number'])
+    op.create_index('ix_time_slots_date_time', 'time_slots', ['date', 'time_start', 'time_end'], unique=False)
+    # Оба новых индекса начинаются с date
+    op.drop_index('ix_time_slots_date', table_name='time_slots')
+
+    op.create_index(
+        'ix_events_scheduled_time_slot_id', 'events', ['time_slot_id'], unique=False,
+        postgresql_where=sa.text("status = 'scheduled'"),
+    )
+
+    for table, column in EVENT_LINKS:
+        op.create_index(f'ix_{table}_{column}_event_id', table, [column, 'event_id'], unique=False)
+        op.drop_index(f'ix_{table}_{column}', table_name=table)
+
+
+def downgrade() -> None:
+    for table, column in EVENT_LINKS:
+        op.create_index(f'ix_{table}_{column}', table, [column], unique=False)
+        op.drop_index(f'ix_{table}_{column}_event_id', table_name=table)
+
+    op.drop_index('ix_events_scheduled_time_slot_id', table_name='events')
+
+    op.create_index('ix_time_slots_date', 'time_slots', ['date'], unique=False)
+    op.drop_index('ix_time_slots_date_time', table_name='time_slots')
+    op.drop_constraint('uq_time_slots_date_pair_number', 'time_slots', type_='unique')
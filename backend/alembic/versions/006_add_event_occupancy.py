@@ -0,0 +1,70 @@
+"""Add event occupancy with exclusion constraints
+
+Revision ID: 006_add_event_occupancy
+Revises: 005_add_timetable_indexes
+Create Date: 2025-11-28 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '006_add_event_occupancy'
+down_revision = '005_add_timetable_indexes'
+branch_labels = None
+depends_on = None
+
+# (тип ресурса, таблица связи, столбец) — ресурсы событий из таблиц связей
+LINKED_RESOURCES = [
+    ('lecturer', 'event_lecturers', 'lecturer_id'),
+    ('group', 'event_groups', 'group_id'),
+    ('subgroup', 'event_subgroups', 'subgroup_id'),
+    ('stream', 'event_streams', 'stream_id'),
+]
+KINDS = ['room'] + [kind for kind, _, _ in LINKED_RESOURCES]
+
+PERIOD = "tsrange(time_slots.date + time_slots.time_start, time_slots.date + time_slots.time_end)"
+
+
+def upgrade() -> None:
+    op.create_table(
+        'event_occupancy',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('resource_kind', sa.String(), nullable=False),
+        sa.Column('resource_id', sa.Integer(), nullable=False),
+        sa.Column('period', postgresql.TSRANGE(), nullable=False),
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_event_occupancy_event_id'), 'event_occupancy', ['event_id'], unique=False)
+    for kind in KINDS:
+        op.execute(
+            f"ALTER TABLE event_occupancy ADD CONSTRAINT excl_event_occupancy_{kind} "
+            f"EXCLUDE USING gist (int4range(resource_id, resource_id, '[]') WITH &&, period WITH &&) "
+            f"WHERE (resource_kind = '{kind}')"
+        )
+
+    # Занятость существующих событий; из уже пересекающихся ресурс остается за первым
+    selects = [
+        f"SELECT events.id, 'room', events.room_id, {PERIOD} "
+        f"FROM events JOIN time_slots ON time_slots.id = events.time_slot_id "
+        f"WHERE events.status = 'scheduled'"
+    ] + [
+        f"SELECT events.id, '{kind}', {table}.{column}, {PERIOD} "
+        f"FROM events JOIN time_slots ON time_slots.id = events.time_slot_id "
+        f"JOIN {table} ON {table}.event_id = events.id "
+        f"WHERE events.status = 'scheduled'"
+        for kind, table, column in LINKED_RESOURCES
+    ]
+    for select in selects:
+        op.execute(
+            "INSERT INTO event_occupancy (event_id, resource_kind, resource_id, period) "
+            f"{select} ORDER BY events.id ON CONFLICT DO NOTHING"
+        )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_event_occupancy_event_id'), table_name='event_occupancy')
+    op.drop_table('event_occupancy')
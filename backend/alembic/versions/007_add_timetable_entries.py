@@ -0,0 +1,102 @@
+"""Add timetable entries read model
+
+Revision ID: 007_add_timetable_entries
+Revises: 006_add_event_occupancy
+Create Date: 2025-12-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '007_add_timetable_entries'
+down_revision = '006_add_event_occupancy'
+branch_labels = None
+depends_on = None
+
+# (столбец id, столбец подписей, таблица связи, столбец связи, справочник, поле подписи)
+LINKS = [
+    ('lecturer_ids', 'lecturer_fios', 'event_lecturers', 'lecturer_id', 'lecturers', 'fio'),
+    ('group_ids', 'group_codes', 'event_groups', 'group_id', 'groups', 'code'),
+    ('subgroup_ids', 'subgroup_codes', 'event_subgroups', 'subgroup_id', 'subgroups', 'code'),
+    ('stream_ids', 'stream_names', 'event_streams', 'stream_id', 'streams', 'name'),
+]
+GIN_COLUMNS = ['lecturer_ids', 'group_ids', 'stream_ids']
+
+
+def upgrade() -> None:
+    op.create_table(
+        'timetable_entries',
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('note', sa.String(), nullable=True),
+        sa.Column('time_slot_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('pair_number', sa.Integer(), nullable=False),
+        sa.Column('time_start', sa.Time(), nullable=False),
+        sa.Column('time_end', sa.Time(), nullable=False),
+        sa.Column('discipline_id', sa.Integer(), nullable=False),
+        sa.Column('discipline_name', sa.String(), nullable=False),
+        sa.Column('work_kind_id', sa.Integer(), nullable=False),
+        sa.Column('work_kind_name', sa.String(), nullable=False),
+        sa.Column('work_kind_color_hex', sa.String(), nullable=False),
+        sa.Column('room_id', sa.Integer(), nullable=False),
+        sa.Column('room_number', sa.String(), nullable=False),
+        sa.Column('building_id', sa.Integer(), nullable=False),
+        sa.Column('building_name', sa.String(), nullable=False),
+        sa.Column('building_address', sa.String(), nullable=False),
+        *[
+            column
+            for ids_column, labels_column, _, _, _, _ in LINKS
+            for column in (
+                sa.Column(ids_column, postgresql.ARRAY(sa.Integer()), nullable=False),
+                sa.Column(labels_column, postgresql.ARRAY(sa.String()), nullable=False),
+            )
+        ],
+        sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('event_id')
+    )
+    op.create_index('ix_timetable_entries_date_time_start_event_id', 'timetable_entries', ['date', 'time_start', 'event_id'], unique=False)
+    op.create_index('ix_timetable_entries_room_id_date', 'timetable_entries', ['room_id', 'date'], unique=False)
+    op.create_index('ix_timetable_entries_building_id_date', 'timetable_entries', ['building_id', 'date'], unique=False)
+    for column in GIN_COLUMNS:
+        op.create_index(f'ix_timetable_entries_{column}', 'timetable_entries', [column], unique=False, postgresql_using='gin')
+
+    # Строки существующих запланированных событий (как TimetableEntryService.select_rows)
+    arrays = []
+    for ids_column, labels_column, table, column, model_table, label in LINKS:
+        linked = (
+            f"FROM {model_table} JOIN {table} ON {table}.{column} = {model_table}.id "
+            f"WHERE {table}.event_id = events.id ORDER BY {table}.id"
+        )
+        arrays.append(f"ARRAY(SELECT {model_table}.id {linked})")
+        arrays.append(f"ARRAY(SELECT {model_table}.{label} {linked})")
+    op.execute(
+        "INSERT INTO timetable_entries ("
+        "event_id, note, time_slot_id, date, pair_number, time_start, time_end, "
+        "discipline_id, discipline_name, work_kind_id, work_kind_name, work_kind_color_hex, "
+        "room_id, room_number, building_id, building_name, building_address, "
+        + ", ".join(column for link in LINKS for column in link[:2])
+        + ") SELECT events.id, events.note, time_slots.id, time_slots.date, "
+        "time_slots.pair_number, time_slots.time_start, time_slots.time_end, "
+        "disciplines.id, disciplines.name, work_kinds.id, work_kinds.name, work_kinds.color_hex, "
+        "rooms.id, rooms.number, buildings.id, buildings.name, buildings.address, "
+        + ", ".join(arrays)
+        + " FROM events "
+        "JOIN time_slots ON time_slots.id = events.time_slot_id "
+        "JOIN disciplines ON disciplines.id = events.discipline_id "
+        "JOIN work_kinds ON work_kinds.id = events.work_kind_id "
+        "JOIN rooms ON rooms.id = events.room_id "
+        "JOIN buildings ON buildings.id = rooms.building_id "
+        "WHERE events.status = 'scheduled'"
+    )
+    op.execute('ANALYZE timetable_entries')
+
+
+def downgrade() -> None:
+    for column in GIN_COLUMNS:
+        op.drop_index(f'ix_timetable_entries_{column}', table_name='timetable_entries')
+    op.drop_index('ix_timetable_entries_building_id_date', table_name='timetable_entries')
+    op.drop_index('ix_timetable_entries_room_id_date', table_name='timetable_entries')
+    op.drop_index('ix_timetable_entries_date_time_start_event_id', table_name='timetable_entries')
+    op.drop_table('timetable_entries')
@@ -0,0 +1,27 @@
+"""Add GIN index on event diff_before in change log
+
+Revision ID: 008_add_change_log_diff_index
+Revises: 007_add_timetable_entries
+Create Date: 2025-12-03 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_add_change_log_diff_index'
+down_revision = '007_add_timetable_entries'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Last-Modified ленты ищет события, которые ушли из нее: diff_before::jsonb @> {...}
+    op.create_index(
+        'ix_change_log_event_diff_before', 'change_log', [sa.text('CAST(diff_before AS JSONB) jsonb_path_ops')],
+        unique=False, postgresql_using='gin', postgresql_where=sa.text("entity = 'event'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_change_log_event_diff_before', table_name='change_log')
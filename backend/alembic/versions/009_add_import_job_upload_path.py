@@ -0,0 +1,23 @@
+"""Add upload path to import jobs
+
+Revision ID: 009_add_import_job_upload_path
+Revises: 008_add_change_log_diff_index
+Create Date: 2025-12-03 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009_add_import_job_upload_path'
+down_revision = '008_add_change_log_diff_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('import_jobs', sa.Column('upload_path', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('import_jobs', 'upload_path')
@@ -0,0 +1,25 @@
+"""Add owner and heartbeat to import jobs
+
+Revision ID: 010_add_import_job_heartbeat
+Revises: 009_add_import_job_upload_path
+Create Date: 2025-12-04 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010_add_import_job_heartbeat'
+down_revision = '009_add_import_job_upload_path'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('import_jobs', sa.Column('owner', sa.String(), nullable=True))
+    op.add_column('import_jobs', sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('import_jobs', 'heartbeat_at')
+    op.drop_column('import_jobs', 'owner')
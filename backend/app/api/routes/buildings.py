@@ -3,6 +3,8 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from typing import List
 from app.db.session import get_db
+from app.services.cache import cache_result
+from app.services.cache_tags import CacheTagService
 from app.schemas import Building, BuildingCreate, BuildingUpdate
 from app.models import Building as BuildingModel
 
@@ -10,6 +12,12 @@ router = APIRouter(prefix="/api/buildings", tags=["buildings"])
 
 
 @router.get("", response_model=List[Building])
+@cache_result(
+    "buildings",
+    ttl=3600,
+    schema=List[Building],
+    tags=[CacheTagService.reference("buildings")],
+)
 def get_buildings(db: Session = Depends(get_db)):
     """Получить список корпусов."""
     return db.query(BuildingModel).all()
@@ -21,6 +29,7 @@ def create_building(building: BuildingCreate, db: Session = Depends(get_db)):
     db_building = BuildingModel(**building.model_dump())
     db.add(db_building)
     db.commit()
+    CacheTagService.invalidate_reference("buildings")
     db.refresh(db_building)
     return db_building
 
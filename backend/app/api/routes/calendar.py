@@ -1,46 +1,129 @@
 """API для календаря (ICS)."""
-from fastapi import APIRouter, Depends, Query, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 import secrets
+from app.core.config import settings
 from app.db.session import get_db
 from app.services.ics import ICSService
 from app.services.cache import cache_service
+from app.services.cache_tags import CacheTagService
+from app.services.calendar_feed import CalendarFeedService, subscription_index
+from app.services.response_cache import ResponseCacheService
 from app.models.calendar_subscription import CalendarSubscription, FilterKind
 
 router = APIRouter(prefix="/api/calendar", tags=["calendar"])
 
 
+def _not_modified_since(
+    if_modified_since: Optional[str], last_modified: Optional[datetime]
+) -> bool:
+    """Не изменялась ли лента с момента из заголовка If-Modified-Since."""
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP-даты с точностью до секунды
+    return last_modified.replace(microsecond=0) <= since
+
+
 @router.get("/ics")
 def get_ics(
+    request: Request,
     group_id: Optional[int] = Query(None),
     lecturer_id: Optional[int] = Query(None),
     stream_id: Optional[int] = Query(None),
     db: Session = Depends(get_db),
 ):
-    """Получить ICS календарь."""
-    cache_key = f"calendar:ics:{group_id}:{lecturer_id}:{stream_id}"
-    cached = cache_service.get(cache_key)
-    if cached:
-        ics_content = cached
+    """Получить ICS календарь.
+
+    Лента отдается с ETag и Last-Modified; при совпадении If-None-Match
+    (или, без него, If-Modified-Since) возвращается 304 без генерации ICS.
+    """
+    if not (group_id or lecturer_id or stream_id):
+        return {"error": "Необходимо указать group_id, lecturer_id или stream_id"}
+
+    etag, last_modified = ICSService.feed_version(
+        db, group_id=group_id, lecturer_id=lecturer_id, stream_id=stream_id
+    )
+    validators = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        validators["Last-Modified"] = format_datetime(
+            last_modified.astimezone(timezone.utc), usegmt=True
+        )
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        not_modified = ResponseCacheService.etag_matches(if_none_match, etag)
     else:
-        if group_id:
-            ics_content = ICSService.generate_ics_for_group(db, group_id)
-        elif lecturer_id:
-            ics_content = ICSService.generate_ics_for_lecturer(db, lecturer_id)
-        elif stream_id:
-            ics_content = ICSService.generate_ics_for_stream(db, stream_id)
-        else:
-            return {"error": "Необходимо указать group_id, lecturer_id или stream_id"}
-
-        cache_service.set(cache_key, ics_content, ttl=3600)
-
-    return Response(
-        content=ics_content,
-        media_type="text/calendar",
-        headers={"Content-Disposition": "attachment; filename=schedule.ics"},
+        not_modified = _not_modified_since(
+            request.headers.get("if-modified-since"), last_modified
+        )
+    if not_modified:
+        return Response(status_code=304, headers=validators)
+
+    # Версия ленты в ключе: измененная лента не может быть отдана из кэша
+    version = etag.strip('"')
+    cache_key = f"calendar:ics:{group_id}:{lecturer_id}:{stream_id}:{version}"
+    headers = {"Content-Disposition": "attachment; filename=schedule.ics", **validators}
+    cached = cache_service.get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="text/calendar", headers=headers)
+
+    chunks = ICSService.iter_ics(
+        db, group_id=group_id, lecturer_id=lecturer_id, stream_id=stream_id
     )
 
+    def body():
+        # Календарь отдается по мере генерации и кэшируется целиком в конце
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        cache_service.set_tagged(
+            cache_key,
+            "".join(parts),
+            ttl=3600,
+            tags=CacheTagService.for_filters(
+                group_id=group_id, lecturer_id=lecturer_id, stream_id=stream_id
+            ),
+        )
+
+    return StreamingResponse(body(), media_type="text/calendar", headers=headers)
+
+
+@router.get("/feed/{token}.ics")
+def get_feed(request: Request, token: str, db: Session = Depends(get_db)):
+    """ICS лента подписки по токену.
+
+    Токен разрешается индексом в памяти, лента отдается из готового
+    снимка, поэтому повторные запросы подписчиков не обращаются к БД.
+    """
+    feed = subscription_index.resolve(db, token)
+    if feed is None:
+        raise HTTPException(status_code=404, detail="Подписка не найдена")
+
+    etag, last_modified, body = CalendarFeedService.get_snapshot(db, feed)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        not_modified = ResponseCacheService.etag_matches(if_none_match, etag)
+    else:
+        not_modified = bool(last_modified) and _not_modified_since(
+            request.headers.get("if-modified-since"), parsedate_to_datetime(last_modified)
+        )
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="text/calendar", headers=headers)
+
 
 @router.get("/subscribe")
 def create_subscription(
@@ -59,14 +142,13 @@ def create_subscription(
     db.add(subscription)
     db.commit()
     db.refresh(subscription)
+    subscription_index.add(token, filter_kind, filter_id)
 
-    # Формируем URL подписки
-    base_url = "http://localhost:8000"  # TODO: из конфига
-    ics_url = f"{base_url}/api/calendar/ics?{filter_kind.value}_id={filter_id}"
+    base_url = settings.PUBLIC_BASE_URL.rstrip("/")
+    ics_url = f"{base_url}/api/calendar/feed/{token}.ics"
 
     return {
         "token": token,
         "ics_url": ics_url,
         "subscription_id": subscription.id,
     }
-
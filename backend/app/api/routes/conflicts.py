@@ -0,0 +1,54 @@
+"""API для отчета о конфликтах расписания."""
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date
+from app.db.session import get_db
+from app.schemas import ConflictReportItem
+from app.services.event_query import EventQueryService, LAZY
+from app.validators.conflict_engine import ConflictEngine, ScheduleItem
+
+router = APIRouter(prefix="/api/conflicts", tags=["conflicts"])
+
+# Для поиска конфликтов нужны только время и идентификаторы ресурсов
+_REPORT_STRATEGIES = {"discipline": LAZY, "work_kind": LAZY, "room": LAZY}
+
+
+@router.get("", response_model=List[ConflictReportItem])
+def get_conflicts(
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    group_id: Optional[int] = Query(None),
+    lecturer_id: Optional[int] = Query(None),
+    room_id: Optional[int] = Query(None),
+    building_id: Optional[int] = Query(None),
+    stream_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """Отчет о конфликтах среди событий, попавших под фильтры."""
+    events = EventQueryService.timetable_query(
+        db,
+        date_from=date_from,
+        date_to=date_to,
+        group_id=group_id,
+        lecturer_id=lecturer_id,
+        room_id=room_id,
+        building_id=building_id,
+        stream_id=stream_id,
+        strategies=_REPORT_STRATEGIES,
+    ).all()
+
+    items = [ScheduleItem.from_event(event) for event in events]
+    conflicts = ConflictEngine.find_conflicts(item for item in items if item)
+    conflicts.sort(key=lambda c: (c.date, c.kind, c.resource_id, c.first, c.second))
+
+    return [
+        {
+            "conflict_type": conflict.conflict_type,
+            "resource_kind": conflict.kind,
+            "resource_id": conflict.resource_id,
+            "date": conflict.date,
+            "event_ids": sorted([conflict.first, conflict.second]),
+        }
+        for conflict in conflicts
+    ]
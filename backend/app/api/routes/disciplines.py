@@ -3,6 +3,8 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from typing import List
 from app.db.session import get_db
+from app.services.cache import cache_result
+from app.services.cache_tags import CacheTagService
 from app.schemas import Discipline, DisciplineCreate
 from app.models import Discipline as DisciplineModel
 
@@ -10,6 +12,12 @@ router = APIRouter(prefix="/api/disciplines", tags=["disciplines"])
 
 
 @router.get("", response_model=List[Discipline])
+@cache_result(
+    "disciplines",
+    ttl=3600,
+    schema=List[Discipline],
+    tags=[CacheTagService.reference("disciplines")],
+)
 def get_disciplines(db: Session = Depends(get_db)):
     """Получить список дисциплин."""
     return db.query(DisciplineModel).filter(DisciplineModel.active == True).all()
@@ -21,6 +29,7 @@ def create_discipline(discipline: DisciplineCreate, db: Session = Depends(get_db
     db_discipline = DisciplineModel(**discipline.model_dump())
     db.add(db_discipline)
     db.commit()
+    CacheTagService.invalidate_reference("disciplines")
     db.refresh(db_discipline)
     return db_discipline
 
@@ -1,17 +1,60 @@
 """API для событий."""
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from typing import List
+from app.core.config import settings
 from app.db.session import get_db
-from app.schemas import Event, EventCreate, EventUpdate, EventDetail
+from app.schemas import (
+    Event,
+    EventCreate,
+    EventUpdate,
+    EventDetail,
+    EventBulkCreate,
+    EventBulkResult,
+)
 from app.models import Event as EventModel
 from app.models.event import EventLecturer, EventGroup, EventSubgroup, EventStream
 from app.validators.conflicts import ValidationService, ConflictError
 from app.services.change_log import ChangeLogService
-from app.services.cache import cache_service
+from app.services.event_bulk import EventBulkService
+from app.services.cache_tags import CacheTagService
+from app.services.event_records import EventRecordService
+from app.services.occupancy import OccupancyService
+from app.services.response_cache import ResponseCacheService
+from app.services.timetable_entries import TimetableEntryService
 
 router = APIRouter(prefix="/api/events", tags=["events"])
 
+_EVENT_DETAIL = TypeAdapter(EventDetail)
+
+# Поля EventUpdate со связями события
+_LINKED_FIELDS = ("lecturer_ids", "group_ids", "subgroup_ids", "stream_ids")
+
+
+def _conflict_response(errors: List[ConflictError]) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail={"message": "Конфликты расписания", "errors": [e.message for e in errors]},
+    )
+
+
+def _sync_schedule(db: Session, event_ids: List[int], occupancy: bool = True) -> None:
+    """Занятость ресурсов и модель чтения расписания перед коммитом.
+
+    Пересечение с другим событием (в том числе записанным параллельным
+    запросом после проверки) откатывает транзакцию. Без occupancy
+    пересчитывается только модель чтения: занятость не меняется, если у
+    события те же слот, аудитория, статус и связи.
+    """
+    if occupancy:
+        try:
+            OccupancyService.sync(db, event_ids)
+        except ConflictError as e:
+            db.rollback()
+            raise _conflict_response([e])
+    TimetableEntryService.sync(db, event_ids)
+
 
 @router.post("", response_model=Event)
 def create_event(event: EventCreate, db: Session = Depends(get_db)):
@@ -26,13 +69,11 @@ def create_event(event: EventCreate, db: Session = Depends(get_db)):
         subgroup_ids=event.subgroup_ids,
         stream_ids=event.stream_ids,
         work_kind_id=event.work_kind_id,
+        check_conflicts=settings.SCHEDULE_CONFLICT_PRECHECK,
     )
 
     if errors:
-        raise HTTPException(
-            status_code=400,
-            detail={"message": "Конфликты расписания", "errors": [e.message for e in errors]},
-        )
+        raise _conflict_response(errors)
 
     # Создание события
     db_event = EventModel(
@@ -56,6 +97,7 @@ def create_event(event: EventCreate, db: Session = Depends(get_db)):
     for stream_id in event.stream_ids:
         db.add(EventStream(event_id=db_event.id, stream_id=stream_id))
 
+    _sync_schedule(db, [db_event.id])
     db.commit()
     db.refresh(db_event)
 
@@ -72,11 +114,44 @@ def create_event(event: EventCreate, db: Session = Depends(get_db)):
     )
 
     # Инвалидация кэша
-    cache_service.invalidate_timetable_cache()
+    CacheTagService.invalidate_event_states(db, [event_state])
 
     return db_event
 
 
+@router.post("/bulk", response_model=EventBulkResult)
+def create_events_bulk(payload: EventBulkCreate, db: Session = Depends(get_db)):
+    """Пакетное создание событий.
+
+    Все события проверяются по БД и друг с другом за один проход,
+    принятые создаются в одной транзакции. Результат — по каждому событию.
+    """
+    try:
+        results = EventBulkService.create_events(
+            db,
+            payload.events,
+            reason=payload.reason,
+            actor=None,  # TODO: из сессии пользователя
+            atomic=payload.atomic,
+        )
+    except ConflictError as e:
+        # Ресурс занят параллельной записью после проверки пакета
+        db.rollback()
+        raise _conflict_response([e])
+    created = [result["index"] for result in results if result["status"] == "created"]
+
+    # Инвалидация кэша (один раз на весь пакет)
+    CacheTagService.invalidate_event_states(
+        db, [EventBulkService.event_state(payload.events[index]) for index in created]
+    )
+
+    return {
+        "created": len(created),
+        "rejected": sum(1 for result in results if result["status"] == "rejected"),
+        "results": results,
+    }
+
+
 @router.put("/{event_id}", response_model=Event)
 def update_event(event_id: int, event: EventUpdate, db: Session = Depends(get_db)):
     """Обновить событие."""
@@ -88,7 +163,7 @@ def update_event(event_id: int, event: EventUpdate, db: Session = Depends(get_db
     old_state = ChangeLogService.get_event_state(db, event_id)
 
     # Обновление полей
-    update_data = event.model_dump(exclude_unset=True, exclude={"lecturer_ids", "group_ids", "subgroup_ids", "stream_ids", "reason"})
+    update_data = event.model_dump(exclude_unset=True, exclude={*_LINKED_FIELDS, "reason"})
     for field, value in update_data.items():
         setattr(db_event, field, value)
 
@@ -109,7 +184,7 @@ def update_event(event_id: int, event: EventUpdate, db: Session = Depends(get_db
             db.add(EventSubgroup(event_id=event_id, subgroup_id=subgroup_id))
 
     if event.stream_ids is not None:
-        db.query(EventStream).filter(EventStream.stream_id == event_id).delete()
+        db.query(EventStream).filter(EventStream.event_id == event_id).delete()
         for stream_id in event.stream_ids:
             db.add(EventStream(event_id=event_id, stream_id=stream_id))
 
@@ -133,14 +208,15 @@ def update_event(event_id: int, event: EventUpdate, db: Session = Depends(get_db
             stream_ids=stream_ids,
             work_kind_id=work_kind_id,
             exclude_event_id=event_id,
+            check_conflicts=settings.SCHEDULE_CONFLICT_PRECHECK,
         )
 
         if errors:
-            raise HTTPException(
-                status_code=400,
-                detail={"message": "Конфликты расписания", "errors": [e.message for e in errors]},
-            )
+            raise _conflict_response(errors)
 
+    # Занятость зависит только от слота, аудитории, статуса и связей
+    occupancy_fields = {"room_id", "time_slot_id", "status"} | set(_LINKED_FIELDS)
+    _sync_schedule(db, [event_id], occupancy=bool(occupancy_fields & event.model_fields_set))
     db.commit()
     db.refresh(db_event)
 
@@ -157,7 +233,7 @@ def update_event(event_id: int, event: EventUpdate, db: Session = Depends(get_db
     )
 
     # Инвалидация кэша
-    cache_service.invalidate_timetable_cache()
+    CacheTagService.invalidate_event_states(db, [old_state, new_state], [event_id])
 
     return db_event
 
@@ -173,6 +249,8 @@ def delete_event(event_id: int, reason: str = None, db: Session = Depends(get_db
 
     # Soft delete
     db_event.status = "cancelled"
+    OccupancyService.sync(db, [event_id])
+    TimetableEntryService.sync(db, [event_id])
     db.commit()
 
     # Запись в ChangeLog
@@ -188,45 +266,26 @@ def delete_event(event_id: int, reason: str = None, db: Session = Depends(get_db
     )
 
     # Инвалидация кэша
-    cache_service.invalidate_timetable_cache()
+    CacheTagService.invalidate_event_states(db, [old_state, new_state], [event_id])
 
     return {"message": "Событие удалено"}
 
 
 @router.get("/{event_id}", response_model=EventDetail)
-def get_event(event_id: int, db: Session = Depends(get_db)):
+def get_event(event_id: int, request: Request, db: Session = Depends(get_db)):
     """Получить событие по ID."""
-    event = db.query(EventModel).filter(EventModel.id == event_id).first()
-    if not event:
-        raise HTTPException(status_code=404, detail="Событие не найдено")
-
-    # Формируем детальные данные (аналогично timetable.py)
-    event_dict = {
-        "id": event.id,
-        "discipline_id": event.discipline_id,
-        "work_kind_id": event.work_kind_id,
-        "room_id": event.room_id,
-        "time_slot_id": event.time_slot_id,
-        "status": event.status,
-        "note": event.note,
-        "discipline": {"id": event.discipline.id, "name": event.discipline.name} if event.discipline else None,
-        "work_kind": {"id": event.work_kind.id, "name": event.work_kind.name, "color_hex": event.work_kind.color_hex} if event.work_kind else None,
-        "room": {
-            "id": event.room.id,
-            "number": event.room.number,
-            "building": {"id": event.room.building.id, "name": event.room.building.name, "address": event.room.building.address} if event.room.building else None,
-        } if event.room else None,
-        "time_slot": {
-            "id": event.time_slot.id,
-            "date": event.time_slot.date.isoformat(),
-            "pair_number": event.time_slot.pair_number,
-            "time_start": event.time_slot.time_start.strftime("%H:%M"),
-            "time_end": event.time_slot.time_end.strftime("%H:%M"),
-        } if event.time_slot else None,
-        "lecturers": [{"id": el.lecturer.id, "fio": el.lecturer.fio} for el in event.lecturers if el.lecturer],
-        "groups": [{"id": eg.group.id, "code": eg.group.code} for eg in event.groups if eg.group],
-        "subgroups": [{"id": es.subgroup.id, "code": es.subgroup.code} for es in event.subgroups if es.subgroup],
-        "streams": [{"id": est.stream.id, "name": est.stream.name} for est in event.streams if est.stream],
-    }
-    return event_dict
 
+    def build():
+        event = EventRecordService.get_event(db, event_id)
+        if not event:
+            raise HTTPException(status_code=404, detail="Событие не найдено")
+        return TimetableEntryService.to_detail_dict(event)
+
+    return ResponseCacheService.cached_response(
+        request,
+        f"event:detail:{event_id}",
+        build,
+        _EVENT_DETAIL,
+        ttl=300,
+        tags=[CacheTagService.for_event(event_id)],
+    )
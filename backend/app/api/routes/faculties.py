@@ -3,6 +3,8 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from typing import List
 from app.db.session import get_db
+from app.services.cache import cache_result
+from app.services.cache_tags import CacheTagService
 from app.schemas import Faculty, FacultyCreate
 from app.models import Faculty as FacultyModel
 
@@ -10,6 +12,12 @@ router = APIRouter(prefix="/api/faculties", tags=["faculties"])
 
 
 @router.get("", response_model=List[Faculty])
+@cache_result(
+    "faculties",
+    ttl=3600,
+    schema=List[Faculty],
+    tags=[CacheTagService.reference("faculties")],
+)
 def get_faculties(db: Session = Depends(get_db)):
     """Получить список факультетов."""
     return db.query(FacultyModel).filter(FacultyModel.active == True).all()
@@ -21,6 +29,7 @@ def create_faculty(faculty: FacultyCreate, db: Session = Depends(get_db)):
     db_faculty = FacultyModel(**faculty.model_dump())
     db.add(db_faculty)
     db.commit()
+    CacheTagService.invalidate_reference("faculties")
     db.refresh(db_faculty)
     return db_faculty
 
@@ -3,6 +3,8 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from typing import List
 from app.db.session import get_db
+from app.services.cache import cache_result
+from app.services.cache_tags import CacheTagService
 from app.schemas import Group, GroupCreate, Subgroup, SubgroupCreate
 from app.models import Group as GroupModel, Subgroup as SubgroupModel
 
@@ -10,6 +12,12 @@ router = APIRouter(prefix="/api/groups", tags=["groups"])
 
 
 @router.get("", response_model=List[Group])
+@cache_result(
+    "groups",
+    ttl=3600,
+    schema=List[Group],
+    tags=[CacheTagService.reference("groups")],
+)
 def get_groups(db: Session = Depends(get_db)):
     """Получить список групп."""
     return db.query(GroupModel).filter(GroupModel.active == True).all()
@@ -21,6 +29,7 @@ def create_group(group: GroupCreate, db: Session = Depends(get_db)):
     db_group = GroupModel(**group.model_dump())
     db.add(db_group)
     db.commit()
+    CacheTagService.invalidate_reference("groups")
     db.refresh(db_group)
     return db_group
 
@@ -32,6 +41,12 @@ def get_group(group_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/{group_id}/subgroups", response_model=List[Subgroup])
+@cache_result(
+    "subgroups",
+    ttl=3600,
+    schema=List[Subgroup],
+    tags=[CacheTagService.reference("subgroups")],
+)
 def get_subgroups(group_id: int, db: Session = Depends(get_db)):
     """Получить подгруппы группы."""
     return db.query(SubgroupModel).filter(SubgroupModel.group_id == group_id).all()
@@ -1,57 +1,48 @@
 """API для импорта."""
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.services.parser import ParserService
-from app.services.cache import cache_service
+from app.models import ImportJob as ImportJobModel
+from app.schemas import ImportJob
+from app.services.import_jobs import ImportJobService
 
 router = APIRouter(prefix="/api/import", tags=["import"])
 
-# Глобальная переменная для хранения статуса последнего импорта
-_last_import_status = None
-
-
-@router.post("/html")
-def import_html(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """Импорт HTML расписания."""
-    global _last_import_status
 
+@router.post("/html", response_model=ImportJob, status_code=202)
+def import_html(
+    file: UploadFile = File(...),
+    differential: bool = Form(False),
+    db: Session = Depends(get_db),
+):
+    """Импорт HTML расписания.
+
+    Файл сохраняется и разбирается в фоне; ход выполнения —
+    GET /api/import/jobs/{id}. При differential повторный импорт того же
+    расписания меняет только изменившиеся события (см. ImportEngine).
+    По умолчанию режим выключен, как в ImportEngine и ImportJob: строки
+    файла добавляются событиями. Страница импорта включает его явно.
+    """
     if not file.filename.endswith((".html", ".htm")):
         raise HTTPException(status_code=400, detail="Файл должен быть HTML")
 
-    content = file.file.read().decode("utf-8")
-
-    try:
-        result = ParserService.parse_html(db, content)
-        db.commit()
+    job, _ = ImportJobService.submit(db, file.filename, file.file, differential)
+    return ImportJobService.describe(job)
 
-        _last_import_status = {
-            "events_created": result.events_created,
-            "errors": result.errors,
-            "warnings": result.warnings,
-            "entities_created": result.entities_created,
-        }
 
-        # Инвалидация кэша
-        cache_service.invalidate_timetable_cache()
-
-        return {
-            "message": "Импорт завершен",
-            "events_created": result.events_created,
-            "errors_count": len(result.errors),
-            "warnings_count": len(result.warnings),
-            "entities_created": result.entities_created,
-        }
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Ошибка импорта: {str(e)}")
+@router.get("/jobs/{job_id}", response_model=ImportJob)
+def get_import_job(job_id: int, db: Session = Depends(get_db)):
+    """Состояние задачи импорта: обработано строк, скорость и оценка окончания."""
+    job = db.query(ImportJobModel).filter(ImportJobModel.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача импорта не найдена")
+    return ImportJobService.describe(job)
 
 
 @router.get("/status")
-def get_import_status():
+def get_import_status(db: Session = Depends(get_db)):
     """Получить статус последнего импорта."""
-    global _last_import_status
-    if _last_import_status is None:
+    job = db.query(ImportJobModel).order_by(ImportJobModel.id.desc()).first()
+    if job is None:
         return {"message": "Импорт еще не выполнялся"}
-    return _last_import_status
-
+    return ImportJobService.describe(job)
@@ -3,6 +3,8 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from typing import List
 from app.db.session import get_db
+from app.services.cache import cache_result
+from app.services.cache_tags import CacheTagService
 from app.schemas import Lecturer, LecturerCreate, LecturerUpdate
 from app.models import Lecturer as LecturerModel
 
@@ -10,12 +12,23 @@ router = APIRouter(prefix="/api/lecturers", tags=["lecturers"])
 
 
 @router.get("", response_model=List[Lecturer])
+@cache_result(
+    "lecturers",
+    ttl=3600,
+    schema=List[Lecturer],
+    tags=[CacheTagService.reference("lecturers")],
+)
 def get_lecturers(db: Session = Depends(get_db)):
     """Получить список преподавателей."""
     return db.query(LecturerModel).filter(LecturerModel.active == True).all()
 
 
 @router.get("/chairs")
+@cache_result(
+    "chairs",
+    ttl=3600,
+    tags=[CacheTagService.reference("lecturers")],
+)
 def get_chairs(db: Session = Depends(get_db)):
     """Получить список кафедр."""
     chairs = (
@@ -33,6 +46,7 @@ def create_lecturer(lecturer: LecturerCreate, db: Session = Depends(get_db)):
     db_lecturer = LecturerModel(**lecturer.model_dump())
     db.add(db_lecturer)
     db.commit()
+    CacheTagService.invalidate_reference("lecturers")
     db.refresh(db_lecturer)
     return db_lecturer
 
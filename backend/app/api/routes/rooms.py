@@ -3,6 +3,8 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from typing import List
 from app.db.session import get_db
+from app.services.cache import cache_result
+from app.services.cache_tags import CacheTagService
 from app.schemas import Room, RoomCreate, RoomUpdate
 from app.models import Room as RoomModel
 
@@ -10,6 +12,12 @@ router = APIRouter(prefix="/api/rooms", tags=["rooms"])
 
 
 @router.get("", response_model=List[Room])
+@cache_result(
+    "rooms",
+    ttl=3600,
+    schema=List[Room],
+    tags=[CacheTagService.reference("rooms")],
+)
 def get_rooms(db: Session = Depends(get_db)):
     """Получить список аудиторий."""
     return db.query(RoomModel).all()
@@ -21,6 +29,7 @@ def create_room(room: RoomCreate, db: Session = Depends(get_db)):
     db_room = RoomModel(**room.model_dump())
     db.add(db_room)
     db.commit()
+    CacheTagService.invalidate_reference("rooms")
     db.refresh(db_room)
     return db_room
 
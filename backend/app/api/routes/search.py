@@ -1,113 +1,111 @@
 """API для поиска."""
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, select
+from sqlalchemy.sql import Select
 from typing import List, Dict, Any
 from app.db.session import get_db
 from app.models import Lecturer, Discipline, Room, Building, Group
+from app.services.cache import make_cache_key
+from app.services.cache_tags import CacheTagService
+from app.services.response_cache import ResponseCacheService
 
 router = APIRouter(prefix="/api/search", tags=["search"])
 
+_SEARCH_RESULTS = TypeAdapter(Dict[str, List[Dict[str, Any]]])
+# Справочники, по которым идет поиск
+_SEARCH_REFERENCES = ("lecturers", "disciplines", "rooms", "buildings", "groups")
+
 
 @router.get("")
-def search(q: str = Query(..., min_length=2), db: Session = Depends(get_db)):
+def search(request: Request, q: str = Query(..., min_length=2), db: Session = Depends(get_db)):
     """Поиск по ФИО, дисциплине, аудитории, адресу, корпусу."""
-    query_lower = q.lower()
+    return ResponseCacheService.cached_response(
+        request,
+        make_cache_key("search", {"q": q}),
+        lambda: _search(db, q),
+        _SEARCH_RESULTS,
+        ttl=300,
+        tags=[CacheTagService.reference(name) for name in _SEARCH_REFERENCES],
+    )
+
+
+def _rows(db: Session, statement: Select) -> List[Dict[str, Any]]:
+    """Первые 10 строк запроса словарями по именам столбцов (без ORM объектов)."""
+    return [dict(row) for row in db.execute(statement.limit(10)).mappings()]
+
+
+def _search(db: Session, q: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Результаты поиска по всем справочникам.
 
-    results: Dict[str, List[Dict[str, Any]]] = {
-        "lecturers": [],
-        "disciplines": [],
-        "rooms": [],
-        "buildings": [],
-        "groups": [],
-    }
+    Запросы выбирают только столбцы ответа (SQLAlchemy Core), аудитории —
+    вместе с корпусом одним JOIN.
+    """
+    pattern = f"%{q}%"
+    results: Dict[str, List[Dict[str, Any]]] = {}
 
     # Поиск преподавателей
-    lecturers = (
-        db.query(Lecturer)
-        .filter(Lecturer.fio.ilike(f"%{q}%"), Lecturer.active == True)
-        .limit(10)
-        .all()
+    results["lecturers"] = _rows(
+        db,
+        select(Lecturer.id, Lecturer.fio, Lecturer.chair).where(
+            Lecturer.fio.ilike(pattern), Lecturer.active == True
+        ),
     )
-    results["lecturers"] = [{"id": l.id, "fio": l.fio, "chair": l.chair} for l in lecturers]
 
     # Поиск дисциплин
-    disciplines = (
-        db.query(Discipline)
-        .filter(
-            or_(
-                Discipline.name.ilike(f"%{q}%"),
-                Discipline.short_name.ilike(f"%{q}%"),
-            ),
+    results["disciplines"] = _rows(
+        db,
+        select(Discipline.id, Discipline.name, Discipline.short_name).where(
+            or_(Discipline.name.ilike(pattern), Discipline.short_name.ilike(pattern)),
             Discipline.active == True,
-        )
-        .limit(10)
-        .all()
+        ),
     )
-    results["disciplines"] = [
-        {"id": d.id, "name": d.name, "short_name": d.short_name} for d in disciplines
-    ]
 
     # Поиск аудиторий
-    rooms = (
-        db.query(Room)
-        .filter(Room.number.ilike(f"%{q}%"), Room.active == True)
-        .limit(10)
-        .all()
+    rooms = _rows(
+        db,
+        select(
+            Room.id,
+            Room.number,
+            Building.id.label("building_id"),
+            Building.name.label("building_name"),
+        )
+        .outerjoin(Building, Room.building_id == Building.id)
+        .where(Room.number.ilike(pattern), Room.active == True),
     )
     results["rooms"] = [
         {
-            "id": r.id,
-            "number": r.number,
-            "building": {"id": r.building.id, "name": r.building.name} if r.building else None,
+            "id": r["id"],
+            "number": r["number"],
+            "building": (
+                {"id": r["building_id"], "name": r["building_name"]}
+                if r["building_id"] is not None
+                else None
+            ),
         }
         for r in rooms
     ]
 
     # Поиск корпусов
-    buildings = (
-        db.query(Building)
-        .filter(
+    results["buildings"] = _rows(
+        db,
+        select(Building.id, Building.name, Building.code, Building.address).where(
             or_(
-                Building.name.ilike(f"%{q}%"),
-                Building.address.ilike(f"%{q}%"),
-                Building.code.ilike(f"%{q}%"),
+                Building.name.ilike(pattern),
+                Building.address.ilike(pattern),
+                Building.code.ilike(pattern),
             )
-        )
-        .limit(10)
-        .all()
+        ),
     )
-    results["buildings"] = [
-        {
-            "id": b.id,
-            "name": b.name,
-            "code": b.code,
-            "address": b.address,
-        }
-        for b in buildings
-    ]
 
     # Поиск групп
-    groups = (
-        db.query(Group)
-        .filter(
-            or_(
-                Group.code.ilike(f"%{q}%"),
-                Group.name.ilike(f"%{q}%"),
-            ),
+    results["groups"] = _rows(
+        db,
+        select(Group.id, Group.code, Group.name).where(
+            or_(Group.code.ilike(pattern), Group.name.ilike(pattern)),
             Group.active == True,
-        )
-        .limit(10)
-        .all()
+        ),
     )
-    results["groups"] = [
-        {
-            "id": g.id,
-            "code": g.code,
-            "name": g.name,
-        }
-        for g in groups
-    ]
 
     return results
-
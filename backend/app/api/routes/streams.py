@@ -3,6 +3,8 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from typing import List
 from app.db.session import get_db
+from app.services.cache import cache_result
+from app.services.cache_tags import CacheTagService
 from app.schemas import Stream, StreamCreate
 from app.models import Stream as StreamModel, StreamMember
 
@@ -10,6 +12,12 @@ router = APIRouter(prefix="/api/streams", tags=["streams"])
 
 
 @router.get("", response_model=List[Stream])
+@cache_result(
+    "streams",
+    ttl=3600,
+    schema=List[Stream],
+    tags=[CacheTagService.reference("streams")],
+)
 def get_streams(db: Session = Depends(get_db)):
     """Получить список потоков."""
     return db.query(StreamModel).filter(StreamModel.active == True).all()
@@ -28,6 +36,7 @@ def create_stream(stream: StreamCreate, db: Session = Depends(get_db)):
             db.add(member)
 
     db.commit()
+    CacheTagService.invalidate_reference("streams")
     db.refresh(db_stream)
     return db_stream
 
@@ -1,19 +1,167 @@
 """API для расписания."""
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from datetime import date, datetime
+from app.core.config import settings
 from app.db.session import get_db
-from app.schemas import EventDetail
-from app.models import Event, TimeSlot
-from app.models.event import EventGroup, EventLecturer, EventStream
-from app.services.cache import cache_service
+from app.schemas import EventDetail, TimetableCompact
+from app.services.cache_tags import CacheTagService
+from app.services.event_query import EventQueryService
+from app.services.event_records import EventRecordService
+from app.services.response_cache import ResponseCacheService
+from app.services.timetable_entries import TimetableEntryService
 
 router = APIRouter(prefix="/api/timetable", tags=["timetable"])
 
 
-@router.get("", response_model=List[EventDetail])
+# Ответы кодируются в JSON один раз, при промахе кэша
+_EVENT_LIST = TypeAdapter(List[EventDetail])
+_EVENT_DETAIL = TypeAdapter(EventDetail)
+_COMPACT = TypeAdapter(TimetableCompact)
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Размер порции строк при потоковой выгрузке
+STREAM_CHUNK_SIZE = 500
+
+
+def _render(pairs: Iterable[Tuple[Any, List[int]]], compact: bool) -> Tuple[TypeAdapter, Any]:
+    """Представление строк расписания с конфликтами: список EventDetail или TimetableCompact."""
+    if compact:
+        return _COMPACT, TimetableEntryService.to_compact(pairs)
+    return _EVENT_LIST, [
+        TimetableEntryService.to_detail_dict(entry, conflicting_event_ids)
+        for entry, conflicting_event_ids in pairs
+    ]
+
+
+def _timetable_response(
+    request: Request,
+    db: Session,
+    compact: bool = False,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    group_id: Optional[int] = None,
+    lecturer_id: Optional[int] = None,
+    room_id: Optional[int] = None,
+    building_id: Optional[int] = None,
+    stream_id: Optional[int] = None,
+) -> Response:
+    """Расписание по фильтрам в виде готового JSON ответа (через кэш)."""
+    cache_key = (
+        f"timetable:{date_from}:{date_to}:{group_id}:{lecturer_id}:{room_id}:{building_id}:"
+        f"{stream_id}" + (":compact" if compact else "")
+    )
+
+    filters = {
+        "date_from": date_from,
+        "date_to": date_to,
+        "group_id": group_id,
+        "lecturer_id": lecturer_id,
+        "room_id": room_id,
+        "building_id": building_id,
+        "stream_id": stream_id,
+    }
+    cache_options = {
+        "ttl": 300,  # 5 минут
+        "tags": CacheTagService.for_filters(group_id, lecturer_id, room_id, building_id, stream_id),
+        "date_from": date_from,
+        "date_to": date_to,
+    }
+    if settings.TIMETABLE_JSON_IN_DB and not compact:
+        return ResponseCacheService.cached_body(
+            request,
+            cache_key,
+            lambda: TimetableEntryService.json_array(db, **filters),
+            **cache_options,
+        )
+
+    def build():
+        entries = EventRecordService.timetable(db, **filters)
+
+        # Детальные данные с конфликтами (пересекающиеся события с общими ресурсами)
+        return _render(TimetableEntryService.with_conflicts(entries), compact)[1]
+
+    return ResponseCacheService.cached_response(
+        request, cache_key, build, _COMPACT if compact else _EVENT_LIST, **cache_options
+    )
+
+
+def _timetable_page(
+    db: Session,
+    limit: int,
+    cursor: Optional[str],
+    filters: Dict[str, Any],
+    compact: bool = False,
+) -> Response:
+    """Страница расписания после cursor; курсор следующей страницы — в X-Next-Cursor."""
+    try:
+        after = EventQueryService.decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if settings.TIMETABLE_JSON_IN_DB and not compact:
+        rows = TimetableEntryService.json_rows(db, after=after, limit=limit + 1, **filters).all()
+        headers = {}
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers[NEXT_CURSOR_HEADER] = EventQueryService.encode_key(tuple(rows[-1])[1:])
+        body = b"[" + b",".join(row.detail.encode() for row in rows) + b"]"
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    entries = list(EventRecordService.timetable(db, after=after, limit=limit + 1, **filters))
+    headers = {}
+    if len(entries) > limit:
+        entries = entries[:limit]
+        headers[NEXT_CURSOR_HEADER] = TimetableEntryService.encode_cursor(entries[-1])
+
+    conflicts: Dict[int, List[int]] = {}
+    if entries:
+        # Конфликты ищутся среди всех событий крайних дат страницы, а не только на ней
+        day_filters = {**filters, "date_from": entries[0].date, "date_to": entries[-1].date}
+        day_entries = EventRecordService.timetable(db, **day_filters)
+        conflicts = {
+            entry.event_id: ids
+            for entry, ids in TimetableEntryService.with_conflicts(day_entries)
+        }
+
+    adapter, payload = _render(
+        [(entry, conflicts.get(entry.event_id, [])) for entry in entries], compact
+    )
+    body = adapter.dump_json(adapter.validate_python(payload))
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _timetable_stream(db: Session, filters: Dict[str, Any]) -> StreamingResponse:
+    """Все события по фильтрам в формате NDJSON (одно событие на строку).
+
+    События читаются из БД порциями по STREAM_CHUNK_SIZE, конфликты
+    считаются по одной дате, поэтому память не растет с размером выборки.
+    С TIMETABLE_JSON_IN_DB строки JSON и конфликты готовит Postgres.
+    """
+    if settings.TIMETABLE_JSON_IN_DB:
+        rows = TimetableEntryService.json_rows(db, yield_per=STREAM_CHUNK_SIZE, **filters)
+        return StreamingResponse(
+            (row.detail.encode() + b"\n" for row in rows), media_type="application/x-ndjson"
+        )
+
+    entries = EventRecordService.timetable(db, yield_per=STREAM_CHUNK_SIZE, **filters)
+
+    def lines() -> Iterator[bytes]:
+        for entry, conflicting_event_ids in TimetableEntryService.with_conflicts(entries):
+            detail = TimetableEntryService.to_detail_dict(entry, conflicting_event_ids)
+            yield _EVENT_DETAIL.dump_json(_EVENT_DETAIL.validate_python(detail)) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("", response_model=Union[List[EventDetail], TimetableCompact])
 def get_timetable(
+    request: Request,
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
     group_id: Optional[int] = Query(None),
@@ -21,166 +169,47 @@ def get_timetable(
     room_id: Optional[int] = Query(None),
     building_id: Optional[int] = Query(None),
     stream_id: Optional[int] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    format: str = Query("json", pattern="^(json|ndjson|compact)$"),
     db: Session = Depends(get_db),
 ):
-    """Получить расписание с фильтрами."""
-    cache_key = f"timetable:{date_from}:{date_to}:{group_id}:{lecturer_id}:{room_id}:{building_id}:{stream_id}"
-    cached = cache_service.get(cache_key)
-    if cached:
-        return cached
-
-    query = db.query(Event).filter(Event.status == "scheduled")
-
-    # Объединяем условия по дате, чтобы не делать двойной join
-    if date_from or date_to:
-        query = query.join(TimeSlot)
-        if date_from:
-            query = query.filter(TimeSlot.date >= date_from)
-        if date_to:
-            query = query.filter(TimeSlot.date <= date_to)
-
-    if group_id:
-        query = query.join(EventGroup).filter(EventGroup.group_id == group_id)
-
-    if lecturer_id:
-        query = query.join(EventLecturer).filter(EventLecturer.lecturer_id == lecturer_id)
-
-    if stream_id:
-        query = query.join(EventStream).filter(EventStream.stream_id == stream_id)
-
-    if room_id:
-        query = query.filter(Event.room_id == room_id)
-
-    if building_id:
-        from app.models import Room
-
-        query = query.join(Room).filter(Room.building_id == building_id)
-
-    events = query.all()
-
-    # Функция для определения конфликтов между событиями
-    def detect_conflicts(event_list: List[Event]) -> dict[int, List[int]]:
-        """Определяет конфликты между событиями (пересекающиеся временные интервалы)."""
-        conflicts = {}
-        from app.validators.conflicts import ValidationService
-        
-        for i, event1 in enumerate(event_list):
-            if not event1.time_slot:
-                continue
-            event_conflicts = []
-            for j, event2 in enumerate(event_list):
-                if i == j or not event2.time_slot:
-                    continue
-                # Проверяем пересечение временных интервалов
-                if (event1.time_slot.date == event2.time_slot.date and
-                    ValidationService.check_time_overlap(
-                        event1.time_slot.time_start,
-                        event1.time_slot.time_end,
-                        event2.time_slot.time_start,
-                        event2.time_slot.time_end,
-                    )):
-                    # Проверяем конфликты по аудитории, преподавателю или группе
-                    has_conflict = False
-                    # Конфликт аудитории
-                    if event1.room_id == event2.room_id:
-                        has_conflict = True
-                    # Конфликт преподавателя
-                    lecturer_ids1 = {el.lecturer_id for el in event1.lecturers}
-                    lecturer_ids2 = {el.lecturer_id for el in event2.lecturers}
-                    if lecturer_ids1 & lecturer_ids2:
-                        has_conflict = True
-                    # Конфликт группы
-                    group_ids1 = {eg.group_id for eg in event1.groups}
-                    group_ids2 = {eg.group_id for eg in event2.groups}
-                    if group_ids1 & group_ids2:
-                        has_conflict = True
-                    
-                    if has_conflict:
-                        event_conflicts.append(event2.id)
-            
-            if event_conflicts:
-                conflicts[event1.id] = event_conflicts
-        
-        return conflicts
-
-    # Определяем конфликты
-    event_conflicts = detect_conflicts(events)
-
-    # Формируем детальные данные
-    result = []
-    for event in events:
-        event_dict = {
-            "id": event.id,
-            "discipline_id": event.discipline_id,
-            "work_kind_id": event.work_kind_id,
-            "room_id": event.room_id,
-            "time_slot_id": event.time_slot_id,
-            "status": event.status,
-            "note": event.note,
-        }
-        # Добавляем связанные объекты
-        event_dict["discipline"] = {
-            "id": event.discipline.id,
-            "name": event.discipline.name,
-        } if event.discipline else None
-        event_dict["work_kind"] = {
-            "id": event.work_kind.id,
-            "name": event.work_kind.name,
-            "color_hex": event.work_kind.color_hex,
-        } if event.work_kind else None
-        event_dict["room"] = {
-            "id": event.room.id,
-            "number": event.room.number,
-            "building": {
-                "id": event.room.building.id,
-                "name": event.room.building.name,
-                "address": event.room.building.address,
-            } if event.room.building else None,
-        } if event.room else None
-        event_dict["time_slot"] = {
-            "id": event.time_slot.id,
-            "date": event.time_slot.date.isoformat(),
-            "pair_number": event.time_slot.pair_number,
-            "time_start": event.time_slot.time_start.strftime("%H:%M"),
-            "time_end": event.time_slot.time_end.strftime("%H:%M"),
-        } if event.time_slot else None
-        # Добавляем информацию о конфликтах
-        event_dict["has_conflict"] = event.id in event_conflicts
-        event_dict["conflicting_event_ids"] = event_conflicts.get(event.id, [])
-        event_dict["lecturers"] = [
-            {"id": el.lecturer.id, "fio": el.lecturer.fio}
-            for el in event.lecturers
-            if el.lecturer
-        ]
-        event_dict["groups"] = [
-            {"id": eg.group.id, "code": eg.group.code}
-            for eg in event.groups
-            if eg.group
-        ]
-        event_dict["subgroups"] = [
-            {"id": es.subgroup.id, "code": es.subgroup.code}
-            for es in event.subgroups
-            if es.subgroup
-        ]
-        event_dict["streams"] = [
-            {"id": est.stream.id, "name": est.stream.name}
-            for est in event.streams
-            if est.stream
-        ]
-        result.append(event_dict)
-
-    cache_service.set(cache_key, result, ttl=300)  # 5 минут
-    return result
+    """Получить расписание с фильтрами.
+
+    Расписание читается из модели чтения timetable_entries одним запросом
+    (JSON собирает Postgres или строки читаются записями EventRecord).
+    С limit возвращается страница из не более чем limit событий в порядке
+    (дата, начало, id); курсор следующей страницы передается в заголовке
+    X-Next-Cursor и указывается в cursor следующего запроса.
+    format=ndjson отдает все события потоком, по одному JSON на строку.
+    format=compact возвращает TimetableCompact: справочные сущности без
+    повторов и события столбцами со ссылками на них по id.
+    """
+    filters = {
+        "date_from": date_from,
+        "date_to": date_to,
+        "group_id": group_id,
+        "lecturer_id": lecturer_id,
+        "room_id": room_id,
+        "building_id": building_id,
+        "stream_id": stream_id,
+    }
+    if format == "ndjson":
+        return _timetable_stream(db, filters)
+    compact = format == "compact"
+    if limit is not None or cursor is not None:
+        return _timetable_page(db, limit or DEFAULT_PAGE_SIZE, cursor, filters, compact)
+    return _timetable_response(request, db, compact, **filters)
 
 
 @router.get("/day/{day_date}", response_model=List[EventDetail])
-def get_timetable_day(day_date: date, db: Session = Depends(get_db)):
+def get_timetable_day(request: Request, day_date: date, db: Session = Depends(get_db)):
     """Получить расписание на день."""
-    return get_timetable(date_from=day_date, date_to=day_date, db=db)
+    return _timetable_response(request, db, date_from=day_date, date_to=day_date)
 
 
 @router.get("/week/{year}/{week}", response_model=List[EventDetail])
-def get_timetable_week(year: int, week: int, db: Session = Depends(get_db)):
+def get_timetable_week(request: Request, year: int, week: int, db: Session = Depends(get_db)):
     """Получить расписание на неделю."""
     from datetime import timedelta
 
@@ -189,17 +218,17 @@ def get_timetable_week(year: int, week: int, db: Session = Depends(get_db)):
     days_offset = jan1.weekday()
     week_start = jan1 + timedelta(days=week * 7 - days_offset)
     week_end = week_start + timedelta(days=6)
-    return get_timetable(date_from=week_start, date_to=week_end, db=db)
+    return _timetable_response(request, db, date_from=week_start, date_to=week_end)
 
 
 @router.get("/group/{group_id}", response_model=List[EventDetail])
-def get_timetable_group(group_id: int, db: Session = Depends(get_db)):
+def get_timetable_group(request: Request, group_id: int, db: Session = Depends(get_db)):
     """Получить расписание группы."""
-    return get_timetable(group_id=group_id, db=db)
+    return _timetable_response(request, db, group_id=group_id)
 
 
 @router.get("/lecturer/{lecturer_id}", response_model=List[EventDetail])
-def get_timetable_lecturer(lecturer_id: int, db: Session = Depends(get_db)):
+def get_timetable_lecturer(request: Request, lecturer_id: int, db: Session = Depends(get_db)):
     """Получить расписание преподавателя."""
-    return get_timetable(lecturer_id=lecturer_id, db=db)
+    return _timetable_response(request, db, lecturer_id=lecturer_id)
 
@@ -3,6 +3,8 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from typing import List
 from app.db.session import get_db
+from app.services.cache import cache_result
+from app.services.cache_tags import CacheTagService
 from app.schemas import WorkKind, WorkKindCreate
 from app.models import WorkKind as WorkKindModel
 
@@ -10,6 +12,12 @@ router = APIRouter(prefix="/api/work-kinds", tags=["work-kinds"])
 
 
 @router.get("", response_model=List[WorkKind])
+@cache_result(
+    "work_kinds",
+    ttl=3600,
+    schema=List[WorkKind],
+    tags=[CacheTagService.reference("work_kinds")],
+)
 def get_work_kinds(db: Session = Depends(get_db)):
     """Получить список видов занятий."""
     return db.query(WorkKindModel).filter(WorkKindModel.active == True).all()
@@ -21,6 +29,7 @@ def create_work_kind(work_kind: WorkKindCreate, db: Session = Depends(get_db)):
     db_work_kind = WorkKindModel(**work_kind.model_dump())
     db.add(db_work_kind)
     db.commit()
+    CacheTagService.invalidate_reference("work_kinds")
     db.refresh(db_work_kind)
     return db_work_kind
 
@@ -12,6 +12,37 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # Cache
+    CACHE_LOCAL_ENABLED: bool = True
+    CACHE_LOCAL_MAXSIZE: int = 1024  # записей в LRU процесса
+    CACHE_LOCAL_TTL: float = 5.0  # секунд, допустимая задержка между процессами
+    CACHE_LOCK_TIMEOUT: float = 10.0  # секунд, блокировка пересчета ключа
+    CACHE_EARLY_REFRESH_BETA: float = 1.0  # > 1 — пересчитывать раньше
+    CACHE_COMPRESS_MIN_BYTES: int = 4096  # сжимать значения cache_result не меньше этого размера
+
+    # Calendar
+    PUBLIC_BASE_URL: str = "http://localhost:8000"  # адрес API в ссылках подписок
+    CALENDAR_TOKEN_INDEX_TTL: float = 300.0  # секунд между перезагрузками индекса токенов
+    CALENDAR_FEED_REFRESH_INTERVAL: float = 30.0  # секунд, 0 — без фоновой пересборки лент
+
+    # Schedule
+    # Проверка конфликтов ресурсов перед записью события (подробные сообщения).
+    # Без нее пересечения все равно отклоняет ограничение event_occupancy в БД
+    SCHEDULE_CONFLICT_PRECHECK: bool = True
+    # Ответы расписания в JSON собирает Postgres (json_build_object/json_agg),
+    # иначе — словари Python по строкам timetable_entries. Компактный формат — всегда Python
+    TIMETABLE_JSON_IN_DB: bool = True
+
+    # Import
+    IMPORT_WORKERS: int = 2  # одновременных задач импорта в процессе
+    # Процесс отмечает свои задачи импорта раз в INTERVAL секунд; задачи без
+    # отметки дольше TIMEOUT секунд считаются прерванными (TIMEOUT > INTERVAL)
+    IMPORT_HEARTBEAT_INTERVAL: float = 30.0
+    IMPORT_HEARTBEAT_TIMEOUT: float = 300.0
+    IMPORT_UPLOAD_DIR: str = ""  # каталог загруженных файлов, пусто — системный temp
+    IMPORT_PARSE_PROCESSES: int = 0  # процессов разбора HTML, 0 — по числу ядер
+    IMPORT_PARALLEL_MIN_BYTES: int = 8 * 1024 * 1024  # меньшие файлы разбираются в одном процессе
+
     # Environment
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
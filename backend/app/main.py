@@ -1,7 +1,12 @@
 """Главный файл FastAPI приложения."""
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.cache import cache_service
+from app.services.calendar_feed import CalendarFeedRefresher
+from app.services.import_jobs import ImportJobHeartbeat
 from app.api.routes import (
     buildings,
     rooms,
@@ -12,6 +17,7 @@ from app.api.routes import (
     work_kinds,
     timetable,
     events,
+    conflicts,
     history,
     calendar,
     import_route,
@@ -22,10 +28,29 @@ from app.api.routes import (
     faculties,
 )
 
+# Фоновая пересборка снимков лент подписок на календарь
+feed_refresher = CalendarFeedRefresher(SessionLocal, settings.CALENDAR_FEED_REFRESH_INTERVAL)
+# Сигнал о задачах импорта процесса и сбой задач остановленных процессов
+import_heartbeat = ImportJobHeartbeat(SessionLocal, settings.IMPORT_HEARTBEAT_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Запуск и остановка фоновых задач приложения."""
+    # Задачи импорта остановленных процессов уже не выполнятся
+    import_heartbeat.tick()
+    import_heartbeat.start()
+    feed_refresher.start()
+    yield
+    feed_refresher.stop()
+    import_heartbeat.stop()
+
+
 app = FastAPI(
     title="САФУ Расписание API",
     description="API для системы расписания САФУ",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS
@@ -61,6 +86,7 @@ app.include_router(disciplines.router)
 app.include_router(work_kinds.router)
 app.include_router(timetable.router)
 app.include_router(events.router)
+app.include_router(conflicts.router)
 app.include_router(history.router)
 app.include_router(calendar.router)
 app.include_router(import_route.router)
@@ -80,3 +106,8 @@ def health():
     """Health check."""
     return {"status": "ok"}
 
+
+@app.get("/health/cache")
+def health_cache():
+    """Статистика кэша текущего процесса."""
+    return cache_service.stats()
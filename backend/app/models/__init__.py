@@ -15,9 +15,12 @@ from app.models.event import (
     EventSubgroup,
     EventStream,
 )
+from app.models.occupancy import EventOccupancy
+from app.models.timetable_entry import TimetableEntry
 from app.models.change_log import ChangeLog
 from app.models.attachment import Attachment
 from app.models.calendar_subscription import CalendarSubscription
+from app.models.import_job import ImportJob, ImportJobStatus
 from app.models.user import User, UserRole
 from app.models.favorite import Favorite
 from app.models.notification import Notification, NotificationType, NotificationSettings
@@ -39,9 +42,13 @@ __all__ = [
     "EventGroup",
     "EventSubgroup",
     "EventStream",
+    "EventOccupancy",
+    "TimetableEntry",
     "ChangeLog",
     "Attachment",
     "CalendarSubscription",
+    "ImportJob",
+    "ImportJobStatus",
     "User",
     "UserRole",
     "Favorite",
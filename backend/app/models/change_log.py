@@ -1,5 +1,6 @@
 """Модель журнала изменений."""
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index, cast
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from app.db.session import Base
 
@@ -19,5 +20,15 @@ class ChangeLog(Base):
     diff_after = Column(JSON, nullable=True)
     source = Column(String, nullable=True)  # "api", "import", "admin"
 
-    __table_args__ = (Index("idx_entity_id", "entity", "entity_id"),)
+    __table_args__ = (
+        Index("idx_entity_id", "entity", "entity_id"),
+        # Изменения событий по состоянию до правки: diff_before::jsonb @> {"group_ids": [id]}
+        Index(
+            "ix_change_log_event_diff_before",
+            cast(diff_before, JSONB).label("diff_before_jsonb"),
+            postgresql_using="gin",
+            postgresql_ops={"diff_before_jsonb": "jsonb_path_ops"},
+            postgresql_where=entity == "event",
+        ),
+    )
 
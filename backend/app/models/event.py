@@ -1,5 +1,5 @@
 """Модели событий."""
-from sqlalchemy import Column, Integer, ForeignKey, String, Boolean, UniqueConstraint
+from sqlalchemy import Column, Integer, ForeignKey, String, Boolean, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -16,6 +16,8 @@ class Event(Base):
     time_slot_id = Column(Integer, ForeignKey("time_slots.id"), nullable=False, index=True)
     status = Column(String, default="scheduled", nullable=False)  # scheduled, cancelled, moved
     note = Column(String, nullable=True)
+    # Отпечаток строки HTML, из которой создано событие (см. ImportEngine)
+    import_fingerprint = Column(String(32), nullable=True)
 
     discipline = relationship("Discipline")
     work_kind = relationship("WorkKind")
@@ -27,6 +29,15 @@ class Event(Base):
     subgroups = relationship("EventSubgroup", back_populates="event", cascade="all, delete-orphan")
     streams = relationship("EventStream", back_populates="event", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Расписание выбирает только запланированные события
+        Index(
+            "ix_events_scheduled_time_slot_id",
+            "time_slot_id",
+            postgresql_where=text("status = 'scheduled'"),
+        ),
+    )
+
 
 class EventLecturer(Base):
     """Связь события и преподавателя."""
@@ -35,12 +46,15 @@ class EventLecturer(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     event_id = Column(Integer, ForeignKey("events.id"), nullable=False, index=True)
-    lecturer_id = Column(Integer, ForeignKey("lecturers.id"), nullable=False, index=True)
+    lecturer_id = Column(Integer, ForeignKey("lecturers.id"), nullable=False)
 
     event = relationship("Event", back_populates="lecturers")
     lecturer = relationship("Lecturer")
 
-    __table_args__ = (UniqueConstraint("event_id", "lecturer_id"),)
+    __table_args__ = (
+        UniqueConstraint("event_id", "lecturer_id"),
+        Index("ix_event_lecturers_lecturer_id_event_id", "lecturer_id", "event_id"),
+    )
 
 
 class EventGroup(Base):
@@ -50,12 +64,15 @@ class EventGroup(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     event_id = Column(Integer, ForeignKey("events.id"), nullable=False, index=True)
-    group_id = Column(Integer, ForeignKey("groups.id"), nullable=False, index=True)
+    group_id = Column(Integer, ForeignKey("groups.id"), nullable=False)
 
     event = relationship("Event", back_populates="groups")
     group = relationship("Group")
 
-    __table_args__ = (UniqueConstraint("event_id", "group_id"),)
+    __table_args__ = (
+        UniqueConstraint("event_id", "group_id"),
+        Index("ix_event_groups_group_id_event_id", "group_id", "event_id"),
+    )
 
 
 class EventSubgroup(Base):
@@ -65,12 +82,15 @@ class EventSubgroup(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     event_id = Column(Integer, ForeignKey("events.id"), nullable=False, index=True)
-    subgroup_id = Column(Integer, ForeignKey("subgroups.id"), nullable=False, index=True)
+    subgroup_id = Column(Integer, ForeignKey("subgroups.id"), nullable=False)
 
     event = relationship("Event", back_populates="subgroups")
     subgroup = relationship("Subgroup")
 
-    __table_args__ = (UniqueConstraint("event_id", "subgroup_id"),)
+    __table_args__ = (
+        UniqueConstraint("event_id", "subgroup_id"),
+        Index("ix_event_subgroups_subgroup_id_event_id", "subgroup_id", "event_id"),
+    )
 
 
 class EventStream(Base):
@@ -80,10 +100,13 @@ class EventStream(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     event_id = Column(Integer, ForeignKey("events.id"), nullable=False, index=True)
-    stream_id = Column(Integer, ForeignKey("streams.id"), nullable=False, index=True)
+    stream_id = Column(Integer, ForeignKey("streams.id"), nullable=False)
 
     event = relationship("Event", back_populates="streams")
     stream = relationship("Stream")
 
-    __table_args__ = (UniqueConstraint("event_id", "stream_id"),)
+    __table_args__ = (
+        UniqueConstraint("event_id", "stream_id"),
+        Index("ix_event_streams_stream_id_event_id", "stream_id", "event_id"),
+    )
 
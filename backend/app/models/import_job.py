@@ -0,0 +1,51 @@
+"""Модель задачи импорта."""
+from sqlalchemy import (
+    Column, Integer, String, Boolean, DateTime, BigInteger, JSON, Enum as SQLEnum
+)
+from sqlalchemy.sql import func
+import enum
+from app.db.session import Base
+
+
+class ImportJobStatus(str, enum.Enum):
+    """Состояние задачи импорта."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ImportJob(Base):
+    """Фоновая задача импорта HTML расписания."""
+
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String, nullable=False)
+    status = Column(
+        SQLEnum(ImportJobStatus), nullable=False, default=ImportJobStatus.PENDING, index=True
+    )
+    # Обновлять только изменившиеся события вместо добавления всех строк
+    differential = Column(Boolean, nullable=False, default=False)
+    # Сохраненный файл (удаляется по завершении задачи)
+    upload_path = Column(String, nullable=True)
+    # Процесс API, выполняющий задачу, и время его последнего сигнала (см. ImportJobService)
+    owner = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    bytes_total = Column(BigInteger, nullable=False, default=0)
+    bytes_processed = Column(BigInteger, nullable=False, default=0)
+    rows_processed = Column(Integer, nullable=False, default=0)
+    events_created = Column(Integer, nullable=False, default=0)
+    events_updated = Column(Integer, nullable=False, default=0)
+    events_cancelled = Column(Integer, nullable=False, default=0)
+    events_unchanged = Column(Integer, nullable=False, default=0)
+    errors_count = Column(Integer, nullable=False, default=0)
+    warnings_count = Column(Integer, nullable=False, default=0)
+    errors = Column(JSON, nullable=True)  # первые ошибки строк (см. ImportJobService)
+    entities_created = Column(JSON, nullable=True)
+    timings = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)  # причина сбоя задачи
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,41 @@
+"""Модель занятости ресурсов."""
+from sqlalchemy import Column, Integer, String, ForeignKey, text
+from sqlalchemy.dialects.postgresql import TSRANGE, ExcludeConstraint
+from app.db.session import Base
+
+# Типы ресурсов, занятость которых защищена ограничением исключения
+OCCUPANCY_KINDS = ("room", "lecturer", "group", "subgroup", "stream")
+
+
+def _exclusion(kind: str) -> ExcludeConstraint:
+    """Запрет пересечения интервалов одного ресурса типа kind.
+
+    Равенство id выражено пересечением одноточечных int4range, поэтому
+    хватает встроенных классов операторов GiST (без btree_gist).
+    """
+    return ExcludeConstraint(
+        (text("int4range(resource_id, resource_id, '[]')"), "&&"),
+        ("period", "&&"),
+        using="gist",
+        where=text(f"resource_kind = '{kind}'"),
+        name=f"excl_event_occupancy_{kind}",
+    )
+
+
+class EventOccupancy(Base):
+    """Занятость ресурса запланированным событием на интервал [начало, конец).
+
+    Строки поддерживает OccupancyService при каждой записи событий.
+    """
+
+    __tablename__ = "event_occupancy"
+
+    id = Column(Integer, primary_key=True)
+    event_id = Column(
+        Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    resource_kind = Column(String, nullable=False)  # room, lecturer, group, subgroup, stream
+    resource_id = Column(Integer, nullable=False)
+    period = Column(TSRANGE, nullable=False)
+
+    __table_args__ = tuple(_exclusion(kind) for kind in OCCUPANCY_KINDS)
@@ -1,5 +1,5 @@
 """Модель временного слота."""
-from sqlalchemy import Column, Integer, Date, String, Time
+from sqlalchemy import Column, Integer, Date, String, Time, Index, UniqueConstraint
 from app.db.session import Base
 
 
@@ -9,9 +9,14 @@ class TimeSlot(Base):
     __tablename__ = "time_slots"
 
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(Date, nullable=False, index=True)
+    date = Column(Date, nullable=False)
     pair_number = Column(Integer, nullable=False)  # 1-8
     time_start = Column(Time, nullable=False)
     time_end = Column(Time, nullable=False)
     timezone = Column(String, default="Europe/Moscow", nullable=False)
 
+    __table_args__ = (
+        UniqueConstraint("date", "pair_number", name="uq_time_slots_date_pair_number"),
+        # Фильтр расписания по датам с сортировкой по началу пары
+        Index("ix_time_slots_date_time", "date", "time_start", "time_end"),
+    )
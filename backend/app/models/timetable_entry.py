@@ -0,0 +1,59 @@
+"""Модель денормализованного расписания."""
+from sqlalchemy import Column, Integer, String, Date, Time, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import ARRAY
+from app.db.session import Base
+
+
+class TimetableEntry(Base):
+    """Запланированное событие со всеми полями для отображения в одной строке.
+
+    Модель чтения расписания: связи события хранятся массивами id и
+    подписей, поэтому выдача расписания не делает JOIN. Строки
+    поддерживает TimetableEntryService при каждой записи событий;
+    отмененных событий в таблице нет.
+    """
+
+    __tablename__ = "timetable_entries"
+
+    event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
+    note = Column(String, nullable=True)
+    # В таблице только запланированные события (как поле status у EventRecord)
+    status = "scheduled"
+
+    time_slot_id = Column(Integer, nullable=False)
+    date = Column(Date, nullable=False)
+    pair_number = Column(Integer, nullable=False)
+    time_start = Column(Time, nullable=False)
+    time_end = Column(Time, nullable=False)
+
+    discipline_id = Column(Integer, nullable=False)
+    discipline_name = Column(String, nullable=False)
+    work_kind_id = Column(Integer, nullable=False)
+    work_kind_name = Column(String, nullable=False)
+    work_kind_color_hex = Column(String, nullable=False)
+    room_id = Column(Integer, nullable=False)
+    room_number = Column(String, nullable=False)
+    building_id = Column(Integer, nullable=False)
+    building_name = Column(String, nullable=False)
+    building_address = Column(String, nullable=False)
+
+    # Связи в порядке их создания: id и подписи с одинаковыми индексами
+    lecturer_ids = Column(ARRAY(Integer), nullable=False)
+    lecturer_fios = Column(ARRAY(String), nullable=False)
+    group_ids = Column(ARRAY(Integer), nullable=False)
+    group_codes = Column(ARRAY(String), nullable=False)
+    subgroup_ids = Column(ARRAY(Integer), nullable=False)
+    subgroup_codes = Column(ARRAY(String), nullable=False)
+    stream_ids = Column(ARRAY(Integer), nullable=False)
+    stream_names = Column(ARRAY(String), nullable=False)
+
+    __table_args__ = (
+        # Порядок расписания и ключ keyset-пагинации
+        Index("ix_timetable_entries_date_time_start_event_id", "date", "time_start", "event_id"),
+        Index("ix_timetable_entries_room_id_date", "room_id", "date"),
+        Index("ix_timetable_entries_building_id_date", "building_id", "date"),
+        # Фильтры по ресурсам из массивов: group_ids @> ARRAY[id]
+        Index("ix_timetable_entries_lecturer_ids", "lecturer_ids", postgresql_using="gin"),
+        Index("ix_timetable_entries_group_ids", "group_ids", postgresql_using="gin"),
+        Index("ix_timetable_entries_stream_ids", "stream_ids", postgresql_using="gin"),
+    )
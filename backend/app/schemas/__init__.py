@@ -13,13 +13,20 @@ from app.schemas.event import (
     EventCreate,
     EventUpdate,
     EventDetail,
+    EventBulkCreate,
+    EventBulkItemResult,
+    EventBulkResult,
     EventLecturer,
     EventGroup,
     EventSubgroup,
     EventStream,
+    TimetableCompact,
+    TimetableCompactEvents,
 )
 from app.schemas.change_log import ChangeLog, ChangeLogFilter
+from app.schemas.conflict import ConflictReportItem
 from app.schemas.calendar import CalendarSubscription, CalendarSubscriptionCreate
+from app.schemas.import_job import ImportJob
 from app.schemas.user import User, UserCreate, UserLogin, UserResponse, Token
 from app.schemas.favorite import Favorite, FavoriteCreate
 from app.schemas.notification import Notification, NotificationSettings, NotificationSettingsUpdate
@@ -53,14 +60,21 @@ __all__ = [
     "EventCreate",
     "EventUpdate",
     "EventDetail",
+    "EventBulkCreate",
+    "EventBulkItemResult",
+    "EventBulkResult",
     "EventLecturer",
     "EventGroup",
     "EventSubgroup",
     "EventStream",
+    "TimetableCompact",
+    "TimetableCompactEvents",
     "ChangeLog",
     "ChangeLogFilter",
+    "ConflictReportItem",
     "CalendarSubscription",
     "CalendarSubscriptionCreate",
+    "ImportJob",
     "User",
     "UserCreate",
     "UserLogin",
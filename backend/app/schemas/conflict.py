@@ -0,0 +1,13 @@
+"""Схемы для отчета о конфликтах."""
+from pydantic import BaseModel
+from typing import List
+from datetime import date
+
+
+class ConflictReportItem(BaseModel):
+    """Конфликт двух событий по одному ресурсу."""
+    conflict_type: str  # room_conflict, lecturer_conflict, group_conflict, ...
+    resource_kind: str  # room, lecturer, group, subgroup, stream
+    resource_id: int
+    date: date
+    event_ids: List[int]
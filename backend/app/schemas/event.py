@@ -1,5 +1,5 @@
 """Схемы для событий."""
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import date, time
 
@@ -80,7 +80,61 @@ class EventDetail(Event):
     groups: List[dict] = []
     subgroups: List[dict] = []
     streams: List[dict] = []
+    has_conflict: bool = False
+    conflicting_event_ids: List[int] = []
 
     class Config:
         from_attributes = True
 
+
+class EventBulkCreate(BaseModel):
+    """Пакет событий для создания."""
+    events: List[EventCreate] = Field(..., min_length=1, max_length=1000)
+    reason: Optional[str] = None  # Для ChangeLog, если не указан у события
+    atomic: bool = False  # Не создавать ничего, если хотя бы одно событие не прошло проверку
+
+
+class EventBulkItemResult(BaseModel):
+    index: int
+    status: str  # created, rejected, skipped
+    event_id: Optional[int] = None
+    errors: List[str] = []
+
+
+class EventBulkResult(BaseModel):
+    created: int
+    rejected: int
+    results: List[EventBulkItemResult]
+
+
+class TimetableCompactEvents(BaseModel):
+    """События компактного расписания по столбцам: i-е значения всех списков — одно событие."""
+    id: List[int] = []
+    discipline_id: List[int] = []
+    work_kind_id: List[int] = []
+    room_id: List[int] = []
+    time_slot_id: List[int] = []
+    status: List[str] = []
+    note: List[Optional[str]] = []
+    lecturer_ids: List[List[int]] = []
+    group_ids: List[List[int]] = []
+    subgroup_ids: List[List[int]] = []
+    stream_ids: List[List[int]] = []
+    conflicting_event_ids: List[List[int]] = []
+
+
+class TimetableCompact(BaseModel):
+    """Нормализованное расписание (format=compact).
+
+    Каждая связанная сущность передается один раз, события ссылаются на нее по id.
+    """
+    disciplines: List[dict] = []
+    work_kinds: List[dict] = []
+    rooms: List[dict] = []  # building_id вместо вложенного корпуса
+    buildings: List[dict] = []
+    time_slots: List[dict] = []
+    lecturers: List[dict] = []
+    groups: List[dict] = []
+    subgroups: List[dict] = []
+    streams: List[dict] = []
+    events: TimetableCompactEvents = TimetableCompactEvents()
@@ -0,0 +1,34 @@
+"""Схемы для задач импорта."""
+from pydantic import BaseModel
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+from app.models.import_job import ImportJobStatus
+
+
+class ImportJob(BaseModel):
+    id: int
+    filename: str
+    status: ImportJobStatus
+    differential: bool
+    bytes_total: int
+    bytes_processed: int
+    rows_processed: int
+    events_created: int
+    events_updated: int
+    events_cancelled: int
+    events_unchanged: int
+    errors_count: int
+    warnings_count: int
+    errors: Optional[List[Dict[str, Any]]] = None
+    entities_created: Optional[Dict[str, int]] = None
+    timings: Optional[Dict[str, float]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Скорость и оценка окончания по уже обработанной части файла
+    rows_per_second: Optional[float] = None
+    eta_seconds: Optional[float] = None
+
+    class Config:
+        from_attributes = True
@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from datetime import date, time
 from app.models import Event, TimeSlot
 from app.models.event import EventLecturer, EventGroup, EventSubgroup, EventStream
+from app.services.occupancy import OccupancyService
+from app.services.timetable_entries import TimetableEntryService
 
 
 def seed_events(
@@ -343,5 +345,8 @@ def seed_events(
             events.append(evt)
 
     db.flush()
+    event_ids = [event.id for event in events]
+    OccupancyService.sync(db, event_ids, strict=False)
+    TimetableEntryService.sync(db, event_ids)
     return events
 
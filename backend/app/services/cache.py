@@ -1,66 +1,544 @@
 """Сервис кэширования Redis."""
 import redis
+import hashlib
+import inspect
 import json
-from typing import Optional, Any
+import math
+import random
+import secrets
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import date
+from typing import Optional, Any, Callable, Dict, Iterable, List, Sequence, Set, Tuple, Union
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
 from app.core.config import settings
 from functools import wraps
 
+# Снятие блокировки только ее владельцем
+_UNLOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class LocalCache:
+    """Ограниченный LRU кэш процесса с TTL (первый уровень перед Redis)."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evictions = 0
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """(найдено, значение)."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return False, None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
 
 class CacheService:
-    """Сервис кэширования."""
+    """Сервис кэширования.
+
+    Двухуровневый кэш: LRU процесса (короткий TTL, см. CACHE_LOCAL_*)
+    перед Redis. Изменения из других процессов видны не позже чем
+    через CACHE_LOCAL_TTL секунд.
+    """
 
     def __init__(self):
         self.redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        # Клиент для значений в байтах (cache_result: msgpack, сжатие)
+        self.binary_client = redis.from_url(settings.REDIS_URL)
+        self.local = LocalCache(
+            maxsize=settings.CACHE_LOCAL_MAXSIZE if settings.CACHE_LOCAL_ENABLED else 0,
+            ttl=settings.CACHE_LOCAL_TTL,
+        )
+        self._unlock = self.redis_client.register_script(_UNLOCK_SCRIPT)
+        self._stats: Dict[str, int] = {
+            "local_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "early_refreshes": 0,
+            "lock_waits": 0,
+        }
+        self._stats_lock = threading.Lock()
+        self._flights: Dict[str, threading.Lock] = {}
+        self._flights_lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики попаданий, промахов и вытеснений."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["local_evictions"] = self.local.evictions
+        stats["local_size"] = len(self.local)
+        return stats
 
     def get(self, key: str) -> Optional[Any]:
         """Получение значения из кэша."""
-        value = self.redis_client.get(key)
-        if value:
-            return json.loads(value)
-        return None
+        found, value = self.local.get(key)
+        if found:
+            self._count("local_hits")
+            return value
+        raw = self.redis_client.get(key)
+        if raw is None:
+            self._count("misses")
+            return None
+        self._count("redis_hits")
+        value = json.loads(raw)
+        self.local.set(key, value)
+        return value
 
     def set(self, key: str, value: Any, ttl: int = 3600) -> bool:
         """Установка значения в кэш."""
+        self.local.set(key, value, ttl)
         return self.redis_client.setex(key, ttl, json.dumps(value))
 
     def delete(self, key: str) -> bool:
         """Удаление ключа из кэша."""
+        self.local.delete(key)
         return bool(self.redis_client.delete(key))
 
-    def delete_pattern(self, pattern: str) -> int:
-        """Удаление ключей по паттерну."""
-        keys = self.redis_client.keys(pattern)
-        if keys:
-            return self.redis_client.delete(*keys)
-        return 0
+    def delete_pattern(self, pattern: str, batch_size: int = 1000) -> int:
+        """Удаление ключей по паттерну.
+
+        Ключи перебираются через SCAN и удаляются пачками через UNLINK,
+        поэтому Redis не блокируется на время обхода всего пространства ключей.
+        """
+        deleted = 0
+        batch = []
+        for key in self.redis_client.scan_iter(match=pattern, count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                self.local.delete(*batch)
+                deleted += self.redis_client.unlink(*batch)
+                batch = []
+        if batch:
+            self.local.delete(*batch)
+            deleted += self.redis_client.unlink(*batch)
+        return deleted
+
+    @staticmethod
+    def _delta_key(key: str) -> str:
+        return f"cache:delta:{key}"
+
+    @staticmethod
+    def _lock_key(key: str) -> str:
+        return f"cache:lock:{key}"
+
+    def get_or_set(
+        self,
+        key: str,
+        producer: Callable[[], Any],
+        ttl: int = 3600,
+        tags: Optional[Iterable[str]] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        encode: Callable[[Any], Any] = json.dumps,
+        decode: Callable[[bytes], Any] = json.loads,
+    ) -> Any:
+        """Значение из кэша или результат producer() с защитой от dog-pile.
+
+        Пересчет выполняет один запрос: внутри процесса — под блокировкой
+        ключа, между процессами — под блокировкой в Redis. Остальные ждут
+        результат. Незадолго до истечения TTL значение вероятностно
+        пересчитывается заранее (XFetch): чем дороже пересчет, тем раньше.
+        При tags запись регистрируется в тегах (см. set_tagged).
+        encode/decode — преобразование значения в str/bytes для Redis и обратно.
+        """
+        found, value = self.local.get(key)
+        if found:
+            self._count("local_hits")
+            return value
+
+        value, fresh = self._read_for_refresh(key, decode)
+        if fresh:
+            return value
+
+        with self._flight_lock(key):
+            # Пока ждали блокировку, значение мог пересчитать другой поток
+            found, local_value = self.local.get(key)
+            if found:
+                self._count("local_hits")
+                return local_value
+
+            token = secrets.token_hex(8)
+            lock_key = self._lock_key(key)
+            lock_ms = int(settings.CACHE_LOCK_TIMEOUT * 1000)
+            if not self.redis_client.set(lock_key, token, nx=True, px=lock_ms):
+                if value is not None:
+                    # Пересчет уже идет в другом процессе — отдаем текущее значение
+                    return value
+                waited = self._wait_for(key, decode)
+                if waited is not None:
+                    return waited
+            try:
+                started = time.perf_counter()
+                value = producer()
+                delta = time.perf_counter() - started
+                self.set_raw(key, encode(value), value, ttl, tags, date_from, date_to)
+                self.redis_client.setex(self._delta_key(key), ttl, f"{delta:.6f}")
+            finally:
+                self._unlock(keys=[lock_key], args=[token])
+            return value
+
+    def _read_for_refresh(
+        self, key: str, decode: Callable[[bytes], Any]
+    ) -> Tuple[Optional[Any], bool]:
+        """(значение из Redis, можно ли его отдать без пересчета)."""
+        pipe = self.binary_client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.pttl(key)
+        pipe.get(self._delta_key(key))
+        raw, pttl, delta = pipe.execute()
+        if raw is None:
+            self._count("misses")
+            return None, False
+
+        value = decode(raw)
+        if delta and pttl and pttl > 0:
+            # XFetch: пересчет раньше срока с вероятностью, растущей к концу TTL
+            beta = settings.CACHE_EARLY_REFRESH_BETA
+            jitter = float(delta) * beta * -math.log(1.0 - random.random())
+            if pttl / 1000 - jitter <= 0:
+                self._count("early_refreshes")
+                return value, False
+
+        self._count("redis_hits")
+        self.local.set(key, value, pttl / 1000 if pttl and pttl > 0 else None)
+        return value, True
+
+    def _flight_lock(self, key: str) -> threading.Lock:
+        """Блокировка пересчета ключа внутри процесса."""
+        with self._flights_lock:
+            lock = self._flights.get(key)
+            if lock is None:
+                if len(self._flights) > 10000:
+                    self._flights = {k: v for k, v in self._flights.items() if v.locked()}
+                lock = self._flights[key] = threading.Lock()
+            return lock
+
+    def _wait_for(self, key: str, decode: Callable[[bytes], Any]) -> Optional[Any]:
+        """Ожидание значения, которое пересчитывает другой процесс."""
+        self._count("lock_waits")
+        deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            raw = self.binary_client.get(key)
+            if raw is not None:
+                value = decode(raw)
+                self.local.set(key, value)
+                return value
+            if not self.redis_client.exists(self._lock_key(key)):
+                break
+        return None
+
+    # Тег записей, не привязанных к конкретному ресурсу (например, расписание без фильтров)
+    ALL_TAG = "all"
+    # Время жизни множеств тегов: не меньше TTL любой тегированной записи
+    TAG_TTL = 24 * 3600
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"cache:tag:{tag}"
+
+    @staticmethod
+    def _dates_key(key: str) -> str:
+        return f"cache:dates:{key}"
+
+    def set_tagged(
+        self,
+        key: str,
+        value: Any,
+        ttl: int,
+        tags: Iterable[str],
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> None:
+        """Установка значения, зависящего от ресурсов (тегов) и диапазона дат.
+
+        Запись будет удалена invalidate_tags, если изменения затронут
+        хотя бы один из ее тегов внутри ее диапазона дат.
+        """
+        self.set_raw(key, json.dumps(value), value, ttl, tags, date_from, date_to)
+
+    def _add_tags(
+        self,
+        pipe,
+        key: str,
+        ttl: int,
+        tags: Iterable[str],
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> None:
+        """Регистрация ключа в множествах тегов (в составе pipeline)."""
+        date_range = "|".join(day.isoformat() if day else "" for day in (date_from, date_to))
+        pipe.setex(self._dates_key(key), ttl, date_range)
+        for tag in set(tags) or {self.ALL_TAG}:
+            pipe.sadd(self._tag_key(tag), key)
+            pipe.expire(self._tag_key(tag), self.TAG_TTL)
 
-    def invalidate_timetable_cache(self):
-        """Инвалидация кэша расписания."""
-        self.delete_pattern("timetable:*")
-        self.delete_pattern("calendar:*")
+    def get_raw(self, key: str, decode: Callable[[bytes], Any]) -> Optional[Any]:
+        """Получение значения, сохраненного set_raw, с декодированием байтов."""
+        found, value = self.local.get(key)
+        if found:
+            self._count("local_hits")
+            return value
+        data = self.binary_client.get(key)
+        if data is None:
+            self._count("misses")
+            return None
+        self._count("redis_hits")
+        value = decode(data)
+        self.local.set(key, value)
+        return value
+
+    def set_raw(
+        self,
+        key: str,
+        data: bytes,
+        value: Any,
+        ttl: int,
+        tags: Optional[Iterable[str]] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> None:
+        """Установка закодированного значения (value — его исходный вид для LRU процесса).
+
+        При tags запись регистрируется в тегах, как в set_tagged.
+        """
+        pipe = self.binary_client.pipeline(transaction=False)
+        pipe.setex(key, ttl, data)
+        if tags is not None:
+            self._add_tags(pipe, key, ttl, tags, date_from, date_to)
+        pipe.execute()
+        self.local.set(key, value, ttl)
+
+    @staticmethod
+    def _range_matches(date_range: str, dates: Set[str]) -> bool:
+        """Пересекается ли диапазон 'from|to' (ISO, концы могут быть пустыми) с датами."""
+        date_from, _, date_to = date_range.partition("|")
+        return any(
+            (not date_from or day >= date_from) and (not date_to or day <= date_to)
+            for day in dates
+        )
+
+    def invalidate_tags(
+        self,
+        tags: Iterable[str],
+        dates: Optional[Iterable[date]] = None,
+        include_all: bool = True,
+    ) -> int:
+        """Удаление записей, чьи теги пересекаются с tags, а диапазон дат — с dates.
+
+        dates=None означает изменение без известной даты: удаляются все
+        записи с пересекающимися тегами. Записи с тегом ALL_TAG
+        затрагиваются любым изменением событий (include_all).
+        """
+        tags = set(tags) | {self.ALL_TAG} if include_all else set(tags)
+        if not tags:
+            return 0
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        keys = list(self.redis_client.sunion(tag_keys))
+        if not keys:
+            return 0
+
+        day_strings = {day.isoformat() for day in dates} if dates is not None else None
+        date_ranges = self.redis_client.mget([self._dates_key(key) for key in keys])
+        to_delete: List[str] = []
+        expired: List[str] = []
+        for key, date_range in zip(keys, date_ranges):
+            if date_range is None:
+                expired.append(key)
+            elif day_strings is None or self._range_matches(date_range, day_strings):
+                to_delete.append(key)
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        if to_delete:
+            self.local.delete(*to_delete)
+            pipe.unlink(*to_delete, *[self._dates_key(key) for key in to_delete])
+        if to_delete or expired:
+            for tag_key in tag_keys:
+                pipe.srem(tag_key, *to_delete, *expired)
+        pipe.execute()
+        return len(to_delete)
 
 
 # Глобальный экземпляр
 cache_service = CacheService()
 
 
-def cache_result(key_prefix: str, ttl: int = 3600):
-    """Декоратор для кэширования результатов функции."""
+class Serializer:
+    """Сериализатор значений кэша в байты."""
+
+    def __init__(self, name: str, dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any]):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+
+def _json_serializer() -> Serializer:
+    return Serializer(
+        "json",
+        lambda value: json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode(),
+        json.loads,
+    )
+
+
+def _orjson_serializer() -> Serializer:
+    import orjson
+
+    return Serializer("orjson", orjson.dumps, orjson.loads)
+
+
+def _msgpack_serializer() -> Serializer:
+    import msgpack
+
+    return Serializer(
+        "msgpack",
+        lambda value: msgpack.packb(value, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False),
+    )
+
+
+# orjson и msgpack не входят в обязательные зависимости
+SERIALIZERS: Dict[str, Callable[[], Serializer]] = {
+    "json": _json_serializer,
+    "orjson": _orjson_serializer,
+    "msgpack": _msgpack_serializer,
+}
+
+# Префиксы закодированного значения: без сжатия / zlib
+_RAW = b"r"
+_ZLIB = b"z"
+
+
+def get_serializer(name: str) -> Serializer:
+    """Сериализатор по имени (ValueError, если неизвестен или не установлен)."""
+    factory = SERIALIZERS.get(name)
+    if factory is None:
+        raise ValueError(f"Неизвестный сериализатор кэша: {name}")
+    try:
+        return factory()
+    except ImportError as e:
+        raise ValueError(f"Сериализатор кэша {name} недоступен: {e}") from e
+
+
+def encode_value(value: Any, serializer: Serializer, compress_min_bytes: int) -> bytes:
+    """Сериализация со сжатием zlib значений не меньше compress_min_bytes."""
+    data = serializer.dumps(value)
+    if compress_min_bytes and len(data) >= compress_min_bytes:
+        return _ZLIB + zlib.compress(data)
+    return _RAW + data
+
+
+def decode_value(data: bytes, serializer: Serializer) -> Any:
+    """Обратное преобразование encode_value."""
+    if data[:1] == _ZLIB:
+        return serializer.loads(zlib.decompress(data[1:]))
+    return serializer.loads(data[1:])
+
+
+def make_cache_key(key_prefix: str, arguments: Dict[str, Any]) -> str:
+    """Детерминированный ключ: одинаковый во всех процессах и после перезапуска."""
+    canonical = json.dumps(arguments, sort_keys=True, default=str, separators=(",", ":"))
+    digest = hashlib.sha256(canonical.encode()).hexdigest()[:32]
+    return f"{key_prefix}:{digest}"
+
+
+def cache_result(
+    key_prefix: str,
+    ttl: int = 3600,
+    key_args: Optional[Sequence[str]] = None,
+    schema: Any = None,
+    serializer: str = "json",
+    tags: Union[Iterable[str], Callable[..., Iterable[str]], None] = None,
+    compress_min_bytes: Optional[int] = None,
+):
+    """Декоратор для кэширования результатов функции.
+
+    Ключ строится из значений аргументов key_args (по умолчанию — всех,
+    кроме сессии БД) и не зависит от процесса. schema — тип результата
+    (например, List[Building]): ORM объекты приводятся к JSON-совместимому
+    виду через TypeAdapter до сериализации. tags — теги для
+    cache_service.invalidate_tags (список или функция от аргументов).
+    """
+    codec = get_serializer(serializer)
+    adapter = TypeAdapter(schema) if schema is not None else None
+    min_bytes = (
+        settings.CACHE_COMPRESS_MIN_BYTES if compress_min_bytes is None else compress_min_bytes
+    )
 
     def decorator(func):
+        signature = inspect.signature(func)
+        if key_args is not None:
+            names = list(key_args)
+        else:
+            names = [
+                name
+                for name, param in signature.parameters.items()
+                if param.annotation is not Session and name != "db"
+            ]
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Создаем ключ кэша из аргументов
-            cache_key = f"{key_prefix}:{hash(str(args) + str(kwargs))}"
-            cached = cache_service.get(cache_key)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {name: bound.arguments.get(name) for name in names}
+            cache_key = make_cache_key(f"{key_prefix}:{codec.name}", arguments)
+
+            cached = cache_service.get_raw(cache_key, lambda data: decode_value(data, codec))
             if cached is not None:
                 return cached
 
             result = func(*args, **kwargs)
-            cache_service.set(cache_key, result, ttl)
+            if adapter is not None:
+                result = adapter.dump_python(result, mode="json")
+            entry_tags = tags(**arguments) if callable(tags) else tags
+            cache_service.set_raw(
+                cache_key, encode_value(result, codec, min_bytes), result, ttl, entry_tags
+            )
             return result
 
         return wrapper
 
     return decorator
-
@@ -0,0 +1,107 @@
+"""Теги зависимостей кэша расписания."""
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from app.models import Room, TimeSlot
+from app.services.cache import cache_service
+from app.services.calendar_feed import CalendarFeedService
+
+
+class CacheTagService:
+    """Теги кэшированных выборок и событий.
+
+    Запись кэша помечается ресурсами, по которым отфильтрована выборка
+    (group:5, lecturer:3, ...). Изменение события затрагивает теги всех
+    ресурсов события до и после изменения.
+    """
+
+    @staticmethod
+    def for_filters(
+        group_id: Optional[int] = None,
+        lecturer_id: Optional[int] = None,
+        room_id: Optional[int] = None,
+        building_id: Optional[int] = None,
+        stream_id: Optional[int] = None,
+    ) -> List[str]:
+        """Теги выборки по фильтрам (пустой список — выборка зависит от всех событий)."""
+        filters = (
+            ("group", group_id),
+            ("lecturer", lecturer_id),
+            ("room", room_id),
+            ("building", building_id),
+            ("stream", stream_id),
+        )
+        return [f"{kind}:{value}" for kind, value in filters if value]
+
+    @staticmethod
+    def for_event_states(
+        db: Session,
+        states: Iterable[Optional[Dict[str, Any]]],
+        event_ids: Iterable[int] = (),
+    ) -> Tuple[Set[str], Optional[Set[date]]]:
+        """Теги и даты, затронутые изменением событий.
+
+        states — состояния в формате ChangeLogService.get_event_state
+        (до и после изменения), event_ids — id уже существовавших событий
+        (их карточки тоже устаревают). Корпуса и даты дозагружаются двумя запросами.
+        Если дата какого-либо события неизвестна, вместо множества дат
+        возвращается None.
+        """
+        states = [state for state in states if state]
+        tags: Set[str] = {CacheTagService.for_event(event_id) for event_id in event_ids}
+        for state in states:
+            tags.update(f"group:{i}" for i in state.get("group_ids", []))
+            tags.update(f"lecturer:{i}" for i in state.get("lecturer_ids", []))
+            tags.update(f"stream:{i}" for i in state.get("stream_ids", []))
+            if state.get("room_id"):
+                tags.add(f"room:{state['room_id']}")
+
+        room_ids = {state["room_id"] for state in states if state.get("room_id")}
+        if room_ids:
+            tags.update(
+                f"building:{building_id}"
+                for (building_id,) in db.query(Room.building_id).filter(Room.id.in_(room_ids))
+            )
+
+        time_slot_ids = {state.get("time_slot_id") for state in states}
+        dates: Optional[Set[date]] = None
+        if time_slot_ids and None not in time_slot_ids:
+            rows = db.query(TimeSlot.id, TimeSlot.date).filter(TimeSlot.id.in_(time_slot_ids))
+            slot_dates = dict(rows.all())
+            if len(slot_dates) == len(time_slot_ids):
+                dates = set(slot_dates.values())
+        return tags, dates
+
+    @staticmethod
+    def for_event(event_id: int) -> str:
+        """Тег кэшированной карточки события."""
+        return f"event:{event_id}"
+
+    @staticmethod
+    def invalidate_event_states(
+        db: Session,
+        states: Iterable[Optional[Dict[str, Any]]],
+        event_ids: Iterable[int] = (),
+    ) -> int:
+        """Инвалидация записей кэша, зависящих от изменившихся событий.
+
+        Затронутые ленты подписок отмечаются для фоновой пересборки.
+        """
+        states = [state for state in states if state]
+        if not states:
+            return 0
+        tags, dates = CacheTagService.for_event_states(db, states, event_ids)
+        CalendarFeedService.mark_dirty(tags)
+        return cache_service.invalidate_tags(tags, dates)
+
+    @staticmethod
+    def reference(name: str) -> str:
+        """Тег кэшированных списков справочника (buildings, rooms, ...)."""
+        return f"reference:{name}"
+
+    @staticmethod
+    def invalidate_reference(*names: str) -> int:
+        """Инвалидация кэшированных списков справочников после их изменения."""
+        return cache_service.invalidate_tags(
+            [CacheTagService.reference(name) for name in names], include_all=False
+        )
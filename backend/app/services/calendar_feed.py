@@ -0,0 +1,209 @@
+"""Ленты подписок на календарь: индекс токенов и готовые снимки ICS."""
+import logging
+import threading
+import time
+from datetime import timezone
+from email.utils import format_datetime
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.calendar_subscription import CalendarSubscription, FilterKind
+from app.services.cache import cache_service
+from app.services.ics import ICSService
+
+logger = logging.getLogger(__name__)
+
+# Лента подписки: (тип фильтра, id)
+FeedKey = Tuple[str, int]
+# Снимок ленты: (ETag, Last-Modified в формате HTTP или "", ICS)
+FeedSnapshot = Tuple[str, str, bytes]
+
+# Снимок живет, пока его обновляет фоновый процесс; TTL — страховка от забытых лент
+SNAPSHOT_TTL = 7 * 24 * 3600
+# Множество лент, затронутых изменениями событий и ожидающих пересборки
+DIRTY_KEY = "calendar:feed:dirty"
+# Сколько отмеченных лент забирается из Redis за раз
+REFRESH_BATCH_SIZE = 100
+
+
+def _encode(snapshot: FeedSnapshot) -> bytes:
+    etag, last_modified, body = snapshot
+    return f"{etag}\n{last_modified}\n".encode() + body
+
+
+def _decode(data: bytes) -> FeedSnapshot:
+    etag, last_modified, body = data.split(b"\n", 2)
+    return etag.decode(), last_modified.decode(), body
+
+
+class SubscriptionIndex:
+    """Токены активных подписок в памяти процесса.
+
+    Индекс целиком перечитывается из БД раз в CALENDAR_TOKEN_INDEX_TTL
+    секунд. Неизвестный токен (например, подписка создана другим
+    процессом) ищется в БД отдельным запросом; ненайденные токены
+    запоминаются до следующей перезагрузки индекса.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._feeds: Dict[str, FeedKey] = {}
+        self._unknown: Set[str] = set()
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def resolve(self, db: Session, token: str) -> Optional[FeedKey]:
+        """Лента подписки по токену или None."""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            self.reload(db)
+        feed = self._feeds.get(token)
+        if feed is not None or token in self._unknown:
+            return feed
+
+        subscription = (
+            db.query(CalendarSubscription.filter_kind, CalendarSubscription.filter_id)
+            .filter(CalendarSubscription.token == token, CalendarSubscription.active == True)
+            .first()
+        )
+        with self._lock:
+            if subscription is None:
+                self._unknown.add(token)
+                return None
+            feed = self._feeds[token] = (subscription.filter_kind.value, subscription.filter_id)
+        return feed
+
+    def add(self, token: str, filter_kind: FilterKind, filter_id: int) -> None:
+        """Регистрация новой подписки без перезагрузки индекса."""
+        with self._lock:
+            self._feeds[token] = (filter_kind.value, filter_id)
+            self._unknown.discard(token)
+
+    def reload(self, db: Session) -> None:
+        """Перечитывание всех активных подписок одним запросом."""
+        rows = db.query(
+            CalendarSubscription.token,
+            CalendarSubscription.filter_kind,
+            CalendarSubscription.filter_id,
+        ).filter(CalendarSubscription.active == True)
+        feeds = {token: (kind.value, filter_id) for token, kind, filter_id in rows}
+        with self._lock:
+            self._feeds = feeds
+            self._unknown = set()
+            self._loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._feeds)
+
+
+subscription_index = SubscriptionIndex(settings.CALENDAR_TOKEN_INDEX_TTL)
+
+
+class CalendarFeedService:
+    """Готовые снимки лент подписок.
+
+    Снимок хранится в Redis и отдается без обращения к Postgres.
+    Изменения событий отмечают затронутые ленты (mark_dirty), фоновый
+    процесс пересобирает их снимки (refresh_dirty). До пересборки
+    подписчики получают предыдущий снимок.
+    """
+
+    @staticmethod
+    def snapshot_key(feed: FeedKey) -> str:
+        kind, filter_id = feed
+        return f"calendar:feed:{kind}:{filter_id}"
+
+    @staticmethod
+    def build_snapshot(db: Session, feed: FeedKey) -> FeedSnapshot:
+        """Генерация ICS ленты вместе с ее ETag и Last-Modified."""
+        kind, filter_id = feed
+        filters = {f"{kind}_id": filter_id}
+        etag, last_modified = ICSService.feed_version(db, **filters)
+        body = "".join(ICSService.iter_ics(db, **filters)).encode()
+        http_date = (
+            format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+            if last_modified is not None
+            else ""
+        )
+        return etag, http_date, body
+
+    @staticmethod
+    def get_snapshot(db: Session, feed: FeedKey) -> FeedSnapshot:
+        """Снимок ленты; при его отсутствии — сборка (один процесс на ленту)."""
+        return cache_service.get_or_set(
+            CalendarFeedService.snapshot_key(feed),
+            lambda: CalendarFeedService.build_snapshot(db, feed),
+            ttl=SNAPSHOT_TTL,
+            encode=_encode,
+            decode=_decode,
+        )
+
+    @staticmethod
+    def mark_dirty(tags: Iterable[str]) -> None:
+        """Отметка лент, зависящих от тегов group:/lecturer:/stream:."""
+        kinds = tuple(f"{kind.value}:" for kind in FilterKind)
+        feeds = [tag for tag in tags if tag.startswith(kinds)]
+        if feeds:
+            cache_service.redis_client.sadd(DIRTY_KEY, *feeds)
+
+    @staticmethod
+    def refresh_dirty(db: Session, batch_size: int = REFRESH_BATCH_SIZE) -> int:
+        """Пересборка снимков всех отмеченных лент порциями по batch_size.
+
+        SPOP атомарен, поэтому при нескольких процессах каждую ленту
+        пересобирает один из них. Ленты без снимка (на них никто не
+        подписан или их еще не запрашивали) пропускаются. Возвращает
+        число пересобранных снимков.
+        """
+        client = cache_service.redis_client
+        refreshed = 0
+        while True:
+            tags = client.spop(DIRTY_KEY, batch_size)
+            if not tags:
+                break
+            for tag in tags:
+                kind, filter_id = tag.split(":", 1)
+                feed = (kind, int(filter_id))
+                key = CalendarFeedService.snapshot_key(feed)
+                if not client.exists(key):
+                    continue
+                snapshot = CalendarFeedService.build_snapshot(db, feed)
+                cache_service.set_raw(key, _encode(snapshot), snapshot, SNAPSHOT_TTL)
+                db.expunge_all()
+                refreshed += 1
+        return refreshed
+
+
+class CalendarFeedRefresher:
+    """Фоновый поток, пересобирающий отмеченные ленты раз в interval секунд."""
+
+    def __init__(self, session_factory: Callable[[], Session], interval: float):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="calendar-feed-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                db = self.session_factory()
+                try:
+                    CalendarFeedService.refresh_dirty(db)
+                finally:
+                    db.close()
+            except Exception:
+                logger.exception("Ошибка пересборки лент календаря")
@@ -1,6 +1,7 @@
 """Сервис журнала изменений."""
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from app.models import ChangeLog, Event
 from datetime import datetime
 import json
@@ -41,6 +42,55 @@ class ChangeLogService:
         db.refresh(change_log)
         return change_log
 
+    @staticmethod
+    def log_event_changes(
+        db: Session,
+        changes: List[Dict[str, Any]],
+        source: str = "api",
+    ) -> None:
+        """Пакетная запись изменений событий одним INSERT.
+
+        changes: словари с ключами event_id, actor, reason, diff_before, diff_after.
+        Коммит остается за вызывающим кодом.
+        """
+        if not changes:
+            return
+        db.execute(
+            insert(ChangeLog),
+            [
+                {
+                    "entity": "event",
+                    "entity_id": change["event_id"],
+                    "actor": change.get("actor"),
+                    "reason": change.get("reason"),
+                    "diff_before": change.get("diff_before"),
+                    "diff_after": change.get("diff_after"),
+                    "source": source,
+                }
+                for change in changes
+            ],
+        )
+
+    @staticmethod
+    def event_revisions(db: Session, event_ids: Iterable[int]) -> Dict[int, Tuple[int, datetime]]:
+        """Номер ревизии и время последнего изменения событий по журналу.
+
+        Ревизия — число изменений после создания (SEQUENCE в ICS).
+        События без записей в журнале в результат не попадают.
+        """
+        event_ids = list(event_ids)
+        if not event_ids:
+            return {}
+        rows = (
+            db.query(ChangeLog.entity_id, func.count(ChangeLog.id), func.max(ChangeLog.change_at))
+            .filter(ChangeLog.entity == "event", ChangeLog.entity_id.in_(event_ids))
+            .group_by(ChangeLog.entity_id)
+        )
+        return {
+            event_id: (max(changes - 1, 0), last_change)
+            for event_id, changes, last_change in rows
+        }
+
     @staticmethod
     def get_event_state(db: Session, event_id: int) -> Optional[Dict[str, Any]]:
         """Получение текущего состояния события для диффа."""
@@ -0,0 +1,120 @@
+"""Сервис пакетного создания событий."""
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.models import Event
+from app.models.event import EventGroup, EventLecturer, EventStream, EventSubgroup
+from app.services.change_log import ChangeLogService
+from app.services.occupancy import OccupancyService
+from app.services.timetable_entries import TimetableEntryService
+from app.validators.conflicts import ValidationService
+
+# Таблица связи -> (атрибут EventCreate со списком id, колонка связи)
+_ASSOCIATIONS = (
+    (EventLecturer, "lecturer_ids", "lecturer_id"),
+    (EventGroup, "group_ids", "group_id"),
+    (EventSubgroup, "subgroup_ids", "subgroup_id"),
+    (EventStream, "stream_ids", "stream_id"),
+)
+
+
+class EventBulkService:
+    """Пакетная валидация и создание событий в одной транзакции."""
+
+    @staticmethod
+    def event_state(event) -> Dict[str, Any]:
+        """Состояние создаваемого события в формате ChangeLogService.get_event_state."""
+        return {
+            "discipline_id": event.discipline_id,
+            "work_kind_id": event.work_kind_id,
+            "room_id": event.room_id,
+            "time_slot_id": event.time_slot_id,
+            "status": event.status,
+            "note": event.note,
+            "lecturer_ids": list(dict.fromkeys(event.lecturer_ids)),
+            "group_ids": list(dict.fromkeys(event.group_ids)),
+            "subgroup_ids": list(dict.fromkeys(event.subgroup_ids)),
+            "stream_ids": list(dict.fromkeys(event.stream_ids)),
+        }
+
+    @staticmethod
+    def create_events(
+        db: Session,
+        events: Sequence,
+        reason: Optional[str] = None,
+        actor: Optional[str] = None,
+        atomic: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Проверка и создание пакета событий (EventCreate).
+
+        События, не прошедшие проверку, пропускаются (или, при atomic,
+        не создается ни одно событие). Вставка событий, связей и записей
+        журнала выполняется пакетными INSERT и одним коммитом. Если ресурс
+        занят параллельной записью уже после проверки, OccupancyService
+        поднимает ConflictError и транзакцию нужно откатить.
+        """
+        errors = ValidationService.validate_events(db, events)
+        results: List[Dict[str, Any]] = [
+            {
+                "index": index,
+                "status": "rejected" if item_errors else "created",
+                "event_id": None,
+                "errors": [e.message for e in item_errors],
+            }
+            for index, item_errors in enumerate(errors)
+        ]
+        accepted = [index for index, item_errors in enumerate(errors) if not item_errors]
+
+        if atomic and len(accepted) != len(events):
+            for index in accepted:
+                results[index]["status"] = "skipped"
+            return results
+        if not accepted:
+            return results
+
+        states = [EventBulkService.event_state(events[index]) for index in accepted]
+        event_ids = db.execute(
+            insert(Event).returning(Event.id, sort_by_parameter_order=True),
+            [
+                {
+                    "discipline_id": state["discipline_id"],
+                    "work_kind_id": state["work_kind_id"],
+                    "room_id": state["room_id"],
+                    "time_slot_id": state["time_slot_id"],
+                    "status": state["status"],
+                    "note": state["note"],
+                }
+                for state in states
+            ],
+        ).scalars().all()
+
+        for model, ids_field, column in _ASSOCIATIONS:
+            rows = [
+                {"event_id": event_id, column: related_id}
+                for event_id, state in zip(event_ids, states)
+                for related_id in state[ids_field]
+            ]
+            if rows:
+                db.execute(insert(model), rows)
+
+        ChangeLogService.log_event_changes(
+            db,
+            [
+                {
+                    "event_id": event_id,
+                    "actor": actor,
+                    "reason": events[index].reason or reason or "Пакетное создание события",
+                    "diff_before": None,
+                    "diff_after": state,
+                }
+                for index, event_id, state in zip(accepted, event_ids, states)
+            ],
+            source="api",
+        )
+        OccupancyService.sync(db, event_ids)
+        TimetableEntryService.sync(db, event_ids)
+        db.commit()
+
+        for index, event_id in zip(accepted, event_ids):
+            results[index]["event_id"] = event_id
+        return results
@@ -0,0 +1,170 @@
+"""Построение запросов событий с жадной загрузкой связей."""
+import base64
+import binascii
+import json
+from datetime import date, time
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query, Session, contains_eager, joinedload, selectinload
+from app.models import Event, Room, TimeSlot
+from app.models.event import EventGroup, EventLecturer, EventStream, EventSubgroup
+
+# Стратегии загрузки связей
+JOINED = "joined"  # JOIN в основном запросе (для связей many-to-one)
+SELECTIN = "selectin"  # отдельный SELECT ... WHERE id IN (...) на всю выборку
+LAZY = "lazy"  # не загружать заранее
+
+_LOADERS = {
+    JOINED: joinedload,
+    SELECTIN: selectinload,
+}
+
+# Связь события -> (атрибут Event, вложенная связь, которая нужна для отображения)
+_RELATIONS = {
+    "discipline": (Event.discipline, None),
+    "work_kind": (Event.work_kind, None),
+    "room": (Event.room, Room.building),
+    "time_slot": (Event.time_slot, None),
+    "lecturers": (Event.lecturers, EventLecturer.lecturer),
+    "groups": (Event.groups, EventGroup.group),
+    "subgroups": (Event.subgroups, EventSubgroup.subgroup),
+    "streams": (Event.streams, EventStream.stream),
+}
+
+# Порядок расписания и ключ keyset-пагинации: (дата, начало, id события)
+TimetableCursor = Tuple[date, time, int]
+
+
+class EventQueryService:
+    """Единый слой построения запросов событий.
+
+    Все связи Event загружаются заранее, поэтому число SQL запросов
+    не зависит от количества событий в выборке. Представления событий
+    (EventDetail, компактный формат, конфликты) строит TimetableEntryService:
+    по строкам модели чтения или по EventRecord.from_event.
+    """
+
+    # Many-to-one подтягиваются JOIN-ом, коллекции — через selectinload,
+    # чтобы не размножать строки основного запроса.
+    DEFAULT_STRATEGIES: Dict[str, str] = {
+        "discipline": JOINED,
+        "work_kind": JOINED,
+        "room": JOINED,
+        "time_slot": JOINED,
+        "lecturers": SELECTIN,
+        "groups": SELECTIN,
+        "subgroups": SELECTIN,
+        "streams": SELECTIN,
+    }
+
+    @staticmethod
+    def load_options(strategies: Optional[Dict[str, str]] = None) -> List[Any]:
+        """Опции загрузки связей Event.
+
+        strategies переопределяет стратегии по умолчанию для отдельных связей.
+        """
+        merged = dict(EventQueryService.DEFAULT_STRATEGIES)
+        if strategies:
+            unknown = set(strategies) - set(_RELATIONS)
+            if unknown:
+                raise ValueError(f"Неизвестные связи события: {', '.join(sorted(unknown))}")
+            merged.update(strategies)
+
+        options = []
+        for name, strategy in merged.items():
+            if strategy == LAZY:
+                continue
+            if strategy not in _LOADERS:
+                raise ValueError(f"Неизвестная стратегия загрузки '{strategy}' для связи {name}")
+            attr, nested = _RELATIONS[name]
+            loader = _LOADERS[strategy](attr)
+            if nested is not None:
+                loader = loader.joinedload(nested)
+            options.append(loader)
+        return options
+
+    @staticmethod
+    def base_query(
+        db: Session,
+        strategies: Optional[Dict[str, str]] = None,
+        scheduled_only: bool = True,
+    ) -> Query:
+        """Базовый запрос событий с настроенной загрузкой связей."""
+        query = db.query(Event).options(*EventQueryService.load_options(strategies))
+        if scheduled_only:
+            query = query.filter(Event.status == "scheduled")
+        return query
+
+    @staticmethod
+    def timetable_query(
+        db: Session,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        group_id: Optional[int] = None,
+        lecturer_id: Optional[int] = None,
+        room_id: Optional[int] = None,
+        building_id: Optional[int] = None,
+        stream_id: Optional[int] = None,
+        strategies: Optional[Dict[str, str]] = None,
+        after: Optional[TimetableCursor] = None,
+    ) -> Query:
+        """Запрос расписания с фильтрами, упорядоченный по (дата, начало, id).
+
+        after — ключ последнего события предыдущей страницы (keyset-пагинация).
+        """
+        strategies = dict(strategies or {})
+        time_slot_strategy = strategies.get(
+            "time_slot", EventQueryService.DEFAULT_STRATEGIES["time_slot"]
+        )
+        # Слот всегда присоединяется для фильтров и сортировки, повторный JOIN не нужен
+        strategies["time_slot"] = LAZY
+        query = EventQueryService.base_query(db, strategies).join(
+            TimeSlot, Event.time_slot_id == TimeSlot.id
+        )
+        if time_slot_strategy != LAZY:
+            query = query.options(contains_eager(Event.time_slot))
+
+        if date_from:
+            query = query.filter(TimeSlot.date >= date_from)
+        if date_to:
+            query = query.filter(TimeSlot.date <= date_to)
+        if after:
+            query = query.filter(
+                tuple_(TimeSlot.date, TimeSlot.time_start, Event.id) > tuple_(*after)
+            )
+
+        if group_id:
+            query = query.join(EventGroup).filter(EventGroup.group_id == group_id)
+
+        if lecturer_id:
+            query = query.join(EventLecturer).filter(EventLecturer.lecturer_id == lecturer_id)
+
+        if stream_id:
+            query = query.join(EventStream).filter(EventStream.stream_id == stream_id)
+
+        if room_id:
+            query = query.filter(Event.room_id == room_id)
+
+        if building_id:
+            query = query.join(Room, Event.room_id == Room.id).filter(
+                Room.building_id == building_id
+            )
+
+        return query.order_by(TimeSlot.date, TimeSlot.time_start, Event.id)
+
+    @staticmethod
+    def encode_key(key: TimetableCursor) -> str:
+        """Курсор по ключу (дата, начало, id события)."""
+        day, time_start, event_id = key
+        raw = json.dumps([day.isoformat(), time_start.isoformat(), event_id])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> TimetableCursor:
+        """Разбор курсора encode_key (ValueError, если курсор поврежден)."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            day, time_start, event_id = json.loads(raw)
+            return date.fromisoformat(day), time.fromisoformat(time_start), int(event_id)
+        except (binascii.Error, TypeError, ValueError) as e:
+            raise ValueError("Некорректный курсор") from e
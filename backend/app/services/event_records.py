@@ -0,0 +1,115 @@
+"""Записи событий для чтения: проекции столбцов SQLAlchemy Core вместо ORM объектов."""
+from collections import namedtuple
+from typing import Iterator, Optional
+from sqlalchemy import literal, select, tuple_
+from sqlalchemy.orm import Session
+from app.models import Event, TimetableEntry
+from app.services.event_query import TimetableCursor
+from app.services.timetable_entries import SCHEDULED, TimetableEntryService
+
+# Поля записи: столбцы timetable_entries и статус события
+RECORD_FIELDS = tuple(column.name for column in TimetableEntry.__table__.columns) + ("status",)
+
+
+class EventRecord(namedtuple("EventRecord", RECORD_FIELDS)):
+    """Событие для чтения: кортеж значений с доступом к полям по имени.
+
+    Поля совпадают со столбцами TimetableEntry (плюс status), поэтому запись
+    подходит везде, где ожидается строка модели чтения (to_detail_dict,
+    with_conflicts, ICSWriter). Запись не попадает в identity map сессии,
+    не отслеживает изменения и не имеет __dict__.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_event(cls, event: Event) -> "EventRecord":
+        """Запись по ORM событию, связи которого загружены заранее (EventQueryService)."""
+        time_slot = event.time_slot
+        room = event.room
+        lecturers = [link.lecturer for link in event.lecturers if link.lecturer]
+        groups = [link.group for link in event.groups if link.group]
+        subgroups = [link.subgroup for link in event.subgroups if link.subgroup]
+        streams = [link.stream for link in event.streams if link.stream]
+        return cls(
+            event_id=event.id,
+            note=event.note,
+            time_slot_id=time_slot.id,
+            date=time_slot.date,
+            pair_number=time_slot.pair_number,
+            time_start=time_slot.time_start,
+            time_end=time_slot.time_end,
+            discipline_id=event.discipline.id,
+            discipline_name=event.discipline.name,
+            work_kind_id=event.work_kind.id,
+            work_kind_name=event.work_kind.name,
+            work_kind_color_hex=event.work_kind.color_hex,
+            room_id=room.id,
+            room_number=room.number,
+            building_id=room.building.id,
+            building_name=room.building.name,
+            building_address=room.building.address,
+            lecturer_ids=[lecturer.id for lecturer in lecturers],
+            lecturer_fios=[lecturer.fio for lecturer in lecturers],
+            group_ids=[group.id for group in groups],
+            group_codes=[group.code for group in groups],
+            subgroup_ids=[subgroup.id for subgroup in subgroups],
+            subgroup_codes=[subgroup.code for subgroup in subgroups],
+            stream_ids=[stream.id for stream in streams],
+            stream_names=[stream.name for stream in streams],
+            status=event.status,
+        )
+
+
+class EventRecordService:
+    """Чтение событий записями EventRecord.
+
+    Запросы выбирают только нужные столбцы, а строки результата сразу
+    становятся кортежами EventRecord: без identity map, отслеживания
+    изменений и загрузки связей. Памяти на событие и времени на разбор
+    строк нужно меньше, чем ORM объектам (см. benchmarks.event_records).
+    """
+
+    @staticmethod
+    def timetable(
+        db: Session,
+        after: Optional[TimetableCursor] = None,
+        limit: Optional[int] = None,
+        yield_per: Optional[int] = None,
+        **filters,
+    ) -> Iterator[EventRecord]:
+        """Записи расписания из timetable_entries в порядке (дата, начало, id).
+
+        Фильтры и курсор — как у TimetableEntryService.query. С yield_per
+        строки читаются из БД порциями по мере перебора.
+        """
+        statement = select(
+            *TimetableEntry.__table__.columns, literal(SCHEDULED).label("status")
+        ).where(*TimetableEntryService.criteria(**filters))
+        if after:
+            statement = statement.where(
+                tuple_(TimetableEntry.date, TimetableEntry.time_start, TimetableEntry.event_id)
+                > tuple_(*after)
+            )
+        statement = statement.order_by(
+            TimetableEntry.date, TimetableEntry.time_start, TimetableEntry.event_id
+        )
+        if limit is not None:
+            statement = statement.limit(limit)
+        options = {"yield_per": yield_per} if yield_per else {}
+        return map(EventRecord._make, db.execute(statement, execution_options=options))
+
+    @staticmethod
+    def get_event(db: Session, event_id: int) -> Optional[EventRecord]:
+        """Запись события по id независимо от статуса.
+
+        Отмененных событий нет в timetable_entries, поэтому запись строится
+        по таблицам событий тем же запросом, что и строка модели чтения.
+        """
+        rows = (
+            TimetableEntryService.select_rows([event_id], scheduled_only=False)
+            .add_columns(Event.status.label("status"))
+            .subquery()
+        )
+        row = db.execute(select(*(rows.c[name] for name in RECORD_FIELDS))).first()
+        return EventRecord._make(row) if row else None
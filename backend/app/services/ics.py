@@ -1,13 +1,256 @@
 """Сервис генерации ICS календарей."""
-from icalendar import Calendar, Event as ICalEvent
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+from sqlalchemy import Text, cast, func, literal_column, select
+from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by
 from sqlalchemy.orm import Session
-from app.models import Event, TimeSlot, Room, Building, Discipline, WorkKind, Lecturer
-from app.models.event import EventLecturer, EventGroup, EventSubgroup, EventStream
-from app.models.group import Group, Subgroup
+from app.models import ChangeLog, Lecturer, TimetableEntry
+from app.models.group import Group
 from app.models.stream import Stream
-import pytz
+from app.services.cache import cache_service
+from app.services.change_log import ChangeLogService
+from app.services.event_records import EventRecord, EventRecordService
+from app.services.timetable_entries import TimetableEntryService
+
+CRLF = "\r\n"
+# Максимальная длина строки содержимого в октетах без CRLF (RFC 5545, 3.1)
+MAX_LINE_OCTETS = 75
+TZID = "Europe/Moscow"
+# Размер порции событий при потоковой генерации
+STREAM_CHUNK_SIZE = 500
+# Время жизни кэшированных VEVENT: ключ зависит от содержимого, TTL только чистит старые
+FRAGMENT_TTL = 7 * 24 * 3600
+# Версия формата VEVENT в ключах фрагментов (увеличить при изменении ICSWriter)
+FRAGMENT_VERSION = 1
+
+# (id, дата, начало, окончание, название, описание, место, SEQUENCE, LAST-MODIFIED)
+VEventFields = Tuple[int, str, str, str, str, str, Optional[str], int, Optional[str]]
+
+
+def format_utc(value: datetime) -> str:
+    """Дата-время в формате ICS (UTC)."""
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+class ICSWriter:
+    """Потоковая запись ICS без построения календаря в памяти."""
+
+    @staticmethod
+    def escape_text(value: str) -> str:
+        """Экранирование значения типа TEXT (RFC 5545, 3.3.11)."""
+        return (
+            value.replace("\\", "\\\\")
+            .replace(";", "\\;")
+            .replace(",", "\\,")
+            .replace("\r\n", "\\n")
+            .replace("\n", "\\n")
+        )
+
+    @staticmethod
+    def fold(line: str) -> str:
+        """Строка содержимого с CRLF, свернутая по 75 октетов UTF-8.
+
+        Продолжение начинается с пробела; многобайтовые символы не разрываются.
+        """
+        if len(line.encode("utf-8")) <= MAX_LINE_OCTETS:
+            return line + CRLF
+        parts = []
+        current = []
+        size = 0
+        limit = MAX_LINE_OCTETS
+        for char in line:
+            char_size = len(char.encode("utf-8"))
+            if size + char_size > limit:
+                parts.append("".join(current))
+                current = []
+                size = 0
+                # Пробел в начале строки продолжения тоже занимает октет
+                limit = MAX_LINE_OCTETS - 1
+            current.append(char)
+            size += char_size
+        parts.append("".join(current))
+        return (CRLF + " ").join(parts) + CRLF
+
+    @staticmethod
+    def vevent_fields(
+        event: EventRecord, sequence: int = 0, last_modified: Optional[datetime] = None
+    ) -> VEventFields:
+        """Все данные события, от которых зависит его VEVENT.
+
+        sequence и last_modified — ревизия события по журналу изменений.
+        """
+        return (
+            event.event_id,
+            event.date.strftime("%Y%m%d"),
+            event.time_start.strftime("%H%M%S"),
+            event.time_end.strftime("%H%M%S"),
+            f"{event.discipline_name} ({event.work_kind_name})",
+            ICSWriter.description(event),
+            ICSWriter.location(event),
+            sequence,
+            format_utc(last_modified) if last_modified else None,
+        )
+
+    @staticmethod
+    def render_vevent(fields: VEventFields, dtstamp: str) -> str:
+        """Блок VEVENT по данным vevent_fields.
+
+        DTSTAMP — время последнего изменения события, если оно известно,
+        чтобы одно и то же состояние всегда давало одинаковый текст.
+        """
+        escape = ICSWriter.escape_text
+        (
+            event_id, day, time_start, time_end, summary, description, location,
+            sequence, last_modified,
+        ) = fields
+        lines = [
+            "BEGIN:VEVENT",
+            f"SUMMARY:{escape(summary)}",
+            f"DTSTART;TZID={TZID}:{day}T{time_start}",
+            f"DTEND;TZID={TZID}:{day}T{time_end}",
+            f"DTSTAMP:{last_modified or dtstamp}",
+            f"UID:event-{event_id}@safu.ru",
+            f"SEQUENCE:{sequence}",
+            f"DESCRIPTION:{escape(description)}",
+        ]
+        if location is not None:
+            lines.append(f"LOCATION:{escape(location)}")
+        if last_modified:
+            lines.append(f"LAST-MODIFIED:{last_modified}")
+        lines.append("END:VEVENT")
+        return "".join(ICSWriter.fold(line) for line in lines)
+
+    @staticmethod
+    def vevent(event: EventRecord, dtstamp: str) -> str:
+        """Блок VEVENT события."""
+        return ICSWriter.render_vevent(ICSWriter.vevent_fields(event), dtstamp)
+
+    @staticmethod
+    def description(event: EventRecord) -> str:
+        """Описание события: преподаватели, группы, подгруппы, потоки, примечание."""
+        lecturer_names = ", ".join(event.lecturer_fios)
+        group_codes = ", ".join(event.group_codes)
+        subgroup_codes = ", ".join(event.subgroup_codes)
+        stream_names = ", ".join(event.stream_names)
+
+        description_parts = []
+        if lecturer_names:
+            description_parts.append(f"Преподаватель: {lecturer_names}")
+        if group_codes:
+            description_parts.append(f"Группы: {group_codes}")
+        if subgroup_codes:
+            description_parts.append(f"Подгруппы: {subgroup_codes}")
+        if stream_names:
+            description_parts.append(f"Потоки: {stream_names}")
+        if event.note:
+            description_parts.append(f"Примечание: {event.note}")
+        return "\n".join(description_parts)
+
+    @staticmethod
+    def location(event: EventRecord) -> Optional[str]:
+        """Место проведения: корпус, адрес, аудитория."""
+        location_parts = [event.building_name]
+        if event.building_address:
+            location_parts.append(event.building_address)
+        location_parts.append(f"Ауд. {event.room_number}")
+        return ", ".join(location_parts)
+
+    @staticmethod
+    def header(title: str) -> str:
+        """Начало календаря."""
+        lines = [
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//САФУ Расписание//RU",
+            "CALSCALE:GREGORIAN",
+            "METHOD:PUBLISH",
+            f"X-WR-CALNAME:{ICSWriter.escape_text(title)}",
+            f"X-WR-TIMEZONE:{TZID}",
+        ]
+        return "".join(ICSWriter.fold(line) for line in lines)
+
+    @staticmethod
+    def footer() -> str:
+        """Окончание календаря."""
+        return "END:VCALENDAR" + CRLF
+
+    @staticmethod
+    def iter_calendar(events: Iterable[EventRecord], title: str) -> Iterator[str]:
+        """Календарь по частям: заголовок, VEVENT на каждое событие, окончание."""
+        dtstamp = format_utc(datetime.now(timezone.utc))
+        yield ICSWriter.header(title)
+        for event in events:
+            yield ICSWriter.vevent(event, dtstamp)
+        yield ICSWriter.footer()
+
+
+class ICSFragmentCache:
+    """Кэш отрисованных VEVENT в Redis.
+
+    Ключ фрагмента — хэш данных события (vevent_fields), поэтому
+    после изменения события его старый фрагмент просто перестает
+    запрашиваться, а остальные события ленты берутся из кэша.
+    """
+
+    @staticmethod
+    def key(fields: VEventFields) -> str:
+        """Ключ фрагмента по данным события."""
+        digest = hashlib.blake2b(
+            json.dumps(fields, ensure_ascii=False).encode(), digest_size=16
+        ).hexdigest()
+        return f"ics:vevent:v{FRAGMENT_VERSION}:{digest}"
+
+    @staticmethod
+    def iter_vevents(
+        db: Session,
+        events: Iterable[EventRecord],
+        dtstamp: str,
+        batch_size: int = STREAM_CHUNK_SIZE,
+    ) -> Iterator[str]:
+        """VEVENT событий: из кэша одним MGET на порцию, недостающие — отрисовкой.
+
+        Ревизии событий порции читаются из журнала изменений одним запросом.
+        """
+        client = cache_service.redis_client
+        events = iter(events)
+        while True:
+            events_batch = list(islice(events, batch_size))
+            if not events_batch:
+                return
+            revisions = ChangeLogService.event_revisions(
+                db, [event.event_id for event in events_batch]
+            )
+            batch = [
+                ICSWriter.vevent_fields(event, *revisions.get(event.event_id, (0, None)))
+                for event in events_batch
+            ]
+            keys = [ICSFragmentCache.key(fields) for fields in batch]
+            fragments = client.mget(keys)
+
+            pipe = client.pipeline(transaction=False)
+            rendered = 0
+            for i, fields in enumerate(batch):
+                if fragments[i] is None:
+                    fragments[i] = ICSWriter.render_vevent(fields, dtstamp)
+                    pipe.setex(keys[i], FRAGMENT_TTL, fragments[i])
+                    rendered += 1
+            if rendered:
+                pipe.execute()
+            yield from fragments
+
+    @staticmethod
+    def iter_calendar(db: Session, events: Iterable[EventRecord], title: str) -> Iterator[str]:
+        """То же, что ICSWriter.iter_calendar, но с кэшем фрагментов и ревизиями событий.
+
+        Событие без записей в журнале получает DTSTAMP первой отрисовки фрагмента.
+        """
+        dtstamp = format_utc(datetime.now(timezone.utc))
+        yield ICSWriter.header(title)
+        yield from ICSFragmentCache.iter_vevents(db, events, dtstamp)
+        yield ICSWriter.footer()
 
 
 class ICSService:
@@ -15,142 +258,119 @@ class ICSService:
 
     @staticmethod
     def generate_ics_for_events(
-        db: Session, events: List[Event], title: str = "Расписание САФУ"
+        events: Iterable[EventRecord], title: str = "Расписание САФУ"
     ) -> str:
-        """Генерация ICS календаря для списка событий."""
-        cal = Calendar()
-        cal.add("prodid", "-//САФУ Расписание//RU")
-        cal.add("version", "2.0")
-        cal.add("calscale", "GREGORIAN")
-        cal.add("method", "PUBLISH")
+        """Генерация ICS календаря для записей событий (EventRecord, строки timetable_entries).
 
-        moscow_tz = pytz.timezone("Europe/Moscow")
+        ORM событие со связями, загруженными заранее, приводится к записи
+        EventRecord.from_event.
+        """
+        return "".join(ICSWriter.iter_calendar(events, title))
 
-        for event in events:
-            ical_event = ICalEvent()
-            ical_event.add("uid", f"event-{event.id}@safu.ru")
-
-            # Время
-            time_slot = event.time_slot
-            date_obj = time_slot.date
-            start_time = datetime.combine(date_obj, time_slot.time_start)
-            end_time = datetime.combine(date_obj, time_slot.time_end)
-
-            # Применяем таймзону
-            start_dt = moscow_tz.localize(start_time)
-            end_dt = moscow_tz.localize(end_time)
-
-            ical_event.add("dtstart", start_dt)
-            ical_event.add("dtend", end_dt)
-            ical_event.add("dtstamp", datetime.now(moscow_tz))
-
-            # Название
-            discipline = db.query(Discipline).filter(Discipline.id == event.discipline_id).first()
-            work_kind = db.query(WorkKind).filter(WorkKind.id == event.work_kind_id).first()
-            summary = f"{discipline.name if discipline else 'Дисциплина'}"
-            if work_kind:
-                summary += f" ({work_kind.name})"
-            ical_event.add("summary", summary)
-
-            # Описание
-            lecturers = (
-                db.query(Lecturer)
-                .join(EventLecturer)
-                .filter(EventLecturer.event_id == event.id)
-                .all()
-            )
-            lecturer_names = ", ".join([l.fio for l in lecturers])
+    @staticmethod
+    def iter_ics(
+        db: Session,
+        group_id: Optional[int] = None,
+        lecturer_id: Optional[int] = None,
+        stream_id: Optional[int] = None,
+    ) -> Iterator[str]:
+        """ICS календарь группы, преподавателя или потока по частям.
 
-            groups = (
-                db.query(Group)
-                .join(EventGroup)
-                .filter(EventGroup.event_id == event.id)
-                .all()
-            )
-            group_codes = ", ".join([g.code for g in groups])
+        Используется первый из указанных фильтров. События читаются из
+        модели чтения записями EventRecord порциями по STREAM_CHUNK_SIZE,
+        VEVENT неизменившихся событий берутся из ICSFragmentCache.
+        """
+        filters = ICSService.feed_filters(group_id, lecturer_id, stream_id)
+        if "group_id" in filters:
+            code = db.execute(select(Group.code).where(Group.id == group_id)).scalar()
+            title = f"Расписание группы {code or group_id}"
+        elif "lecturer_id" in filters:
+            fio = db.execute(select(Lecturer.fio).where(Lecturer.id == lecturer_id)).scalar()
+            title = f"Расписание {fio or lecturer_id}"
+        else:
+            name = db.execute(select(Stream.name).where(Stream.id == stream_id)).scalar()
+            title = f"Расписание потока {name or stream_id}"
 
-            subgroups = (
-                db.query(Subgroup)
-                .join(EventSubgroup)
-                .filter(EventSubgroup.event_id == event.id)
-                .all()
-            )
-            subgroup_codes = ", ".join([sg.code for sg in subgroups])
+        events = EventRecordService.timetable(db, yield_per=STREAM_CHUNK_SIZE, **filters)
+        return ICSFragmentCache.iter_calendar(db, events, title)
+
+    @staticmethod
+    def feed_filters(
+        group_id: Optional[int] = None,
+        lecturer_id: Optional[int] = None,
+        stream_id: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """Фильтр ленты: первый из указанных group_id, lecturer_id, stream_id."""
+        if group_id:
+            return {"group_id": group_id}
+        if lecturer_id:
+            return {"lecturer_id": lecturer_id}
+        return {"stream_id": stream_id}
+
+    @staticmethod
+    def feed_version(
+        db: Session,
+        group_id: Optional[int] = None,
+        lecturer_id: Optional[int] = None,
+        stream_id: Optional[int] = None,
+    ) -> Tuple[str, Optional[datetime]]:
+        """ETag и Last-Modified ленты без ее генерации (один запрос).
 
-            streams = (
-                db.query(Stream)
-                .join(EventStream)
-                .filter(EventStream.event_id == event.id)
-                .all()
+        Версия зависит от набора событий ленты и последнего изменения
+        любого из них по журналу, поэтому меняется при добавлении,
+        удалении и правке событий. Last-Modified учитывает и события,
+        которые ушли из ленты (отменены или перенесены в другую группу).
+        """
+        filters = ICSService.feed_filters(group_id, lecturer_id, stream_id)
+        # События ленты — из той же модели чтения, что и тело ленты (iter_ics)
+        ids = (
+            select(TimetableEntry.event_id.label("id"))
+            .where(*TimetableEntryService.criteria(**filters))
+            .subquery()
+        )
+        # Изменения событий ленты и событий, которые из нее ушли (по состоянию до правки).
+        # Два подзапроса вместо OR, чтобы каждый шел по своему индексу журнала
+        # (idx_entity_id и ix_change_log_event_diff_before), а не сканировал его целиком.
+        (name, value), = filters.items()
+
+        def latest_change(criterion):
+            return (
+                select(func.max(ChangeLog.change_at))
+                .where(ChangeLog.entity == "event", criterion)
+                .scalar_subquery()
             )
-            stream_names = ", ".join([s.name for s in streams])
-
-            description_parts = []
-            if lecturer_names:
-                description_parts.append(f"Преподаватель: {lecturer_names}")
-            if group_codes:
-                description_parts.append(f"Группы: {group_codes}")
-            if subgroup_codes:
-                description_parts.append(f"Подгруппы: {subgroup_codes}")
-            if stream_names:
-                description_parts.append(f"Потоки: {stream_names}")
-            if event.note:
-                description_parts.append(f"Примечание: {event.note}")
-
-            ical_event.add("description", "\n".join(description_parts))
-
-            # Место
-            room = db.query(Room).filter(Room.id == event.room_id).first()
-            if room:
-                building = db.query(Building).filter(Building.id == room.building_id).first()
-                location_parts = []
-                if building:
-                    location_parts.append(building.name)
-                    if building.address:
-                        location_parts.append(building.address)
-                location_parts.append(f"Ауд. {room.number}")
-                ical_event.add("location", ", ".join(location_parts))
-
-            cal.add_component(ical_event)
-
-        return cal.to_ical().decode("utf-8")
+
+        last_change = func.greatest(
+            latest_change(ChangeLog.entity_id.in_(select(ids.c.id))),
+            latest_change(cast(ChangeLog.diff_before, JSONB).contains({f"{name}s": [value]})),
+        )
+        count, ids_digest, last_modified = db.query(
+            func.count(ids.c.id),
+            func.md5(
+                func.string_agg(
+                    cast(ids.c.id, Text), aggregate_order_by(literal_column("','"), ids.c.id)
+                )
+            ),
+            last_change,
+        ).one()
+
+        version = f"{sorted(filters.items())}:{count}:{ids_digest}:{last_modified}"
+        version += f":{FRAGMENT_VERSION}"
+        etag = '"' + hashlib.sha256(version.encode()).hexdigest()[:32] + '"'
+        return etag, last_modified
 
     @staticmethod
     def generate_ics_for_group(db: Session, group_id: int) -> str:
         """Генерация ICS для группы."""
-        events = (
-            db.query(Event)
-            .join(EventGroup)
-            .filter(EventGroup.group_id == group_id, Event.status == "scheduled")
-            .all()
-        )
-        group = db.query(Group).filter(Group.id == group_id).first()
-        title = f"Расписание группы {group.code if group else group_id}"
-        return ICSService.generate_ics_for_events(db, events, title)
+        return "".join(ICSService.iter_ics(db, group_id=group_id))
 
     @staticmethod
     def generate_ics_for_lecturer(db: Session, lecturer_id: int) -> str:
         """Генерация ICS для преподавателя."""
-        events = (
-            db.query(Event)
-            .join(EventLecturer)
-            .filter(EventLecturer.lecturer_id == lecturer_id, Event.status == "scheduled")
-            .all()
-        )
-        lecturer = db.query(Lecturer).filter(Lecturer.id == lecturer_id).first()
-        title = f"Расписание {lecturer.fio if lecturer else lecturer_id}"
-        return ICSService.generate_ics_for_events(db, events, title)
+        return "".join(ICSService.iter_ics(db, lecturer_id=lecturer_id))
 
     @staticmethod
     def generate_ics_for_stream(db: Session, stream_id: int) -> str:
         """Генерация ICS для потока."""
-        events = (
-            db.query(Event)
-            .join(EventStream)
-            .filter(EventStream.stream_id == stream_id, Event.status == "scheduled")
-            .all()
-        )
-        stream = db.query(Stream).filter(Stream.id == stream_id).first()
-        title = f"Расписание потока {stream.name if stream else stream_id}"
-        return ICSService.generate_ics_for_events(db, events, title)
+        return "".join(ICSService.iter_ics(db, stream_id=stream_id))
 
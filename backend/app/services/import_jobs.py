@@ -0,0 +1,285 @@
+"""Фоновые задачи импорта HTML расписания."""
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Callable, Optional, Tuple
+from sqlalchemy import func, or_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models import ImportJob, ImportJobStatus
+from app.schemas import ImportJob as ImportJobSchema
+from app.services.cache_tags import CacheTagService
+from app.services.parser import ParseResult, ParserService
+from app.services.timetable_entries import TimetableEntryService
+
+logger = logging.getLogger(__name__)
+
+# Размер части файла при сохранении
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Сколько ошибок строк хранится в задаче (счетчик — полный)
+MAX_STORED_ERRORS = 1000
+# Не чаще чем раз в столько секунд ход задачи записывается в БД
+PROGRESS_INTERVAL = 1.0
+# Причина сбоя задач, которые не завершились до остановки процесса
+INTERRUPTED_ERROR = "Импорт прерван перезапуском сервера, загрузите файл повторно"
+# Задачи, которые еще может выполнить процесс-владелец
+ACTIVE_STATUSES = (ImportJobStatus.PENDING, ImportJobStatus.RUNNING)
+# Владелец задач этого процесса: задачи выполняет только его пул потоков
+PROCESS_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.IMPORT_WORKERS, thread_name_prefix="import"
+)
+
+
+class ImportJobService:
+    """Импорт в пуле потоков с ходом выполнения в таблице import_jobs.
+
+    Запрос только сохраняет файл и создает задачу. Задача пишет данные
+    в своей транзакции (коммит в конце), а ход выполнения и ошибки
+    строк — отдельной сессией, поэтому они видны всем процессам API
+    во время импорта и сохраняются после перезапуска.
+
+    Задача принадлежит процессу, который ее создал (owner). Процесс
+    регулярно обновляет heartbeat_at своих задач (ImportJobHeartbeat),
+    поэтому задачи остановленного процесса отличимы от задач живых
+    процессов и реплик.
+    """
+
+    @staticmethod
+    def submit(
+        db: Session, filename: str, upload: BinaryIO, differential: bool = False
+    ) -> Tuple[ImportJob, "Future[None]"]:
+        """Сохранение загруженного файла и постановка задачи в очередь.
+
+        Задача выполняется на том же движке БД, что и сессия db.
+        """
+        job, path = ImportJobService.create(db, filename, upload, differential)
+        return job, _executor.submit(ImportJobService.run, job.id, path, db.get_bind())
+
+    @staticmethod
+    def create(
+        db: Session, filename: str, upload: BinaryIO, differential: bool = False
+    ) -> Tuple[ImportJob, str]:
+        """Задача и путь к сохраненному файлу."""
+        upload_dir = settings.IMPORT_UPLOAD_DIR or None
+        if upload_dir:
+            os.makedirs(upload_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix="import-", suffix=".html", dir=upload_dir)
+        with os.fdopen(fd, "wb") as f:
+            shutil.copyfileobj(upload, f, UPLOAD_CHUNK_SIZE)
+
+        job = ImportJob(
+            filename=filename,
+            status=ImportJobStatus.PENDING,
+            differential=differential,
+            upload_path=path,
+            owner=PROCESS_OWNER,
+            heartbeat_at=func.now(),
+            bytes_total=os.path.getsize(path),
+            bytes_processed=0,
+            rows_processed=0,
+            events_created=0,
+            events_updated=0,
+            events_cancelled=0,
+            events_unchanged=0,
+            errors_count=0,
+            warnings_count=0,
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job, path
+
+    @staticmethod
+    def run(job_id: int, path: str, bind: Engine) -> None:
+        """Выполнение задачи: разбор файла, запись в БД, инвалидация кэша."""
+        db = Session(bind=bind)
+        progress_db = Session(bind=bind)
+        bytes_read = 0
+        reported_at = 0.0
+
+        def on_progress(offset: int) -> None:
+            nonlocal bytes_read
+            bytes_read = offset
+
+        def on_batch(result: ParseResult) -> None:
+            nonlocal reported_at
+            if time.monotonic() - reported_at >= PROGRESS_INTERVAL:
+                reported_at = time.monotonic()
+                ImportJobService._save_progress(progress_db, job, result, bytes_read)
+
+        try:
+            job = progress_db.get(ImportJob, job_id)
+            job.status = ImportJobStatus.RUNNING
+            job.started_at = datetime.now(timezone.utc)
+            job.heartbeat_at = func.now()
+            progress_db.commit()
+
+            result = ParserService.parse_file(
+                db, path, on_batch, on_progress, differential=job.differential
+            )
+            db.commit()
+            if result.events_created:
+                TimetableEntryService.analyze(db)
+                db.commit()
+
+            # Инвалидация кэша только по затронутым группам, преподавателям и датам
+            CacheTagService.invalidate_event_states(
+                db, result.event_states, result.changed_event_ids
+            )
+            CacheTagService.invalidate_reference(
+                *[name for name, count in result.entities_created.items() if count]
+            )
+
+            job.status = ImportJobStatus.COMPLETED
+            job.entities_created = result.entities_created
+            job.timings = result.timings
+            ImportJobService._save_progress(progress_db, job, result, bytes_read, finished=True)
+        except Exception as e:
+            logger.exception("Ошибка импорта %s", job_id)
+            db.rollback()
+            progress_db.rollback()
+            job = progress_db.get(ImportJob, job_id)
+            if job is not None:
+                job.status = ImportJobStatus.FAILED
+                job.error = str(e)
+                job.finished_at = datetime.now(timezone.utc)
+                progress_db.commit()
+        finally:
+            db.close()
+            progress_db.close()
+            os.remove(path)
+
+    @staticmethod
+    def heartbeat(db: Session) -> int:
+        """Сигнал процесса: heartbeat_at его незавершенных задач — текущее время БД."""
+        count = (
+            db.query(ImportJob)
+            .filter(ImportJob.owner == PROCESS_OWNER, ImportJob.status.in_(ACTIVE_STATUSES))
+            .update({ImportJob.heartbeat_at: func.now()}, synchronize_session=False)
+        )
+        db.commit()
+        return count
+
+    @staticmethod
+    def fail_interrupted(db: Session) -> int:
+        """Задачи остановленных процессов: статус failed, файлы удаляются.
+
+        Прерванной считается незавершенная задача без сигнала владельца
+        дольше IMPORT_HEARTBEAT_TIMEOUT (время — по часам БД): задачи живых
+        процессов и реплик не затрагиваются. Данные задачи записываются
+        одной транзакцией в конце, поэтому прерванная задача в БД ничего
+        не оставила и файл можно загрузить заново.
+        """
+        expired = func.now() - timedelta(seconds=settings.IMPORT_HEARTBEAT_TIMEOUT)
+        jobs = (
+            db.query(ImportJob)
+            .filter(
+                ImportJob.status.in_(ACTIVE_STATUSES),
+                or_(ImportJob.heartbeat_at.is_(None), ImportJob.heartbeat_at < expired),
+            )
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        finished_at = datetime.now(timezone.utc)
+        for job in jobs:
+            job.status = ImportJobStatus.FAILED
+            job.error = INTERRUPTED_ERROR
+            job.finished_at = finished_at
+            if job.upload_path and os.path.exists(job.upload_path):
+                os.remove(job.upload_path)
+        db.commit()
+        if jobs:
+            logger.warning(
+                "Прерванные задачи импорта отмечены как failed: %s", [job.id for job in jobs]
+            )
+        return len(jobs)
+
+    @staticmethod
+    def _save_progress(
+        db: Session, job: ImportJob, result: ParseResult, bytes_read: int, finished: bool = False
+    ) -> None:
+        job.bytes_processed = bytes_read
+        job.rows_processed = result.rows_processed
+        job.events_created = result.events_created
+        job.events_updated = result.events_updated
+        job.events_cancelled = result.events_cancelled
+        job.events_unchanged = result.events_unchanged
+        job.errors_count = len(result.errors)
+        job.warnings_count = len(result.warnings)
+        job.errors = result.errors[:MAX_STORED_ERRORS]
+        job.heartbeat_at = func.now()
+        if finished:
+            job.finished_at = datetime.now(timezone.utc)
+        db.commit()
+
+    @staticmethod
+    def describe(job: ImportJob) -> ImportJobSchema:
+        """Состояние задачи со скоростью (строк/с) и оценкой оставшегося времени."""
+        described = ImportJobSchema.model_validate(job)
+        if job.started_at is None:
+            return described
+        end = job.finished_at or datetime.now(timezone.utc)
+        elapsed = max((end - job.started_at).total_seconds(), 1e-6)
+        eta = None
+        if job.status == ImportJobStatus.COMPLETED:
+            eta = 0.0
+        elif job.status == ImportJobStatus.RUNNING and job.bytes_processed:
+            # Оставшаяся часть файла с той же скоростью, что и прочитанная
+            remaining = max(job.bytes_total - job.bytes_processed, 0)
+            eta = round(elapsed * remaining / job.bytes_processed, 1)
+        return described.model_copy(
+            update={
+                "rows_per_second": round(job.rows_processed / elapsed, 1),
+                "eta_seconds": eta,
+            }
+        )
+
+
+class ImportJobHeartbeat:
+    """Фоновый поток: сигнал о задачах процесса и сбой задач остановленных процессов."""
+
+    def __init__(self, session_factory: Callable[[], Session], interval: float):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="import-job-heartbeat", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def tick(self) -> None:
+        db = self.session_factory()
+        try:
+            ImportJobService.heartbeat(db)
+            ImportJobService.fail_interrupted(db)
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.tick()
+            except Exception:
+                logger.exception("Ошибка сигнала задач импорта")
@@ -0,0 +1,160 @@
+"""Занятость ресурсов событиями (таблица event_occupancy)."""
+from typing import Iterable, List
+from sqlalchemy import and_, delete, exists, false, func, literal, select, union_all
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql import ColumnElement, Select
+from app.models import Event, EventOccupancy, TimeSlot
+from app.models.event import EventGroup, EventLecturer, EventStream, EventSubgroup
+from app.validators.conflicts import ValidationService
+
+# Столбцы строк занятости (select_rows)
+_COLUMNS = ["event_id", "resource_kind", "resource_id", "period"]
+
+# Ресурсы, общие для событий одного занятия: группы потока занимаются вместе
+_SHARED_KINDS = ("room", "lecturer")
+# Поля, совпадающие у событий одного занятия (кроме преподавателей)
+_LESSON = ("time_slot_id", "room_id", "discipline_id", "work_kind_id")
+
+# Ресурсы событий из таблиц связей: тип ресурса, модель, столбец
+_LINKED_RESOURCES = (
+    ("lecturer", EventLecturer, EventLecturer.lecturer_id),
+    ("group", EventGroup, EventGroup.group_id),
+    ("subgroup", EventSubgroup, EventSubgroup.subgroup_id),
+    ("stream", EventStream, EventStream.stream_id),
+)
+
+
+class OccupancyService:
+    """Занятость ресурсов, защищенная ограничениями исключения в БД.
+
+    Для каждого запланированного события хранится по строке на каждый
+    его ресурс с интервалом времени слота. Пересечение интервалов
+    одного ресурса запрещено в Postgres, поэтому два одновременных
+    запроса не могут занять один ресурс, даже если оба прошли проверку
+    ValidationService.
+
+    Аудитория и преподаватель могут быть общими для событий одного занятия
+    с теми же слотом, аудиторией, дисциплиной, видом работ и
+    преподавателями (импорт записывает поток отдельным событием на каждую
+    группу): такая строка не записывается и конфликтом не считается. Ограничения
+    сравнивают только ресурсы одного типа: группа и ее подгруппы, поток
+    и его группы друг с другом не сверяются ни здесь, ни ValidationService.
+    """
+
+    @staticmethod
+    def select_rows(event_ids: Iterable[int]) -> Select:
+        """Строки занятости запланированных событий (для INSERT ... SELECT)."""
+        event_ids = list(event_ids)
+        period = func.tsrange(
+            TimeSlot.date + TimeSlot.time_start, TimeSlot.date + TimeSlot.time_end
+        )
+
+        def rows(kind: str, resource_id) -> Select:
+            return (
+                select(
+                    Event.id.label("event_id"),
+                    literal(kind).label("resource_kind"),
+                    resource_id.label("resource_id"),
+                    period.label("period"),
+                )
+                .join(TimeSlot, Event.time_slot_id == TimeSlot.id)
+                .where(Event.status == "scheduled", Event.id.in_(event_ids))
+            )
+
+        return union_all(
+            rows("room", Event.room_id),
+            *(
+                rows(kind, column).join(model, model.event_id == Event.id)
+                for kind, model, column in _LINKED_RESOURCES
+            ),
+        )
+
+    @staticmethod
+    def sync(db: Session, event_ids: Iterable[int], strict: bool = True) -> List[Row]:
+        """Пересчет занятости событий по их текущему состоянию, до коммита.
+
+        Строки, которые пересекаются с занятостью других событий, не
+        записываются. strict: пересечение, кроме общих аудитории и
+        преподавателя событий одного занятия, — ConflictError, после которого
+        транзакцию нужно откатить. Иначе возвращаются такие пропущенные
+        строки (см. _insert_skipping): ресурс остается за прежним событием.
+        """
+        event_ids = list(event_ids)
+        if not event_ids:
+            return []
+        db.flush()
+        db.execute(delete(EventOccupancy).where(EventOccupancy.event_id.in_(event_ids)))
+        conflicts = [
+            row for row in OccupancyService._insert_skipping(db, event_ids) if not row.shared
+        ]
+        if strict and conflicts:
+            raise ValidationService.occupancy_error(conflicts[0].resource_kind)
+        return conflicts
+
+    @staticmethod
+    def _insert_skipping(db: Session, event_ids: List[int]) -> List[Row]:
+        """Вставка занятости без пересекающихся строк.
+
+        Возвращает пропущенные строки (event_id, resource_kind, resource_id,
+        holder_event_id, shared): holder_event_id — событие, за которым
+        остался ресурс (в том числе из того же вызова или параллельной
+        транзакции, зафиксированной раньше), shared — общий ресурс событий
+        одного занятия (_SHARED_KINDS, _LESSON).
+        """
+        db.execute(
+            insert(EventOccupancy)
+            .from_select(_COLUMNS, OccupancyService.select_rows(event_ids))
+            .on_conflict_do_nothing()
+        )
+        # Отдельный запрос видит строки, вставленные выше
+        expected = OccupancyService.select_rows(event_ids).subquery("expected")
+        own, holder = aliased(EventOccupancy), aliased(EventOccupancy)
+        event, holder_event = aliased(Event), aliased(Event)
+
+        def lecturers(target) -> ColumnElement:
+            return (
+                select(func.array_agg(aggregate_order_by(
+                    EventLecturer.lecturer_id, EventLecturer.lecturer_id
+                )))
+                .where(EventLecturer.event_id == target.id)
+                .scalar_subquery()
+            )
+
+        skipped = (
+            select(
+                expected.c.event_id,
+                expected.c.resource_kind,
+                expected.c.resource_id,
+                holder.event_id.label("holder_event_id"),
+                func.coalesce(
+                    and_(
+                        expected.c.resource_kind.in_(_SHARED_KINDS),
+                        *(getattr(holder_event, name) == getattr(event, name) for name in _LESSON),
+                        lecturers(holder_event).is_not_distinct_from(lecturers(event)),
+                    ),
+                    false(),
+                ).label("shared"),
+            )
+            .join(event, event.id == expected.c.event_id)
+            .outerjoin(
+                holder,
+                and_(
+                    holder.resource_kind == expected.c.resource_kind,
+                    holder.resource_id == expected.c.resource_id,
+                    holder.period.op("&&")(expected.c.period),
+                    holder.event_id != expected.c.event_id,
+                ),
+            )
+            .outerjoin(holder_event, holder_event.id == holder.event_id)
+            .where(
+                ~exists().where(
+                    own.event_id == expected.c.event_id,
+                    own.resource_kind == expected.c.resource_kind,
+                    own.resource_id == expected.c.resource_id,
+                )
+            )
+            .order_by(expected.c.event_id)
+        )
+        return db.execute(skipped).all()
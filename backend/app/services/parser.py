@@ -1,7 +1,21 @@
 """Сервис парсинга HTML расписания."""
-from bs4 import BeautifulSoup
-from typing import Dict, List, Any, Optional, Tuple
+import hashlib
+import logging
+import os
+import re
+import time as timer
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from multiprocessing import get_context
+from lxml import etree
+from typing import (
+    Any, Callable, Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+)
 from datetime import datetime, date, time
+from sqlalchemy import and_, delete, insert, or_, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from app.models import (
     Building,
@@ -9,13 +23,47 @@ from app.models import (
     Lecturer,
     Group,
     Subgroup,
-    Stream,
     Discipline,
     WorkKind,
     TimeSlot,
     Event,
 )
+from app.core.config import settings
 from app.models.event import EventLecturer, EventGroup, EventSubgroup, EventStream
+from app.services.change_log import ChangeLogService
+from app.services.occupancy import OccupancyService
+from app.services.timetable_entries import TimetableEntryService
+
+logger = logging.getLogger(__name__)
+
+# Размер пакета INSERT при импорте
+IMPORT_BATCH_SIZE = 1000
+# Размер части файла при чтении
+FILE_CHUNK_SIZE = 1024 * 1024
+# Примерный размер части файла, разбираемой одним процессом
+PARALLEL_RANGE_BYTES = 4 * 1024 * 1024
+# Начало строки таблицы: части файла для процессов режутся только по нему
+_ROW_START = re.compile(rb"<tr[\s>]", re.IGNORECASE)
+# Корпус по умолчанию для аудиторий из HTML
+DEFAULT_BUILDING = {"name": "корп. А", "code": "A", "address": "ул. Капитана Воронина, д.6"}
+# Причина изменений событий в журнале при дифференциальном импорте
+IMPORT_REASON = "Импорт расписания"
+# Поля состояния события, которые задает строка импорта: столбцы events и связи
+EVENT_COLUMNS = ("discipline_id", "work_kind_id", "room_id", "time_slot_id", "status")
+IMPORTED_FIELDS = EVENT_COLUMNS + ("lecturer_ids", "group_ids")
+# Связи событий: модель, поле состояния, столбец связанной сущности
+EVENT_LINKS = (
+    (EventLecturer, "lecturer_ids", "lecturer_id"),
+    (EventGroup, "group_ids", "group_id"),
+    (EventSubgroup, "subgroup_ids", "subgroup_id"),
+    (EventStream, "stream_ids", "stream_id"),
+)
+WORK_KIND_COLORS = {
+    "лекция": "#28a745",
+    "практика": "#ffc107",
+    "лабораторная": "#17a2b8",
+    "аттестация": "#dc3545",
+}
 
 
 class ParseResult:
@@ -23,6 +71,17 @@ class ParseResult:
 
     def __init__(self):
         self.events_created = 0
+        # Дифференциальный импорт: измененные, отмененные и совпавшие события
+        self.events_updated = 0
+        self.events_cancelled = 0
+        self.events_unchanged = 0
+        # id измененных и отмененных событий (их карточки в кэше устаревают)
+        self.changed_event_ids: List[int] = []
+        # Разобранных строк, переданных в запись
+        self.rows_processed = 0
+        # Состояния созданных событий и измененных до и после изменения
+        # (формат ChangeLogService.get_event_state)
+        self.event_states: List[Dict[str, Any]] = []
         self.errors: List[Dict[str, Any]] = []
         self.warnings: List[Dict[str, Any]] = []
         self.entities_created: Dict[str, int] = {
@@ -33,7 +92,668 @@ class ParseResult:
             "subgroups": 0,
             "streams": 0,
             "disciplines": 0,
+            "work_kinds": 0,
+        }
+        # Длительность этапов импорта, секунды (parse, preload, entities, events)
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def timed(self, phase: str) -> Iterator[None]:
+        """Учет длительности этапа импорта."""
+        started = timer.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[phase] = round(
+                self.timings.get(phase, 0.0) + timer.perf_counter() - started, 6
+            )
+
+
+class ParsedRow(NamedTuple):
+    """Строка расписания после разбора, до сопоставления с БД."""
+
+    event_date: date
+    pair_number: int
+    discipline: str
+    work_kind: str
+    lecturer: str
+    group: str
+    # Код подгруппы ("521428-1") или пустая строка
+    subgroup: str
+    room: str
+
+
+def _fingerprint(row: ParsedRow) -> str:
+    """Отпечаток содержимого строки: тот же отпечаток — то же событие без изменений."""
+    return hashlib.md5("\x1f".join(map(str, row)).encode("utf-8")).hexdigest()
+
+
+def _batches(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _next_row_start(f, position: int, window: int = 64 * 1024) -> Optional[int]:
+    """Смещение первого "<tr" в файле не раньше position."""
+    f.seek(position)
+    tail = b""
+    while True:
+        data = f.read(window)
+        if not data:
+            return None
+        buffer = tail + data
+        match = _ROW_START.search(buffer)
+        if match:
+            return position - len(tail) + match.start()
+        # Хвост окна — на случай, если "<tr" разрезан границей окна
+        tail = buffer[-3:]
+        position += len(data)
+
+
+def split_row_ranges(path: str, range_bytes: int = PARALLEL_RANGE_BYTES) -> List[Tuple[int, int]]:
+    """Деление файла на диапазоны байт примерно по range_bytes.
+
+    Каждый диапазон, кроме первого, начинается с открывающего тега <tr>,
+    поэтому строки таблиц не разрезаются.
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        while bounds[-1] + range_bytes < size:
+            start = _next_row_start(f, bounds[-1] + range_bytes)
+            if start is None:
+                break
+            bounds.append(start)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _extract_range(
+    path: str, start: int, end: int
+) -> Tuple[List["ParsedRow"], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Разбор диапазона файла в процессе пула: строки, ошибки и предупреждения."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    result = ParseResult()
+    # Диапазон после первого начинается внутри таблицы
+    chunks = [data] if start == 0 else [b"<table>", data, b"</table>"]
+    rows = list(ParserService.iter_rows(chunks, result))
+    return rows, result.errors, result.warnings
+
+
+def _read_chunks(path: str, on_progress: Optional[Callable[[int], None]]) -> Iterator[bytes]:
+    read = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(FILE_CHUNK_SIZE), b""):
+            read += len(chunk)
+            if on_progress is not None:
+                on_progress(read)
+            yield chunk
+
+
+class ImportEngine:
+    """Пакетная запись разобранных строк в БД.
+
+    Справочники загружаются в словари одним запросом на таблицу,
+    временные слоты — по датам очередной порции строк. Недостающие
+    сущности и события вставляются пакетами INSERT ... RETURNING.
+    Число запросов зависит от числа пакетов, а не строк. Коммит
+    остается за вызывающим кодом.
+
+    В дифференциальном режиме (differential=True) строки сравниваются
+    по отпечатку с событиями тех же дат и групп: совпавшие не пишутся
+    вовсе, остальные обновляют событие того же слота и группы или
+    вставляются, а прежние импортированные события этих дат и групп,
+    которых в файле больше нет, отменяются. События групп, которых нет в
+    файле (например, другого факультета), не затрагиваются. Изменения
+    пишутся в журнал с source="import".
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        result: ParseResult,
+        batch_size: int = IMPORT_BATCH_SIZE,
+        on_batch: Optional[Callable[[ParseResult], None]] = None,
+        differential: bool = False,
+    ):
+        self.db = db
+        self.result = result
+        self.batch_size = batch_size
+        # Вызывается после записи каждой порции (отчет о ходе импорта)
+        self.on_batch = on_batch
+        self.disciplines: Dict[str, int] = {}
+        self.work_kinds: Dict[str, int] = {}
+        self.lecturers: Dict[str, int] = {}
+        self.groups: Dict[str, int] = {}
+        self.subgroups: Dict[str, int] = {}
+        self.buildings: Dict[str, int] = {}
+        self.rooms: Dict[Tuple[int, str], int] = {}
+        self.time_slots: Dict[Tuple[date, int], int] = {}
+        # Даты, слоты которых уже загружены
+        self.slot_dates: Set[date] = set()
+        self.differential = differential
+        # (дата, код группы) строк файла, события которых уже загружены
+        self.event_keys: Set[Tuple[date, Optional[str]]] = set()
+        # Все загруженные события, в том числе уже сопоставленные со строками
+        self.loaded: Set[int] = set()
+        # Еще не сопоставленные со строками события загруженных дат: id -> (отпечаток, статус)
+        self.existing: Dict[int, Tuple[Optional[str], str]] = {}
+        self.by_fingerprint: Dict[str, List[int]] = {}
+        # (слот, группа) -> id событий
+        self.by_slot: Dict[Tuple[int, Optional[int]], List[int]] = {}
+        # Строки, которые могут обновить событие своего слота (см. match_existing)
+        self.deferred: List[Tuple[Dict[str, Any], str]] = []
+        # События, записанные этим импортом (их пересечения между собой — потоки)
+        self.written: Set[int] = set()
+
+    def run(self, rows: Iterable[ParsedRow]) -> None:
+        """Загрузка справочников, создание недостающих сущностей и событий.
+
+        Строки обрабатываются порциями по batch_size, поэтому rows может
+        быть ленивым потоком (его чтение учитывается как этап parse).
+        """
+        rows = iter(rows)
+        preloaded = False
+        while True:
+            with self.result.timed("parse"):
+                batch = list(islice(rows, self.batch_size))
+            if not batch:
+                if self.differential:
+                    with self.result.timed("events"):
+                        self.finish()
+                return
+            with self.result.timed("preload"):
+                if not preloaded:
+                    self.preload()
+                    preloaded = True
+                self.preload_time_slots(batch)
+                if self.differential:
+                    self.preload_events(batch)
+            with self.result.timed("entities"):
+                self.create_entities(batch)
+            with self.result.timed("events"):
+                self.create_events(batch)
+            self.result.rows_processed += len(batch)
+            if self.on_batch is not None:
+                self.on_batch(self.result)
+
+    def preload(self) -> None:
+        """Словари «ключ -> id» существующих сущностей (при дублях — меньший id)."""
+        db = self.db
+        lookups = (
+            (self.disciplines, db.query(Discipline.name, Discipline.id).order_by(Discipline.id)),
+            (self.work_kinds, db.query(WorkKind.name, WorkKind.id)),
+            (self.lecturers, db.query(Lecturer.fio, Lecturer.id).order_by(Lecturer.id)),
+            (self.groups, db.query(Group.code, Group.id)),
+            (self.subgroups, db.query(Subgroup.code, Subgroup.id).order_by(Subgroup.id)),
+            (self.buildings, db.query(Building.code, Building.id)),
+        )
+        for lookup, query in lookups:
+            for key, entity_id in query:
+                lookup.setdefault(key, entity_id)
+
+        building_id = self.buildings.get(DEFAULT_BUILDING["code"])
+        if building_id is not None:
+            rooms = db.query(Room.number, Room.id).filter(Room.building_id == building_id)
+            for number, room_id in rooms.order_by(Room.id):
+                self.rooms.setdefault((building_id, number), room_id)
+
+    def preload_time_slots(self, rows: List[ParsedRow]) -> None:
+        """Слоты дат порции, которые еще не загружались."""
+        dates = {row.event_date for row in rows} - self.slot_dates
+        if not dates:
+            return
+        self.slot_dates |= dates
+        slots = self.db.query(TimeSlot.date, TimeSlot.pair_number, TimeSlot.id).filter(
+            TimeSlot.date.in_(dates)
+        )
+        for slot_date, pair_number, slot_id in slots.order_by(TimeSlot.id):
+            self.time_slots.setdefault((slot_date, pair_number), slot_id)
+
+    def preload_events(self, rows: List[ParsedRow]) -> None:
+        """События дат и групп порции, которые еще не загружались.
+
+        Загружаются только пары (дата, группа) из строк файла: их события
+        файл может обновить или отменить. У новых групп событий в БД нет.
+        """
+        keys = {(row.event_date, row.group or None) for row in rows} - self.event_keys
+        if not keys:
+            return
+        self.event_keys |= keys
+        criteria = []
+        grouped = [(day, self.groups[code]) for day, code in keys if code in self.groups]
+        if grouped:
+            criteria.append(tuple_(TimeSlot.date, EventGroup.group_id).in_(grouped))
+        ungrouped = [day for day, code in keys if code is None]
+        if ungrouped:
+            criteria.append(and_(TimeSlot.date.in_(ungrouped), EventGroup.id.is_(None)))
+        if criteria:
+            self.load_events(or_(*criteria))
+
+    def load_events(self, *criteria) -> None:
+        """Существующие события (по условиям на TimeSlot и EventGroup) для сопоставления."""
+        rows = (
+            self.db.query(
+                Event.id, Event.import_fingerprint, Event.status, Event.time_slot_id,
+                EventGroup.group_id,
+            )
+            .join(TimeSlot, Event.time_slot_id == TimeSlot.id)
+            .outerjoin(EventGroup, EventGroup.event_id == Event.id)
+            .filter(*criteria)
+            .order_by(Event.id, EventGroup.id)
+        )
+        for event_id, fingerprint, status, slot_id, group_id in rows:
+            # Событие нескольких групп загружается один раз, ключ слота — по первой из них
+            if event_id in self.loaded:
+                continue
+            self.loaded.add(event_id)
+            self.existing[event_id] = (fingerprint, status)
+            if fingerprint and status != "cancelled":
+                self.by_fingerprint.setdefault(fingerprint, []).append(event_id)
+            self.by_slot.setdefault((slot_id, group_id), []).append(event_id)
+
+    def create_entities(self, rows: List[ParsedRow]) -> None:
+        """Вставка справочных сущностей и слотов, которых нет в словарях."""
+        created = self.result.entities_created
+        created["disciplines"] += self._create_missing(
+            Discipline,
+            self.disciplines,
+            (row.discipline for row in rows),
+            lambda name: {"name": name, "short_name": name[:20]},
+        )
+        created["work_kinds"] += self._create_missing(
+            WorkKind,
+            self.work_kinds,
+            (row.work_kind for row in rows),
+            lambda name: {
+                "name": name,
+                "color_hex": WORK_KIND_COLORS.get(name.lower(), "#6c757d"),
+            },
+            conflict=("name",),
+        )
+        created["lecturers"] += self._create_missing(
+            Lecturer, self.lecturers, (row.lecturer for row in rows), lambda fio: {"fio": fio}
+        )
+        created["groups"] += self._create_missing(
+            Group,
+            self.groups,
+            (row.group for row in rows),
+            lambda code: {"code": code, "name": code},
+            conflict=("code",),
+        )
+        created["subgroups"] += self._create_missing(
+            Subgroup,
+            self.subgroups,
+            (row.subgroup for row in rows if row.group),
+            lambda code: {"group_id": self.groups[code.split("-")[0]], "code": code},
+        )
+
+        if any(row.room for row in rows):
+            code = DEFAULT_BUILDING["code"]
+            created["buildings"] += self._create_missing(
+                Building, self.buildings, [code], lambda _: DEFAULT_BUILDING, conflict=("code",)
+            )
+            building_id = self.buildings[code]
+            created["rooms"] += self._create_missing(
+                Room,
+                self.rooms,
+                ((building_id, row.room) for row in rows if row.room),
+                lambda key: {
+                    "building_id": key[0],
+                    "number": key[1],
+                    "capacity": 30,  # По умолчанию
+                    "type": "lecture",
+                },
+            )
+
+        # Слот пары уникален: при параллельном импорте берется уже созданный
+        self._create_missing(
+            TimeSlot,
+            self.time_slots,
+            ((row.event_date, row.pair_number) for row in rows),
+            lambda key: {
+                "date": key[0],
+                "pair_number": key[1],
+                "time_start": ParserService.PAIR_TIMES[key[1]][0],
+                "time_end": ParserService.PAIR_TIMES[key[1]][1],
+                "timezone": "Europe/Moscow",
+            },
+            conflict=("date", "pair_number"),
+        )
+
+    def _create_missing(
+        self,
+        model,
+        lookup: Dict[Hashable, int],
+        keys: Iterable[Hashable],
+        values: Callable[[Hashable], Dict[str, Any]],
+        conflict: Tuple[str, ...] = (),
+    ) -> int:
+        """Вставка сущностей для ключей, которых нет в lookup; возвращает их число.
+
+        conflict — столбцы уникального ключа в порядке элементов ключа
+        lookup (один столбец — сам ключ): при конфликте, например со
+        строкой параллельного импорта, возвращается id существующей строки
+        (ON CONFLICT DO UPDATE). Таблицы без уникального ключа вставляются
+        обычным INSERT.
+        """
+        missing = [key for key in dict.fromkeys(keys) if key and key not in lookup]
+        for batch in _batches(missing, self.batch_size):
+            if not conflict:
+                ids = self.db.execute(
+                    insert(model).returning(model.id, sort_by_parameter_order=True),
+                    [values(key) for key in batch],
+                ).scalars().all()
+                lookup.update(zip(batch, ids))
+                continue
+            statement = pg_insert(model)
+            statement = statement.on_conflict_do_update(
+                index_elements=conflict, set_={conflict[0]: statement.excluded[conflict[0]]}
+            )
+            # Ключ берется из возвращенной строки, а не из порядка параметров
+            rows = self.db.execute(
+                statement.returning(*(model.__table__.c[name] for name in conflict), model.id),
+                [values(key) for key in batch],
+            )
+            if len(conflict) == 1:
+                lookup.update((row[0], row[1]) for row in rows)
+            else:
+                lookup.update((tuple(row[:-1]), row[-1]) for row in rows)
+        return len(missing)
+
+    def create_events(self, rows: List[ParsedRow]) -> None:
+        """Вставка событий порции (в дифференциальном режиме — только новых)."""
+        building_id = self.buildings.get(DEFAULT_BUILDING["code"])
+        states: List[Dict[str, Any]] = []
+        fingerprints: List[str] = []
+        for row in rows:
+            room_id = self.rooms.get((building_id, row.room)) if row.room else None
+            if not (row.discipline and row.work_kind and room_id):
+                continue
+            lecturer_id = self.lecturers.get(row.lecturer)
+            group_id = self.groups.get(row.group)
+            states.append(
+                {
+                    "discipline_id": self.disciplines[row.discipline],
+                    "work_kind_id": self.work_kinds[row.work_kind],
+                    "room_id": room_id,
+                    "time_slot_id": self.time_slots[(row.event_date, row.pair_number)],
+                    "status": "scheduled",
+                    "lecturer_ids": [lecturer_id] if lecturer_id else [],
+                    "group_ids": [group_id] if group_id else [],
+                    "subgroup_ids": [],
+                    "stream_ids": [],
+                }
+            )
+            fingerprints.append(_fingerprint(row))
+
+        if self.differential:
+            states, fingerprints = self.match_existing(states, fingerprints)
+        self.insert_events(states, fingerprints)
+
+    @staticmethod
+    def _slot_key(state: Dict[str, Any]) -> Tuple[int, Optional[int]]:
+        group_ids = state["group_ids"]
+        return state["time_slot_id"], group_ids[0] if group_ids else None
+
+    def _take(self, event_ids: Optional[List[int]]) -> Optional[int]:
+        """Первое еще не сопоставленное событие списка; оно исключается из existing."""
+        while event_ids:
+            event_id = event_ids.pop(0)
+            if self.existing.pop(event_id, None) is not None:
+                return event_id
+        return None
+
+    def match_existing(
+        self, states: List[Dict[str, Any]], fingerprints: List[str]
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Строки порции, которые можно вставить сразу.
+
+        Строки с отпечатком существующего события пропускаются. Строки,
+        у слота и группы которых есть еще не сопоставленные события,
+        откладываются до finish: отпечаток одного из этих событий может
+        встретиться дальше в файле.
+        """
+        new_states: List[Dict[str, Any]] = []
+        new_fingerprints: List[str] = []
+        for state, fingerprint in zip(states, fingerprints):
+            if self._take(self.by_fingerprint.get(fingerprint)) is not None:
+                self.result.events_unchanged += 1
+            elif any(
+                event_id in self.existing
+                for event_id in self.by_slot.get(self._slot_key(state), ())
+            ):
+                self.deferred.append((state, fingerprint))
+            else:
+                new_states.append(state)
+                new_fingerprints.append(fingerprint)
+        return new_states, new_fingerprints
+
+    def finish(self) -> None:
+        """Обновление событий по отложенным строкам и отмена исчезнувших событий."""
+        if not self.slot_dates:
+            return
+        updates: List[Tuple[int, Dict[str, Any], str]] = []
+        states: List[Dict[str, Any]] = []
+        fingerprints: List[str] = []
+        for state, fingerprint in self.deferred:
+            event_id = self._take(self.by_slot.get(self._slot_key(state)))
+            if event_id is None:
+                states.append(state)
+                fingerprints.append(fingerprint)
+            else:
+                updates.append((event_id, state, fingerprint))
+        self.deferred = []
+        self.insert_events(states, fingerprints)
+        self.update_events(updates)
+        # Ручные события (без отпечатка) импорт не отменяет; загружены только
+        # события дат и групп файла (см. preload_events)
+        self.cancel_events(
+            [
+                event_id
+                for event_id, (fingerprint, status) in self.existing.items()
+                if fingerprint and status != "cancelled"
+            ]
+        )
+        self.existing = {}
+
+    def insert_events(self, states: List[Dict[str, Any]], fingerprints: List[str]) -> None:
+        """Вставка событий и их связей пакетами."""
+        for batch, batch_fingerprints in zip(
+            _batches(states, self.batch_size), _batches(fingerprints, self.batch_size)
+        ):
+            event_ids = self.db.execute(
+                insert(Event).returning(Event.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "discipline_id": state["discipline_id"],
+                        "work_kind_id": state["work_kind_id"],
+                        "room_id": state["room_id"],
+                        "time_slot_id": state["time_slot_id"],
+                        "status": state["status"],
+                        "import_fingerprint": fingerprint,
+                    }
+                    for state, fingerprint in zip(batch, batch_fingerprints)
+                ],
+            ).scalars().all()
+            self._insert_links(list(zip(event_ids, batch)), ("lecturer_ids", "group_ids"))
+            self._sync_schedule(event_ids)
+            if self.differential:
+                ChangeLogService.log_event_changes(
+                    self.db,
+                    [
+                        {"event_id": event_id, "reason": IMPORT_REASON, "diff_after": state}
+                        for event_id, state in zip(event_ids, batch)
+                    ],
+                    source="import",
+                )
+
+        self.result.events_created += len(states)
+        self.result.event_states.extend(states)
+
+    def _insert_links(
+        self, events: List[Tuple[int, Dict[str, Any]]], fields: Iterable[str]
+    ) -> None:
+        for model, ids_field, column in EVENT_LINKS:
+            if ids_field not in fields:
+                continue
+            links = [
+                {"event_id": event_id, column: related_id}
+                for event_id, state in events
+                for related_id in state[ids_field]
+            ]
+            if links:
+                self.db.execute(insert(model), links)
+
+    def _sync_schedule(self, event_ids: List[int]) -> None:
+        """Занятость ресурсов (без ошибок на пересечения) и модель чтения расписания."""
+        skipped = OccupancyService.sync(self.db, event_ids, strict=False)
+        self.written.update(event_ids)
+        self._warn_overlaps(skipped)
+        TimetableEntryService.sync(self.db, event_ids)
+
+    def _warn_overlaps(self, skipped) -> None:
+        """Предупреждения о событиях, пересекающихся с событиями вне импорта.
+
+        Занятость таких событий не записана, и ограничения БД их не защищают.
+        Пересечения строк самого импорта не сообщаются, общие аудитория и
+        преподаватель групп одного потока OccupancyService не возвращает.
+        """
+        overlaps: Dict[Tuple[int, int], List[str]] = {}
+        for event_id, resource_kind, _, holder_event_id, _ in skipped:
+            if holder_event_id is None or holder_event_id in self.written:
+                continue
+            overlaps.setdefault((event_id, holder_event_id), []).append(resource_kind)
+        if not overlaps:
+            return
+        logger.warning(
+            "Импорт: %s событий пересекаются с существующими, занятость не записана",
+            len({event_id for event_id, _ in overlaps}),
+        )
+        for (event_id, holder_event_id), resources in overlaps.items():
+            self.result.warnings.append(
+                {
+                    "type": "occupancy_overlap",
+                    "event_id": event_id,
+                    "conflicting_event_id": holder_event_id,
+                    "resources": sorted(set(resources)),
+                    "resolved": "Событие создано, но занятость его ресурсов не записана",
+                }
+            )
+
+    def load_states(self, event_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Состояния событий (формат ChangeLogService.get_event_state) запросом на таблицу."""
+        states = {
+            event_id: {
+                "discipline_id": discipline_id,
+                "work_kind_id": work_kind_id,
+                "room_id": room_id,
+                "time_slot_id": time_slot_id,
+                "status": status,
+                "note": note,
+                "lecturer_ids": [],
+                "group_ids": [],
+                "subgroup_ids": [],
+                "stream_ids": [],
+            }
+            for event_id, discipline_id, work_kind_id, room_id, time_slot_id, status, note
+            in self.db.query(
+                Event.id, Event.discipline_id, Event.work_kind_id, Event.room_id,
+                Event.time_slot_id, Event.status, Event.note,
+            ).filter(Event.id.in_(event_ids))
         }
+        for model, ids_field, column in EVENT_LINKS:
+            links = self.db.query(model.event_id, getattr(model, column)).filter(
+                model.event_id.in_(event_ids)
+            )
+            for event_id, related_id in links.order_by(model.id):
+                states[event_id][ids_field].append(related_id)
+        return states
+
+    def update_events(self, updates: List[Tuple[int, Dict[str, Any], str]]) -> None:
+        """Обновление событий по строкам того же слота и группы.
+
+        Если содержимое не изменилось (например, событие создано до
+        появления отпечатков), записывается только отпечаток.
+        """
+        for batch in _batches(updates, self.batch_size):
+            before = self.load_states([event_id for event_id, _, _ in batch])
+            changes: List[Dict[str, Any]] = []
+            changed_rows: List[Dict[str, Any]] = []
+            fingerprint_rows: List[Dict[str, Any]] = []
+            for event_id, state, fingerprint in batch:
+                old = before[event_id]
+                # Примечание, подгруппы и потоки импорт не меняет
+                new = {**old, **{field: state[field] for field in IMPORTED_FIELDS}}
+                if new == old:
+                    fingerprint_rows.append({"id": event_id, "import_fingerprint": fingerprint})
+                    continue
+                changed_rows.append(
+                    {
+                        "id": event_id,
+                        "import_fingerprint": fingerprint,
+                        **{field: new[field] for field in EVENT_COLUMNS},
+                    }
+                )
+                changes.append(
+                    {
+                        "event_id": event_id,
+                        "reason": IMPORT_REASON,
+                        "diff_before": old,
+                        "diff_after": new,
+                    }
+                )
+
+            for rows in (fingerprint_rows, changed_rows):
+                if rows:
+                    self.db.execute(update(Event), rows)
+            for model, ids_field, _ in EVENT_LINKS[:2]:
+                relinked = [
+                    (change["event_id"], change["diff_after"])
+                    for change in changes
+                    if change["diff_before"][ids_field] != change["diff_after"][ids_field]
+                ]
+                if relinked:
+                    self.db.execute(
+                        delete(model).where(model.event_id.in_([i for i, _ in relinked]))
+                    )
+                    self._insert_links(relinked, (ids_field,))
+            self._sync_schedule([change["event_id"] for change in changes])
+            self._log_changes(changes)
+            self.result.events_unchanged += len(fingerprint_rows)
+            self.result.events_updated += len(changes)
+
+    def cancel_events(self, event_ids: List[int]) -> None:
+        """Отмена событий, которых больше нет в файле."""
+        for batch in _batches(event_ids, self.batch_size):
+            before = self.load_states(batch)
+            self.db.execute(
+                update(Event)
+                .where(Event.id.in_(batch))
+                .values(status="cancelled")
+                .execution_options(synchronize_session=False)
+            )
+            self._sync_schedule(batch)
+            self._log_changes(
+                [
+                    {
+                        "event_id": event_id,
+                        "reason": IMPORT_REASON,
+                        "diff_before": state,
+                        "diff_after": {**state, "status": "cancelled"},
+                    }
+                    for event_id, state in before.items()
+                ]
+            )
+            self.result.events_cancelled += len(before)
+
+    def _log_changes(self, changes: List[Dict[str, Any]]) -> None:
+        ChangeLogService.log_event_changes(self.db, changes, source="import")
+        for change in changes:
+            self.result.changed_event_ids.append(change["event_id"])
+            self.result.event_states.extend((change["diff_before"], change["diff_after"]))
 
 
 class ParserService:
@@ -52,194 +772,196 @@ class ParserService:
     }
 
     @staticmethod
-    def parse_html(db: Session, html_content: str) -> ParseResult:
-        """Парсинг HTML расписания."""
-        result = ParseResult()
-        soup = BeautifulSoup(html_content, "lxml")
+    def parse_html(db: Session, html_content: str, differential: bool = False) -> ParseResult:
+        """Парсинг HTML расписания из строки."""
+        return ParserService.parse_stream(
+            db, [html_content.encode("utf-8")], differential=differential
+        )
 
-        # Здесь должна быть логика парсинга конкретного формата HTML
-        # Для MVP создадим упрощенный парсер, который ищет таблицы/списки
-
-        # Пример: поиск таблиц с расписанием
-        tables = soup.find_all("table")
-        for table in tables:
-            rows = table.find_all("tr")
-            for row in rows:
-                cells = row.find_all(["td", "th"])
-                if len(cells) >= 5:
-                    # Попытка распарсить строку
-                    try:
-                        ParserService._parse_row(db, cells, result)
-                    except Exception as e:
-                        result.errors.append(
-                            {"row": str(row), "error": str(e), "type": "parse_error"}
-                        )
+    @staticmethod
+    def parse_stream(
+        db: Session,
+        chunks: Iterable[bytes],
+        on_batch: Optional[Callable[[ParseResult], None]] = None,
+        differential: bool = False,
+    ) -> ParseResult:
+        """Парсинг HTML расписания, поступающего частями (например, из UploadFile).
+
+        Строки разбираются по мере чтения и записываются в БД порциями
+        (см. ImportEngine), поэтому память не растет с размером файла.
+        Длительность этапов — в result.timings, on_batch вызывается после
+        каждой записанной порции. differential — см. ImportEngine.
+        """
+        result = ParseResult()
+        engine = ImportEngine(db, result, on_batch=on_batch, differential=differential)
+        engine.run(ParserService.iter_rows(chunks, result))
+        return result
 
+    @staticmethod
+    def parse_file(
+        db: Session,
+        path: str,
+        on_batch: Optional[Callable[[ParseResult], None]] = None,
+        on_progress: Optional[Callable[[int], None]] = None,
+        processes: Optional[int] = None,
+        differential: bool = False,
+    ) -> ParseResult:
+        """Парсинг HTML файла с диска.
+
+        Файлы от IMPORT_PARALLEL_MIN_BYTES разбираются параллельно в
+        processes процессах (по умолчанию IMPORT_PARSE_PROCESSES или по
+        числу ядер), остальные — потоково в текущем. on_progress получает
+        число уже разобранных байт.
+        """
+        if processes is None:
+            processes = settings.IMPORT_PARSE_PROCESSES or os.cpu_count() or 1
+        result = ParseResult()
+        if processes > 1 and os.path.getsize(path) >= settings.IMPORT_PARALLEL_MIN_BYTES:
+            rows = ParserService.iter_rows_parallel(path, result, processes, on_progress)
+        else:
+            rows = ParserService.iter_rows(_read_chunks(path, on_progress), result)
+        ImportEngine(db, result, on_batch=on_batch, differential=differential).run(rows)
         return result
 
     @staticmethod
-    def _parse_row(db: Session, cells: List, result: ParseResult):
-        """Парсинг одной строки расписания."""
-        # Упрощенная логика - в реальности нужен анализ конкретного формата
-        # Пример структуры: дата | пара | дисциплина | вид | преподаватель | группа | аудитория
+    def iter_rows_parallel(
+        path: str,
+        result: ParseResult,
+        processes: int,
+        on_progress: Optional[Callable[[int], None]] = None,
+        range_bytes: int = PARALLEL_RANGE_BYTES,
+    ) -> Iterator[ParsedRow]:
+        """Строки файла, извлеченные пулом процессов по диапазонам байт.
+
+        Строки отдаются в порядке файла. В работе не больше двух
+        диапазонов на процесс, поэтому память ограничена, даже если
+        запись в БД медленнее разбора.
+        """
+        ranges = iter(split_row_ranges(path, range_bytes))
+        # spawn: процесс API многопоточный, fork из него небезопасен
+        with ProcessPoolExecutor(max_workers=processes, mp_context=get_context("spawn")) as pool:
+            pending = deque(
+                (end, pool.submit(_extract_range, path, start, end))
+                for start, end in islice(ranges, processes * 2)
+            )
+            while pending:
+                end, future = pending.popleft()
+                rows, errors, warnings = future.result()
+                next_range = next(ranges, None)
+                if next_range is not None:
+                    pending.append((next_range[1], pool.submit(_extract_range, path, *next_range)))
+                result.errors.extend(errors)
+                result.warnings.extend(warnings)
+                if on_progress is not None:
+                    on_progress(end)
+                yield from rows
 
-        if len(cells) < 6:
-            return
+    @staticmethod
+    def parse_rows(html_content: str, result: ParseResult) -> List[ParsedRow]:
+        """Разбор строк таблиц HTML без обращения к БД."""
+        return list(ParserService.iter_rows([html_content.encode("utf-8")], result))
 
-        # Извлечение данных (пример)
-        date_str = cells[0].get_text(strip=True)
-        pair_str = cells[1].get_text(strip=True)
-        discipline_str = cells[2].get_text(strip=True)
-        work_kind_str = cells[3].get_text(strip=True)
-        lecturer_str = cells[4].get_text(strip=True)
-        group_str = cells[5].get_text(strip=True)
-        room_str = cells[6].get_text(strip=True) if len(cells) > 6 else ""
-
-        # Нормализация и создание сущностей
-        discipline = ParserService._get_or_create_discipline(db, discipline_str, result)
-        work_kind = ParserService._get_or_create_work_kind(db, work_kind_str, result)
-        lecturer = ParserService._get_or_create_lecturer(db, lecturer_str, result)
-        group = ParserService._get_or_create_group(db, group_str, result)
-        room, building = ParserService._get_or_create_room(
-            db, room_str, result
-        )  # Может быть диапазон
-
-        # Парсинг даты и пары
-        try:
-            event_date = datetime.strptime(date_str, "%d.%m.%Y").date()
-        except:
-            result.errors.append({"field": "date", "value": date_str, "type": "date_parse"})
-            return
+    @staticmethod
+    def iter_rows(chunks: Iterable[bytes], result: ParseResult) -> Iterator[ParsedRow]:
+        """Потоковый разбор строк таблиц HTML (UTF-8).
+
+        Элементы <tr> обрабатываются по мере закрытия и сразу удаляются
+        из дерева вместе с предыдущими соседями, поэтому в памяти
+        остается только текущая строка и ее предки.
+        """
+        parser = etree.HTMLPullParser(events=("end",), tag="tr", encoding="utf-8")
+
+        def rows() -> Iterator[ParsedRow]:
+            for _, row in parser.read_events():
+                parsed = ParserService._parse_element(row, result)
+                # Освобождение разобранных элементов
+                row.clear()
+                parent = row.getparent()
+                if parent is not None:
+                    while row.getprevious() is not None:
+                        del parent[0]
+                if parsed is not None:
+                    yield parsed
+
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from rows()
+        parser.close()
+        yield from rows()
 
+    @staticmethod
+    def _parse_element(row, result: ParseResult) -> Optional[ParsedRow]:
+        """Разбор элемента <tr>; строки вне таблиц пропускаются."""
+        # Здесь должна быть логика парсинга конкретного формата HTML
+        # Для MVP создадим упрощенный парсер, который ищет строки таблиц
+        if next(row.iterancestors("table"), None) is None:
+            return None
+        cells = list(row.iterchildren("td", "th"))
+        if len(cells) < 5:
+            return None
+        # Попытка распарсить строку
         try:
-            pair_number = int(pair_str)
-        except:
-            result.errors.append({"field": "pair", "value": pair_str, "type": "pair_parse"})
-            return
-
-        # Создание временного слота
-        if pair_number in ParserService.PAIR_TIMES:
-            time_start, time_end = ParserService.PAIR_TIMES[pair_number]
-            time_slot = ParserService._get_or_create_time_slot(
-                db, event_date, pair_number, time_start, time_end
+            return ParserService._parse_row(
+                ["".join(text.strip() for text in cell.itertext()) for cell in cells], result
             )
-        else:
+        except Exception as e:
             result.errors.append(
-                {"field": "pair", "value": pair_number, "type": "invalid_pair"}
-            )
-            return
-
-        # Создание события
-        if discipline and work_kind and room and time_slot:
-            event = Event(
-                discipline_id=discipline.id,
-                work_kind_id=work_kind.id,
-                room_id=room.id,
-                time_slot_id=time_slot.id,
-                status="scheduled",
+                {
+                    "row": etree.tostring(row, encoding="unicode"),
+                    "error": str(e),
+                    "type": "parse_error",
+                }
             )
-            db.add(event)
-            db.flush()
-
-            if lecturer:
-                db.add(EventLecturer(event_id=event.id, lecturer_id=lecturer.id))
-            if group:
-                db.add(EventGroup(event_id=event.id, group_id=group.id))
-
-            result.events_created += 1
-
-    @staticmethod
-    def _get_or_create_discipline(db: Session, name: str, result: ParseResult) -> Optional[Discipline]:
-        """Получение или создание дисциплины."""
-        if not name:
             return None
-        discipline = db.query(Discipline).filter(Discipline.name == name).first()
-        if not discipline:
-            discipline = Discipline(name=name, short_name=name[:20] if len(name) > 20 else name)
-            db.add(discipline)
-            db.flush()
-            result.entities_created["disciplines"] += 1
-        return discipline
 
     @staticmethod
-    def _get_or_create_work_kind(db: Session, name: str, result: ParseResult) -> Optional[WorkKind]:
-        """Получение или создание вида занятия."""
-        if not name:
+    def _parse_row(cells: List[str], result: ParseResult) -> Optional[ParsedRow]:
+        """Разбор текста ячеек одной строки расписания."""
+        # Упрощенная логика - в реальности нужен анализ конкретного формата
+        # Пример структуры: дата | пара | дисциплина | вид | преподаватель | группа | аудитория
+
+        if len(cells) < 6:
             return None
 
-        # Нормализация названия
-        name_lower = name.lower()
-        color_map = {
-            "лекция": "#28a745",
-            "практика": "#ffc107",
-            "лабораторная": "#17a2b8",
-            "аттестация": "#dc3545",
-        }
-        color = color_map.get(name_lower, "#6c757d")
+        date_str, pair_str, discipline, work_kind, lecturer, group = cells[:6]
+        room_str = cells[6] if len(cells) > 6 else ""
 
-        work_kind = db.query(WorkKind).filter(WorkKind.name == name).first()
-        if not work_kind:
-            work_kind = WorkKind(name=name, color_hex=color)
-            db.add(work_kind)
-            db.flush()
-        return work_kind
+        try:
+            event_date = datetime.strptime(date_str, "%d.%m.%Y").date()
+        except ValueError:
+            result.errors.append({"field": "date", "value": date_str, "type": "date_parse"})
+            return None
 
-    @staticmethod
-    def _get_or_create_lecturer(db: Session, fio: str, result: ParseResult) -> Optional[Lecturer]:
-        """Получение или создание преподавателя."""
-        if not fio:
+        try:
+            pair_number = int(pair_str)
+        except ValueError:
+            result.errors.append({"field": "pair", "value": pair_str, "type": "pair_parse"})
             return None
-        lecturer = db.query(Lecturer).filter(Lecturer.fio == fio).first()
-        if not lecturer:
-            lecturer = Lecturer(fio=fio)
-            db.add(lecturer)
-            db.flush()
-            result.entities_created["lecturers"] += 1
-        return lecturer
 
-    @staticmethod
-    def _get_or_create_group(db: Session, code: str, result: ParseResult) -> Optional[Group]:
-        """Получение или создание группы."""
-        if not code:
+        if pair_number not in ParserService.PAIR_TIMES:
+            result.errors.append(
+                {"field": "pair", "value": pair_number, "type": "invalid_pair"}
+            )
             return None
 
         # Обработка подгрупп (например, "521428-1")
-        if "-" in code:
-            parts = code.split("-")
-            group_code = parts[0]
-            subgroup_code = code
-        else:
-            group_code = code
-            subgroup_code = None
-
-        group = db.query(Group).filter(Group.code == group_code).first()
-        if not group:
-            group = Group(code=group_code, name=group_code)
-            db.add(group)
-            db.flush()
-            result.entities_created["groups"] += 1
-
-        # Создание подгруппы если нужно
-        if subgroup_code and "-" in code:
-            subgroup = db.query(Subgroup).filter(Subgroup.code == subgroup_code).first()
-            if not subgroup:
-                subgroup = Subgroup(group_id=group.id, code=subgroup_code)
-                db.add(subgroup)
-                db.flush()
-                result.entities_created["subgroups"] += 1
-
-        return group
+        subgroup = group if "-" in group else ""
+        group = group.split("-")[0] if subgroup else group
+
+        return ParsedRow(
+            event_date=event_date,
+            pair_number=pair_number,
+            discipline=discipline,
+            work_kind=work_kind,
+            lecturer=lecturer,
+            group=group,
+            subgroup=subgroup,
+            room=ParserService._room_number(room_str, result),
+        )
 
     @staticmethod
-    def _get_or_create_room(
-        db: Session, room_str: str, result: ParseResult
-    ) -> Tuple[Optional[Room], Optional[Building]]:
-        """Получение или создание аудитории."""
-        if not room_str:
-            return None, None
-
-        # Обработка диапазонов типа "305-309", "301-302"
-        # Для MVP берем первую аудиторию
+    def _room_number(room_str: str, result: ParseResult) -> str:
+        """Номер аудитории; из диапазона типа "305-309" берется первая."""
         if "-" in room_str and room_str.replace("-", "").isdigit():
             room_number = room_str.split("-")[0]
             result.warnings.append(
@@ -249,62 +971,5 @@ class ParserService:
                     "resolved": f"Использована аудитория {room_number}",
                 }
             )
-        else:
-            room_number = room_str
-
-        # Поиск корпуса (упрощенно - по умолчанию корп. А)
-        building = db.query(Building).filter(Building.code == "A").first()
-        if not building:
-            building = Building(
-                name="корп. А",
-                code="A",
-                address="ул. Капитана Воронина, д.6",
-            )
-            db.add(building)
-            db.flush()
-            result.entities_created["buildings"] += 1
-
-        # Поиск аудитории
-        room = (
-            db.query(Room)
-            .filter(Room.building_id == building.id, Room.number == room_number)
-            .first()
-        )
-        if not room:
-            room = Room(
-                building_id=building.id,
-                number=room_number,
-                capacity=30,  # По умолчанию
-                type="lecture",
-            )
-            db.add(room)
-            db.flush()
-            result.entities_created["rooms"] += 1
-
-        return room, building
-
-    @staticmethod
-    def _get_or_create_time_slot(
-        db: Session, event_date: date, pair_number: int, time_start: time, time_end: time
-    ) -> TimeSlot:
-        """Получение или создание временного слота."""
-        time_slot = (
-            db.query(TimeSlot)
-            .filter(
-                TimeSlot.date == event_date,
-                TimeSlot.pair_number == pair_number,
-            )
-            .first()
-        )
-        if not time_slot:
-            time_slot = TimeSlot(
-                date=event_date,
-                pair_number=pair_number,
-                time_start=time_start,
-                time_end=time_end,
-                timezone="Europe/Moscow",
-            )
-            db.add(time_slot)
-            db.flush()
-        return time_slot
-
+            return room_number
+        return room_str
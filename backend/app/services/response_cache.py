@@ -0,0 +1,98 @@
+"""Кэширование готовых JSON ответов."""
+import hashlib
+from datetime import date
+from typing import Any, Callable, Iterable, Optional, Tuple
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from app.services.cache import cache_service
+
+# Тело ответа и его ETag, как они хранятся в кэше
+CachedBody = Tuple[str, bytes]
+
+
+def _encode(entry: CachedBody) -> bytes:
+    etag, body = entry
+    return etag.encode() + b"\n" + body
+
+
+def _decode(data: bytes) -> CachedBody:
+    etag, _, body = data.partition(b"\n")
+    return etag.decode(), body
+
+
+class ResponseCacheService:
+    """Ответы, закодированные в JSON один раз при промахе кэша.
+
+    При попадании байты отдаются как есть, без повторной валидации
+    response_model и кодирования. Клиент с совпадающим If-None-Match
+    получает 304 без тела.
+    """
+
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        """Сильный ETag по содержимому ответа."""
+        return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    @staticmethod
+    def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        """Совпадает ли ETag с одним из значений заголовка If-None-Match."""
+        if not if_none_match:
+            return False
+        candidates = [value.strip() for value in if_none_match.split(",")]
+        return "*" in candidates or any(
+            candidate.removeprefix("W/") == etag for candidate in candidates
+        )
+
+    @staticmethod
+    def cached_response(
+        request: Request,
+        key: str,
+        producer: Callable[[], Any],
+        adapter: TypeAdapter,
+        ttl: int = 300,
+        tags: Optional[Iterable[str]] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> Response:
+        """Ответ из кэша или результат producer(), закодированный через adapter."""
+        return ResponseCacheService.cached_body(
+            request,
+            key,
+            # Валидация и кодирование, как для response_model, но один раз
+            lambda: adapter.dump_json(adapter.validate_python(producer())),
+            ttl=ttl,
+            tags=tags,
+            date_from=date_from,
+            date_to=date_to,
+        )
+
+    @staticmethod
+    def cached_body(
+        request: Request,
+        key: str,
+        producer: Callable[[], bytes],
+        ttl: int = 300,
+        tags: Optional[Iterable[str]] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> Response:
+        """Ответ из кэша или готовое тело JSON producer() (например, собранное в БД)."""
+
+        def build() -> CachedBody:
+            body = producer()
+            return ResponseCacheService.make_etag(body), body
+
+        etag, body = cache_service.get_or_set(
+            key,
+            build,
+            ttl=ttl,
+            tags=tags,
+            date_from=date_from,
+            date_to=date_to,
+            encode=_encode,
+            decode=_decode,
+        )
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if ResponseCacheService.etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
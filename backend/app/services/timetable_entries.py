@@ -0,0 +1,563 @@
+"""Модель чтения расписания (таблица timetable_entries)."""
+from datetime import date, time
+from functools import lru_cache
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import Integer, Text, and_, bindparam, cast, delete, func, literal
+from sqlalchemy import literal_column, select, text, tuple_, union_all
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array, insert
+from sqlalchemy.engine import Result
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql import ColumnElement, Select
+from app.models import (
+    Building,
+    Discipline,
+    Event,
+    Group,
+    Lecturer,
+    Room,
+    Stream,
+    Subgroup,
+    TimeSlot,
+    TimetableEntry,
+    WorkKind,
+)
+from app.models.event import EventGroup, EventLecturer, EventStream, EventSubgroup
+from app.services.event_query import EventQueryService, TimetableCursor
+from app.validators.conflict_engine import ConflictEngine, ScheduleItem
+
+# Связи события: столбцы id и подписей, таблица связи и ее столбец, справочник и подпись
+_LINKS = (
+    ("lecturer_ids", "lecturer_fios", EventLecturer, EventLecturer.lecturer_id, Lecturer, "fio"),
+    ("group_ids", "group_codes", EventGroup, EventGroup.group_id, Group, "code"),
+    ("subgroup_ids", "subgroup_codes", EventSubgroup, EventSubgroup.subgroup_id, Subgroup, "code"),
+    ("stream_ids", "stream_names", EventStream, EventStream.stream_id, Stream, "name"),
+)
+
+# Столбцы, которые не зависят от связей many-to-many
+_COLUMNS = {
+    "event_id": Event.id,
+    "note": Event.note,
+    "time_slot_id": TimeSlot.id,
+    "date": TimeSlot.date,
+    "pair_number": TimeSlot.pair_number,
+    "time_start": TimeSlot.time_start,
+    "time_end": TimeSlot.time_end,
+    "discipline_id": Discipline.id,
+    "discipline_name": Discipline.name,
+    "work_kind_id": WorkKind.id,
+    "work_kind_name": WorkKind.name,
+    "work_kind_color_hex": WorkKind.color_hex,
+    "room_id": Room.id,
+    "room_number": Room.number,
+    "building_id": Building.id,
+    "building_name": Building.name,
+    "building_address": Building.address,
+}
+
+# В модели чтения только запланированные события
+SCHEDULED = "scheduled"
+_EMPTY_JSON = literal_column("'[]'::json")
+
+
+class TimetableEntryService:
+    """Денормализованное расписание: одна строка на запланированное событие.
+
+    Записи событий (API, пакетное создание, импорт) пересчитывают строки
+    своих событий в той же транзакции, поэтому чтение расписания — один
+    запрос по индексам timetable_entries без JOIN. Подписи справочников
+    копируются в строки: после переименования справочника нужен rebuild.
+    """
+
+    @staticmethod
+    def select_rows(
+        event_ids: Optional[Iterable[int]] = None, scheduled_only: bool = True
+    ) -> Select:
+        """Строки модели чтения запланированных событий (для INSERT ... SELECT).
+
+        event_ids=None — все события. scheduled_only=False — события в любом
+        статусе (для чтения отдельного события, см. EventRecordService).
+        """
+        columns = [column.label(name) for name, column in _COLUMNS.items()]
+        for ids_name, labels_name, link, column, model, label in _LINKS:
+            linked = (
+                select(model.id)
+                .join(link, column == model.id)
+                .where(link.event_id == Event.id)
+                .order_by(link.id)
+            )
+            columns.append(func.array(linked.scalar_subquery()).label(ids_name))
+            columns.append(
+                func.array(
+                    linked.with_only_columns(getattr(model, label)).scalar_subquery()
+                ).label(labels_name)
+            )
+
+        statement = (
+            select(*columns)
+            .join(TimeSlot, Event.time_slot_id == TimeSlot.id)
+            .join(Discipline, Event.discipline_id == Discipline.id)
+            .join(WorkKind, Event.work_kind_id == WorkKind.id)
+            .join(Room, Event.room_id == Room.id)
+            .join(Building, Room.building_id == Building.id)
+        )
+        if scheduled_only:
+            statement = statement.where(Event.status == SCHEDULED)
+        if event_ids is not None:
+            statement = statement.where(Event.id.in_(list(event_ids)))
+        return statement
+
+    @staticmethod
+    def sync(db: Session, event_ids: Iterable[int]) -> None:
+        """Пересчет строк событий по их текущему состоянию, до коммита."""
+        event_ids = list(event_ids)
+        if not event_ids:
+            return
+        db.flush()
+        db.execute(delete(TimetableEntry).where(TimetableEntry.event_id.in_(event_ids)))
+        TimetableEntryService._insert(db, TimetableEntryService.select_rows(event_ids))
+
+    @staticmethod
+    def rebuild(db: Session) -> None:
+        """Пересчет всей модели чтения (после изменения справочников).
+
+        Статистика таблицы обновляется сразу: без нее планировщик считает
+        таблицу почти пустой и соединяет строки с конфликтами в json_rows
+        вложенными циклами (время растет квадратично).
+        """
+        db.flush()
+        db.execute(delete(TimetableEntry))
+        TimetableEntryService._insert(db, TimetableEntryService.select_rows())
+        TimetableEntryService.analyze(db)
+
+    @staticmethod
+    def analyze(db: Session) -> None:
+        """Обновление статистики таблицы после массовой записи."""
+        db.execute(text(f"ANALYZE {TimetableEntry.__tablename__}"))
+
+    @staticmethod
+    def _insert(db: Session, rows: Select) -> None:
+        db.execute(insert(TimetableEntry).from_select(list(rows.selected_columns.keys()), rows))
+
+    @staticmethod
+    def criteria(
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        group_id: Optional[int] = None,
+        lecturer_id: Optional[int] = None,
+        room_id: Optional[int] = None,
+        building_id: Optional[int] = None,
+        stream_id: Optional[int] = None,
+    ) -> List[ColumnElement]:
+        """Условия фильтров расписания на столбцы timetable_entries.
+
+        Значениями могут быть и bindparam (см. _json_source).
+        """
+        criteria = []
+        if date_from is not None:
+            criteria.append(TimetableEntry.date >= date_from)
+        if date_to is not None:
+            criteria.append(TimetableEntry.date <= date_to)
+        for column, value in (
+            (TimetableEntry.group_ids, group_id),
+            (TimetableEntry.lecturer_ids, lecturer_id),
+            (TimetableEntry.stream_ids, stream_id),
+        ):
+            if value is not None:
+                criteria.append(column.contains(array([value])))
+        if room_id is not None:
+            criteria.append(TimetableEntry.room_id == room_id)
+        if building_id is not None:
+            criteria.append(TimetableEntry.building_id == building_id)
+        return criteria
+
+    @staticmethod
+    def query(db: Session, after: Optional[TimetableCursor] = None, **filters) -> Query:
+        """Расписание с фильтрами в порядке (дата, начало, id), как timetable_query."""
+        query = db.query(TimetableEntry).filter(*TimetableEntryService.criteria(**filters))
+        if after:
+            query = query.filter(
+                tuple_(TimetableEntry.date, TimetableEntry.time_start, TimetableEntry.event_id)
+                > tuple_(*after)
+            )
+        return query.order_by(
+            TimetableEntry.date, TimetableEntry.time_start, TimetableEntry.event_id
+        )
+
+    @staticmethod
+    def encode_cursor(entry: TimetableEntry) -> str:
+        """Курсор страницы, которая заканчивается строкой entry (см. decode_cursor)."""
+        return EventQueryService.encode_key((entry.date, entry.time_start, entry.event_id))
+
+    @staticmethod
+    def with_conflicts(
+        entries: Iterable[TimetableEntry],
+    ) -> Iterator[Tuple[TimetableEntry, List[int]]]:
+        """Строки с id конфликтующих событий, по одной дате за раз.
+
+        entries должны быть упорядочены по дате: конфликты возможны только
+        внутри одной даты, поэтому в памяти держится только текущий день.
+        """
+        for _, day_entries in groupby(entries, key=lambda entry: entry.date):
+            day_entries = list(day_entries)
+            conflicts = ConflictEngine.conflict_map(
+                ScheduleItem.from_entry(entry) for entry in day_entries
+            )
+            for entry in day_entries:
+                yield entry, conflicts.get(entry.event_id, [])
+
+    @staticmethod
+    def _time_slot(entry: TimetableEntry) -> Dict[str, Any]:
+        return {
+            "id": entry.time_slot_id,
+            "date": entry.date.isoformat(),
+            "pair_number": entry.pair_number,
+            "time_start": entry.time_start.strftime("%H:%M"),
+            "time_end": entry.time_end.strftime("%H:%M"),
+        }
+
+    @staticmethod
+    def to_detail_dict(
+        entry: TimetableEntry, conflicting_event_ids: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """Детальное представление события (EventDetail)."""
+        conflicting_event_ids = conflicting_event_ids or []
+        return {
+            "id": entry.event_id,
+            "discipline_id": entry.discipline_id,
+            "work_kind_id": entry.work_kind_id,
+            "room_id": entry.room_id,
+            "time_slot_id": entry.time_slot_id,
+            "status": entry.status,
+            "note": entry.note,
+            "discipline": {"id": entry.discipline_id, "name": entry.discipline_name},
+            "work_kind": {
+                "id": entry.work_kind_id,
+                "name": entry.work_kind_name,
+                "color_hex": entry.work_kind_color_hex,
+            },
+            "room": {
+                "id": entry.room_id,
+                "number": entry.room_number,
+                "building": {
+                    "id": entry.building_id,
+                    "name": entry.building_name,
+                    "address": entry.building_address,
+                },
+            },
+            "time_slot": TimetableEntryService._time_slot(entry),
+            "has_conflict": bool(conflicting_event_ids),
+            "conflicting_event_ids": conflicting_event_ids,
+            "lecturers": [
+                {"id": id, "fio": fio} for id, fio in zip(entry.lecturer_ids, entry.lecturer_fios)
+            ],
+            "groups": [
+                {"id": id, "code": code} for id, code in zip(entry.group_ids, entry.group_codes)
+            ],
+            "subgroups": [
+                {"id": id, "code": code}
+                for id, code in zip(entry.subgroup_ids, entry.subgroup_codes)
+            ],
+            "streams": [
+                {"id": id, "name": name} for id, name in zip(entry.stream_ids, entry.stream_names)
+            ],
+        }
+
+    @staticmethod
+    def to_compact(pairs: Iterable[Tuple[TimetableEntry, List[int]]]) -> Dict[str, Any]:
+        """Нормализованное представление расписания (TimetableCompact).
+
+        pairs — строки с id конфликтующих событий (см. with_conflicts).
+        """
+        entities: Dict[str, Dict[int, Dict[str, Any]]] = {
+            name: {}
+            for name in (
+                "disciplines",
+                "work_kinds",
+                "rooms",
+                "buildings",
+                "time_slots",
+                "lecturers",
+                "groups",
+                "subgroups",
+                "streams",
+            )
+        }
+        events: Dict[str, List[Any]] = {
+            name: []
+            for name in (
+                "id",
+                "discipline_id",
+                "work_kind_id",
+                "room_id",
+                "time_slot_id",
+                "status",
+                "note",
+                "lecturer_ids",
+                "group_ids",
+                "subgroup_ids",
+                "stream_ids",
+                "conflicting_event_ids",
+            )
+        }
+
+        def add(name: str, id: int, build) -> None:
+            if id not in entities[name]:
+                entities[name][id] = build()
+
+        for entry, conflicting_event_ids in pairs:
+            add(
+                "disciplines",
+                entry.discipline_id,
+                lambda: {"id": entry.discipline_id, "name": entry.discipline_name},
+            )
+            add(
+                "work_kinds",
+                entry.work_kind_id,
+                lambda: {
+                    "id": entry.work_kind_id,
+                    "name": entry.work_kind_name,
+                    "color_hex": entry.work_kind_color_hex,
+                },
+            )
+            add(
+                "rooms",
+                entry.room_id,
+                lambda: {
+                    "id": entry.room_id,
+                    "number": entry.room_number,
+                    "building_id": entry.building_id,
+                },
+            )
+            add(
+                "buildings",
+                entry.building_id,
+                lambda: {
+                    "id": entry.building_id,
+                    "name": entry.building_name,
+                    "address": entry.building_address,
+                },
+            )
+            add("time_slots", entry.time_slot_id, lambda: TimetableEntryService._time_slot(entry))
+            for name, ids, labels, label in (
+                ("lecturers", entry.lecturer_ids, entry.lecturer_fios, "fio"),
+                ("groups", entry.group_ids, entry.group_codes, "code"),
+                ("subgroups", entry.subgroup_ids, entry.subgroup_codes, "code"),
+                ("streams", entry.stream_ids, entry.stream_names, "name"),
+            ):
+                for id, value in zip(ids, labels):
+                    add(name, id, lambda: {"id": id, label: value})
+
+            events["id"].append(entry.event_id)
+            events["discipline_id"].append(entry.discipline_id)
+            events["work_kind_id"].append(entry.work_kind_id)
+            events["room_id"].append(entry.room_id)
+            events["time_slot_id"].append(entry.time_slot_id)
+            events["status"].append(entry.status)
+            events["note"].append(entry.note)
+            events["lecturer_ids"].append(list(entry.lecturer_ids))
+            events["group_ids"].append(list(entry.group_ids))
+            events["subgroup_ids"].append(list(entry.subgroup_ids))
+            events["stream_ids"].append(list(entry.stream_ids))
+            events["conflicting_event_ids"].append(conflicting_event_ids)
+
+        result: Dict[str, Any] = {name: list(items.values()) for name, items in entities.items()}
+        result["events"] = events
+        return result
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _json_source(names: Tuple[str, ...], paged: bool) -> Tuple[ColumnElement, Any, Any]:
+        """EventDetail строки, собираемый json_build_object, и FROM для него.
+
+        Конфликты ищутся в SQL так же, как в with_conflicts: среди строк
+        тех же фильтров, по парам с общим ресурсом и пересекающимся
+        временем в одну дату. Фильтры names передаются параметрами
+        запроса, поэтому запрос строится один раз на набор фильтров.
+
+        С paged строки entries — одна страница: после курсора (after_*) и
+        не больше limit. Конфликты тогда ищутся только среди строк фильтров
+        в даты страницы, как в _timetable_page, а не по всему расписанию.
+        """
+        criteria = TimetableEntryService.criteria(**{name: bindparam(name) for name in names})
+        entries = select(TimetableEntry).where(*criteria)
+        if paged:
+            key = (TimetableEntry.date, TimetableEntry.time_start, TimetableEntry.event_id)
+            entries = (
+                entries.where(
+                    tuple_(*key) > tuple_(*(bindparam(f"after_{column.name}") for column in key))
+                )
+                .order_by(*key)
+                .limit(bindparam("limit", type_=Integer))
+            )
+        entries = entries.cte("entries")
+        scope = entries
+        if paged:
+            # Даты страницы: конфликт возможен только с событием в ту же дату
+            scope = (
+                select(TimetableEntry)
+                .where(
+                    *criteria,
+                    TimetableEntry.date.between(
+                        select(func.min(entries.c.date)).scalar_subquery(),
+                        select(func.max(entries.c.date)).scalar_subquery(),
+                    ),
+                )
+                .cte("scope")
+            )
+        interval = (scope.c.event_id, scope.c.date, scope.c.time_start, scope.c.time_end)
+        resources = union_all(
+            select(*interval, literal("room").label("kind"), scope.c.room_id.label("resource")),
+            *(
+                select(*interval, literal(kind), func.unnest(scope.c[column]))
+                for kind, column in (
+                    ("lecturer", "lecturer_ids"),
+                    ("group", "group_ids"),
+                    ("subgroup", "subgroup_ids"),
+                    ("stream", "stream_ids"),
+                )
+            ),
+        ).cte("resources")
+        first, second = resources.alias("first"), resources.alias("second")
+        pairs = (
+            select(first.c.event_id, second.c.event_id.label("other_id"))
+            .join(
+                second,
+                and_(
+                    first.c.date == second.c.date,
+                    first.c.kind == second.c.kind,
+                    first.c.resource == second.c.resource,
+                    first.c.event_id != second.c.event_id,
+                ),
+            )
+            .where(first.c.time_start < second.c.time_end, second.c.time_start < first.c.time_end)
+            .distinct()
+            .subquery("pairs")
+        )
+        conflicts = (
+            select(
+                pairs.c.event_id,
+                func.array_agg(aggregate_order_by(pairs.c.other_id, pairs.c.other_id)).label("ids"),
+            )
+            .group_by(pairs.c.event_id)
+            .subquery("conflicts")
+        )
+
+        def objects(ids: str, labels: str, label: str) -> ColumnElement:
+            # Параллельные массивы id и подписей -> [{"id": ..., label: ...}, ...]
+            items = (
+                func.unnest(entries.c[ids], entries.c[labels])
+                .table_valued("id", "label", with_ordinality="position")
+                .render_derived()
+            )
+            return func.coalesce(
+                select(
+                    func.json_agg(
+                        aggregate_order_by(
+                            func.json_build_object("id", items.c.id, label, items.c.label),
+                            items.c.position,
+                        )
+                    )
+                ).scalar_subquery(),
+                _EMPTY_JSON,
+            )
+
+        detail = func.json_build_object(
+            "discipline_id", entries.c.discipline_id,
+            "work_kind_id", entries.c.work_kind_id,
+            "room_id", entries.c.room_id,
+            "time_slot_id", entries.c.time_slot_id,
+            "status", SCHEDULED,
+            "note", entries.c.note,
+            "id", entries.c.event_id,
+            "discipline", func.json_build_object(
+                "id", entries.c.discipline_id, "name", entries.c.discipline_name
+            ),
+            "work_kind", func.json_build_object(
+                "id", entries.c.work_kind_id,
+                "name", entries.c.work_kind_name,
+                "color_hex", entries.c.work_kind_color_hex,
+            ),
+            "room", func.json_build_object(
+                "id", entries.c.room_id,
+                "number", entries.c.room_number,
+                "building", func.json_build_object(
+                    "id", entries.c.building_id,
+                    "name", entries.c.building_name,
+                    "address", entries.c.building_address,
+                ),
+            ),
+            "time_slot", func.json_build_object(
+                "id", entries.c.time_slot_id,
+                "date", func.to_char(entries.c.date, "YYYY-MM-DD"),
+                "pair_number", entries.c.pair_number,
+                "time_start", func.to_char(entries.c.time_start, "HH24:MI"),
+                "time_end", func.to_char(entries.c.time_end, "HH24:MI"),
+            ),
+            "lecturers", objects("lecturer_ids", "lecturer_fios", "fio"),
+            "groups", objects("group_ids", "group_codes", "code"),
+            "subgroups", objects("subgroup_ids", "subgroup_codes", "code"),
+            "streams", objects("stream_ids", "stream_names", "name"),
+            "has_conflict", conflicts.c.ids.isnot(None),
+            "conflicting_event_ids", func.coalesce(func.to_json(conflicts.c.ids), _EMPTY_JSON),
+        )
+        source = entries.outerjoin(conflicts, conflicts.c.event_id == entries.c.event_id)
+        return detail, entries, source
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _json_rows_statement(names: Tuple[str, ...], paged: bool) -> Select:
+        detail, entries, source = TimetableEntryService._json_source(names, paged)
+        key = (entries.c.date, entries.c.time_start, entries.c.event_id)
+        return select(cast(detail, Text).label("detail"), *key).select_from(source).order_by(*key)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _json_array_statement(names: Tuple[str, ...]) -> Select:
+        detail, entries, source = TimetableEntryService._json_source(names, False)
+        body = func.json_agg(
+            aggregate_order_by(detail, entries.c.date, entries.c.time_start, entries.c.event_id)
+        )
+        return select(cast(func.coalesce(body, _EMPTY_JSON), Text)).select_from(source)
+
+    @staticmethod
+    def _json_params(filters: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: value for name, value in filters.items() if value is not None}
+
+    @staticmethod
+    def json_rows(
+        db: Session,
+        after: Optional[TimetableCursor] = None,
+        limit: Optional[int] = None,
+        yield_per: Optional[int] = None,
+        **filters,
+    ) -> Result:
+        """Строки (detail, date, time_start, event_id) в порядке расписания.
+
+        detail — EventDetail события в виде текста JSON, собранный в Postgres:
+        ORM объекты и словари Python не создаются. Остальные столбцы — ключ
+        курсора. Конфликты ищутся по всем строкам фильтров в даты выданных
+        строк, не только после after.
+        """
+        params = TimetableEntryService._json_params(filters)
+        names = tuple(sorted(params))
+        paged = after is not None or limit is not None
+        if paged:
+            # Без курсора — с начала расписания, без limit — до конца
+            after_date, after_time_start, after_event_id = after or (date.min, time.min, 0)
+            params.update(
+                after_date=after_date,
+                after_time_start=after_time_start,
+                after_event_id=after_event_id,
+                limit=limit,
+            )
+        statement = TimetableEntryService._json_rows_statement(names, paged)
+        options = {"yield_per": yield_per} if yield_per else {}
+        return db.execute(statement, params, execution_options=options)
+
+    @staticmethod
+    def json_array(db: Session, **filters) -> bytes:
+        """Список EventDetail по фильтрам, целиком собранный в Postgres (json_agg)."""
+        params = TimetableEntryService._json_params(filters)
+        statement = TimetableEntryService._json_array_statement(tuple(sorted(params)))
+        return db.execute(statement, params).scalar_one().encode()
@@ -0,0 +1,160 @@
+"""Движок поиска конфликтов расписания.
+
+События раскладываются по корзинам (дата, тип ресурса, ресурс), внутри
+каждой корзины пересечения ищутся проходом по отсортированным интервалам
+(sweep line): O(n log n + k), где k — число найденных конфликтов.
+"""
+import heapq
+from collections import defaultdict
+from datetime import date, time
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Типы ресурсов, которые не могут быть заняты двумя событиями одновременно
+RESOURCE_KINDS = ("room", "lecturer", "group", "subgroup", "stream")
+
+
+class ScheduleItem:
+    """Событие с точки зрения конфликтов: интервал времени и занятые ресурсы."""
+
+    __slots__ = ("key", "date", "time_start", "time_end", "resources")
+
+    def __init__(
+        self,
+        key: Hashable,
+        date: date,
+        time_start: time,
+        time_end: time,
+        room_id: Optional[int] = None,
+        lecturer_ids: Iterable[int] = (),
+        group_ids: Iterable[int] = (),
+        subgroup_ids: Iterable[int] = (),
+        stream_ids: Iterable[int] = (),
+    ):
+        self.key = key
+        self.date = date
+        self.time_start = time_start
+        self.time_end = time_end
+        self.resources: Dict[str, Tuple[int, ...]] = {
+            "room": (room_id,) if room_id is not None else (),
+            "lecturer": tuple(set(lecturer_ids)),
+            "group": tuple(set(group_ids)),
+            "subgroup": tuple(set(subgroup_ids)),
+            "stream": tuple(set(stream_ids)),
+        }
+
+    @classmethod
+    def from_event(cls, event) -> Optional["ScheduleItem"]:
+        """Построение из ORM события (связи должны быть загружены заранее)."""
+        time_slot = event.time_slot
+        if not time_slot:
+            return None
+        return cls(
+            key=event.id,
+            date=time_slot.date,
+            time_start=time_slot.time_start,
+            time_end=time_slot.time_end,
+            room_id=event.room_id,
+            lecturer_ids=[el.lecturer_id for el in event.lecturers],
+            group_ids=[eg.group_id for eg in event.groups],
+            subgroup_ids=[es.subgroup_id for es in event.subgroups],
+            stream_ids=[est.stream_id for est in event.streams],
+        )
+
+    @classmethod
+    def from_entry(cls, entry) -> "ScheduleItem":
+        """Построение из строки модели чтения расписания (TimetableEntry)."""
+        return cls(
+            key=entry.event_id,
+            date=entry.date,
+            time_start=entry.time_start,
+            time_end=entry.time_end,
+            room_id=entry.room_id,
+            lecturer_ids=entry.lecturer_ids,
+            group_ids=entry.group_ids,
+            subgroup_ids=entry.subgroup_ids,
+            stream_ids=entry.stream_ids,
+        )
+
+
+class Conflict:
+    """Конфликт двух событий по одному ресурсу."""
+
+    __slots__ = ("kind", "resource_id", "date", "first", "second")
+
+    def __init__(self, kind: str, resource_id: int, date: date, first: Hashable, second: Hashable):
+        self.kind = kind
+        self.resource_id = resource_id
+        self.date = date
+        self.first = first
+        self.second = second
+
+    @property
+    def conflict_type(self) -> str:
+        """Тип конфликта в терминах ValidationService (room_conflict, ...)."""
+        return f"{self.kind}_conflict"
+
+
+class ConflictEngine:
+    """Поиск пересечений событий по общим ресурсам."""
+
+    @staticmethod
+    def intervals_overlap(
+        time_start1: time,
+        time_end1: time,
+        time_start2: time,
+        time_end2: time,
+    ) -> bool:
+        """Проверка пересечения временных интервалов."""
+        # Интервалы пересекаются, если:
+        # start1 < end2 AND start2 < end1
+        return time_start1 < time_end2 and time_start2 < time_end1
+
+    @staticmethod
+    def find_conflicts(
+        items: Iterable[ScheduleItem],
+        kinds: Sequence[str] = RESOURCE_KINDS,
+    ) -> List[Conflict]:
+        """Все пары пересекающихся событий, разделяющих ресурс.
+
+        Пара событий, разделяющих несколько ресурсов, попадет в результат
+        по одному разу на каждый ресурс.
+        """
+        buckets: Dict[Tuple[date, str, int], List[ScheduleItem]] = defaultdict(list)
+        for item in items:
+            for kind in kinds:
+                for resource_id in item.resources[kind]:
+                    buckets[(item.date, kind, resource_id)].append(item)
+
+        conflicts = []
+        for (day, kind, resource_id), bucket in buckets.items():
+            if len(bucket) < 2:
+                continue
+            for first, second in ConflictEngine._sweep(bucket):
+                conflicts.append(Conflict(kind, resource_id, day, first.key, second.key))
+        return conflicts
+
+    @staticmethod
+    def conflict_map(
+        items: Iterable[ScheduleItem],
+        kinds: Sequence[str] = RESOURCE_KINDS,
+    ) -> Dict[Hashable, List[Hashable]]:
+        """Ключ события -> отсортированный список ключей конфликтующих с ним событий."""
+        related: Dict[Hashable, set] = defaultdict(set)
+        for conflict in ConflictEngine.find_conflicts(items, kinds):
+            related[conflict.first].add(conflict.second)
+            related[conflict.second].add(conflict.first)
+        return {key: sorted(others) for key, others in related.items()}
+
+    @staticmethod
+    def _sweep(bucket: List[ScheduleItem]) -> Iterator[Tuple[ScheduleItem, ScheduleItem]]:
+        """Пары пересекающихся интервалов одной корзины."""
+        bucket.sort(key=lambda item: (item.time_start, item.time_end))
+        # Куча активных интервалов по времени окончания
+        active: List[Tuple[time, int, ScheduleItem]] = []
+        for seq, item in enumerate(bucket):
+            while active and active[0][0] <= item.time_start:
+                heapq.heappop(active)
+            for _, _, other in active:
+                if other.time_start < item.time_end:
+                    yield other, item
+            heapq.heappush(active, (item.time_end, seq, item))
@@ -1,10 +1,37 @@
 """Валидация конфликтов расписания."""
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, contains_eager, joinedload
+from sqlalchemy import func, or_, select
 from datetime import date, time
-from typing import List, Optional
-from app.models import Event, TimeSlot, Room, Lecturer, Group, Subgroup, Stream
+from typing import Collection, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from app.models import (
+    Discipline,
+    Event,
+    Group,
+    Lecturer,
+    Room,
+    Stream,
+    Subgroup,
+    TimeSlot,
+    WorkKind,
+)
 from app.models.event import EventLecturer, EventGroup, EventSubgroup, EventStream
+from app.models.stream import StreamMember
+from app.validators.conflict_engine import RESOURCE_KINDS, ConflictEngine, ScheduleItem
+
+# Ключ проверяемого события в движке конфликтов
+_CANDIDATE = "candidate"
+
+# Тексты ошибок по типу ресурса
+_CONFLICT_MESSAGES = {
+    "room": "Аудитория занята в пересекающееся время",
+    "lecturer": "Преподаватель уже ведет занятие в пересекающееся время",
+    "group": "Группа уже имеет занятие в пересекающееся время",
+    "subgroup": "Подгруппа уже имеет занятие в пересекающееся время",
+    "stream": "Поток уже имеет занятие в пересекающееся время",
+}
+
+# В MVP: предполагаем 25 студентов на группу (можно вынести в настройки)
+STUDENTS_PER_GROUP = 25
 
 
 class ConflictError(Exception):
@@ -17,7 +44,11 @@ class ConflictError(Exception):
 
 
 class ValidationService:
-    """Сервис валидации конфликтов."""
+    """Сервис валидации конфликтов.
+
+    Все занятые ресурсы проверяются по одной выборке событий на дату,
+    сами правила считаются в памяти через ConflictEngine.
+    """
 
     @staticmethod
     def check_time_overlap(
@@ -27,53 +58,156 @@ class ValidationService:
         time_end2: time,
     ) -> bool:
         """Проверка пересечения временных интервалов."""
-        # Интервалы пересекаются, если:
-        # start1 < end2 AND start2 < end1
-        return time_start1 < time_end2 and time_start2 < time_end1
+        return ConflictEngine.intervals_overlap(time_start1, time_end1, time_start2, time_end2)
 
     @staticmethod
-    def check_room_conflict(
+    def fetch_scheduled_events(
         db: Session,
-        room_id: int,
-        time_slot_id: int,
-        exclude_event_id: Optional[int] = None,
-    ) -> Optional[ConflictError]:
-        """Проверка конфликта аудитории (включая пересекающиеся временные интервалы)."""
-        time_slot = db.query(TimeSlot).filter(TimeSlot.id == time_slot_id).first()
-        if not time_slot:
-            return None
+        dates: Collection[date],
+        room_ids: Collection[int] = (),
+        lecturer_ids: Collection[int] = (),
+        group_ids: Collection[int] = (),
+        subgroup_ids: Collection[int] = (),
+        stream_ids: Collection[int] = (),
+        exclude_event_ids: Collection[int] = (),
+    ) -> List[Event]:
+        """Запланированные события на даты, занимающие любой из ресурсов.
+
+        Один SQL запрос: слот и все связи загружаются JOIN-ами.
+        """
+        resource_filters = []
+        if room_ids:
+            resource_filters.append(Event.room_id.in_(room_ids))
+        if lecturer_ids:
+            resource_filters.append(
+                Event.lecturers.any(EventLecturer.lecturer_id.in_(lecturer_ids))
+            )
+        if group_ids:
+            resource_filters.append(Event.groups.any(EventGroup.group_id.in_(group_ids)))
+        if subgroup_ids:
+            resource_filters.append(
+                Event.subgroups.any(EventSubgroup.subgroup_id.in_(subgroup_ids))
+            )
+        if stream_ids:
+            resource_filters.append(Event.streams.any(EventStream.stream_id.in_(stream_ids)))
+        if not dates or not resource_filters:
+            return []
 
-        # Проверяем события в той же аудитории на ту же дату
         query = (
             db.query(Event)
-            .join(TimeSlot)
+            .join(TimeSlot, Event.time_slot_id == TimeSlot.id)
+            .options(
+                contains_eager(Event.time_slot),
+                joinedload(Event.lecturers),
+                joinedload(Event.groups),
+                joinedload(Event.subgroups),
+                joinedload(Event.streams),
+            )
             .filter(
-                Event.room_id == room_id,
                 Event.status == "scheduled",
-                TimeSlot.date == time_slot.date,
+                TimeSlot.date.in_(list(dates)),
+                or_(*resource_filters),
             )
         )
+        if exclude_event_ids:
+            query = query.filter(Event.id.notin_(list(exclude_event_ids)))
+        return query.all()
 
-        if exclude_event_id:
-            query = query.filter(Event.id != exclude_event_id)
+    @staticmethod
+    def conflict_message(kind: str, other: ScheduleItem, label: Optional[str] = None) -> str:
+        """Текст ошибки конфликта с событием other."""
+        label = label or f"событие #{other.key}"
+        return (
+            f"{_CONFLICT_MESSAGES[kind]} ({label}, "
+            f"{other.time_start.strftime('%H:%M')}-{other.time_end.strftime('%H:%M')})"
+        )
 
-        conflicting_events = query.all()
-        
-        # Проверяем пересечение временных интервалов
-        for conflicting in conflicting_events:
-            if conflicting.time_slot:
-                if ValidationService.check_time_overlap(
-                    time_slot.time_start,
-                    time_slot.time_end,
-                    conflicting.time_slot.time_start,
-                    conflicting.time_slot.time_end,
-                ):
-                    return ConflictError(
-                        f"Аудитория занята в пересекающееся время (событие #{conflicting.id}, {conflicting.time_slot.time_start.strftime('%H:%M')}-{conflicting.time_slot.time_end.strftime('%H:%M')})",
-                        "room_conflict",
-                    )
-        
-        return None
+    @staticmethod
+    def find_conflicts(
+        db: Session,
+        time_slot_id: int,
+        room_id: Optional[int] = None,
+        lecturer_ids: Iterable[int] = (),
+        group_ids: Iterable[int] = (),
+        subgroup_ids: Iterable[int] = (),
+        stream_ids: Iterable[int] = (),
+        exclude_event_id: Optional[int] = None,
+        time_slot: Optional[TimeSlot] = None,
+    ) -> List[ConflictError]:
+        """Все конфликты по ресурсам: по одной ошибке на каждое событие и ресурс."""
+        time_slot = time_slot or db.get(TimeSlot, time_slot_id)
+        if not time_slot:
+            return []
+
+        candidate = ScheduleItem(
+            _CANDIDATE,
+            time_slot.date,
+            time_slot.time_start,
+            time_slot.time_end,
+            room_id=room_id,
+            lecturer_ids=lecturer_ids,
+            group_ids=group_ids,
+            subgroup_ids=subgroup_ids,
+            stream_ids=stream_ids,
+        )
+        existing = ValidationService.fetch_scheduled_events(
+            db,
+            dates=[time_slot.date],
+            room_ids=candidate.resources["room"],
+            lecturer_ids=candidate.resources["lecturer"],
+            group_ids=candidate.resources["group"],
+            subgroup_ids=candidate.resources["subgroup"],
+            stream_ids=candidate.resources["stream"],
+            exclude_event_ids=[exclude_event_id] if exclude_event_id else (),
+        )
+        items = {event.id: ScheduleItem.from_event(event) for event in existing}
+
+        conflicting = []
+        for conflict in ConflictEngine.find_conflicts([candidate, *items.values()]):
+            if conflict.first == _CANDIDATE:
+                conflicting.append((conflict.kind, items[conflict.second], None))
+            elif conflict.second == _CANDIDATE:
+                conflicting.append((conflict.kind, items[conflict.first], None))
+        return ValidationService._conflict_errors(conflicting)
+
+    @staticmethod
+    def occupancy_error(kind: str) -> ConflictError:
+        """Ошибка конфликта, обнаруженного ограничением занятости в БД (см. OccupancyService)."""
+        message = _CONFLICT_MESSAGES.get(kind, "Ресурс уже занят в пересекающееся время")
+        return ConflictError(message, f"{kind}_conflict")
+
+    @staticmethod
+    def _conflict_errors(
+        conflicting: Iterable[Tuple[str, ScheduleItem, Optional[str]]]
+    ) -> List[ConflictError]:
+        """Ошибки по списку (тип ресурса, конфликтующее событие, подпись события).
+
+        Повторы отбрасываются, ошибки упорядочены по типу ресурса и времени.
+        """
+        order = {kind: index for index, kind in enumerate(RESOURCE_KINDS)}
+        errors = {}
+        for kind, other, label in conflicting:
+            errors.setdefault(
+                (order[kind], other.time_start, str(other.key), kind),
+                ConflictError(
+                    ValidationService.conflict_message(kind, other, label),
+                    f"{kind}_conflict",
+                ),
+            )
+        return [errors[key] for key in sorted(errors)]
+
+    @staticmethod
+    def check_room_conflict(
+        db: Session,
+        room_id: int,
+        time_slot_id: int,
+        exclude_event_id: Optional[int] = None,
+    ) -> Optional[ConflictError]:
+        """Проверка конфликта аудитории (включая пересекающиеся временные интервалы)."""
+        errors = ValidationService.find_conflicts(
+            db, time_slot_id, room_id=room_id, exclude_event_id=exclude_event_id
+        )
+        return errors[0] if errors else None
 
     @staticmethod
     def check_lecturer_conflict(
@@ -85,42 +219,10 @@ class ValidationService:
         """Проверка конфликта преподавателей (включая пересекающиеся временные интервалы)."""
         if not lecturer_ids:
             return None
-
-        time_slot = db.query(TimeSlot).filter(TimeSlot.id == time_slot_id).first()
-        if not time_slot:
-            return None
-
-        query = (
-            db.query(Event)
-            .join(TimeSlot)
-            .join(EventLecturer)
-            .filter(
-                EventLecturer.lecturer_id.in_(lecturer_ids),
-                Event.status == "scheduled",
-                TimeSlot.date == time_slot.date,
-            )
+        errors = ValidationService.find_conflicts(
+            db, time_slot_id, lecturer_ids=lecturer_ids, exclude_event_id=exclude_event_id
         )
-
-        if exclude_event_id:
-            query = query.filter(Event.id != exclude_event_id)
-
-        conflicting_events = query.all()
-        
-        # Проверяем пересечение временных интервалов
-        for conflicting in conflicting_events:
-            if conflicting.time_slot:
-                if ValidationService.check_time_overlap(
-                    time_slot.time_start,
-                    time_slot.time_end,
-                    conflicting.time_slot.time_start,
-                    conflicting.time_slot.time_end,
-                ):
-                    return ConflictError(
-                        f"Преподаватель уже ведет занятие в пересекающееся время (событие #{conflicting.id}, {conflicting.time_slot.time_start.strftime('%H:%M')}-{conflicting.time_slot.time_end.strftime('%H:%M')})",
-                        "lecturer_conflict",
-                    )
-        
-        return None
+        return errors[0] if errors else None
 
     @staticmethod
     def check_group_conflict(
@@ -132,103 +234,54 @@ class ValidationService:
         exclude_event_id: Optional[int] = None,
     ) -> Optional[ConflictError]:
         """Проверка конфликта групп/подгрупп/потоков."""
-        time_slot = db.query(TimeSlot).filter(TimeSlot.id == time_slot_id).first()
-        if not time_slot:
-            return None
+        errors = ValidationService.find_conflicts(
+            db,
+            time_slot_id,
+            group_ids=group_ids,
+            subgroup_ids=subgroup_ids,
+            stream_ids=stream_ids,
+            exclude_event_id=exclude_event_id,
+        )
+        return errors[0] if errors else None
 
-        # Проверка групп (включая пересекающиеся временные интервалы)
-        if group_ids:
-            query = (
-                db.query(Event)
-                .join(TimeSlot)
-                .join(EventGroup)
-                .filter(
-                    EventGroup.group_id.in_(group_ids),
-                    Event.status == "scheduled",
-                    TimeSlot.date == time_slot.date,
-                )
-            )
-            if exclude_event_id:
-                query = query.filter(Event.id != exclude_event_id)
-            
-            conflicting_events = query.all()
-            
-            # Проверяем пересечение временных интервалов
-            for conflicting in conflicting_events:
-                if conflicting.time_slot:
-                    if ValidationService.check_time_overlap(
-                        time_slot.time_start,
-                        time_slot.time_end,
-                        conflicting.time_slot.time_start,
-                        conflicting.time_slot.time_end,
-                    ):
-                        return ConflictError(
-                            f"Группа уже имеет занятие в пересекающееся время (событие #{conflicting.id}, {conflicting.time_slot.time_start.strftime('%H:%M')}-{conflicting.time_slot.time_end.strftime('%H:%M')})",
-                            "group_conflict",
-                        )
-
-        # Проверка подгрупп (включая пересекающиеся временные интервалы)
-        if subgroup_ids:
-            query = (
-                db.query(Event)
-                .join(TimeSlot)
-                .join(EventSubgroup)
-                .filter(
-                    EventSubgroup.subgroup_id.in_(subgroup_ids),
-                    Event.status == "scheduled",
-                    TimeSlot.date == time_slot.date,
-                )
-            )
-            if exclude_event_id:
-                query = query.filter(Event.id != exclude_event_id)
-            
-            conflicting_events = query.all()
-            
-            # Проверяем пересечение временных интервалов
-            for conflicting in conflicting_events:
-                if conflicting.time_slot:
-                    if ValidationService.check_time_overlap(
-                        time_slot.time_start,
-                        time_slot.time_end,
-                        conflicting.time_slot.time_start,
-                        conflicting.time_slot.time_end,
-                    ):
-                        return ConflictError(
-                            f"Подгруппа уже имеет занятие в пересекающееся время (событие #{conflicting.id}, {conflicting.time_slot.time_start.strftime('%H:%M')}-{conflicting.time_slot.time_end.strftime('%H:%M')})",
-                            "subgroup_conflict",
-                        )
-
-        # Проверка потоков (включая пересекающиеся временные интервалы)
-        if stream_ids:
-            query = (
-                db.query(Event)
-                .join(TimeSlot)
-                .join(EventStream)
-                .filter(
-                    EventStream.stream_id.in_(stream_ids),
-                    Event.status == "scheduled",
-                    TimeSlot.date == time_slot.date,
-                )
+    @staticmethod
+    def count_students(db: Session, group_ids: List[int], stream_ids: List[int]) -> int:
+        """Оценка числа студентов (упрощенно: для MVP считаем по группам)."""
+        if not group_ids and not stream_ids:
+            return 0
+
+        # Группы и участники потоков считаются одним запросом
+        groups_count = (
+            select(func.count(Group.id)).where(Group.id.in_(group_ids)).scalar_subquery()
+        )
+        members_count = (
+            select(func.count(StreamMember.id))
+            .where(StreamMember.stream_id.in_(stream_ids))
+            .scalar_subquery()
+        )
+        groups, members = db.execute(select(groups_count, members_count)).one()
+        return (groups + members) * STUDENTS_PER_GROUP
+
+    @staticmethod
+    def capacity_error(room: Room, total_students: int) -> Optional[ConflictError]:
+        """Ошибка вместимости аудитории."""
+        if total_students > room.capacity:
+            return ConflictError(
+                f"Аудитория не вмещает студентов: {total_students} > {room.capacity}",
+                "capacity_exceeded",
             )
-            if exclude_event_id:
-                query = query.filter(Event.id != exclude_event_id)
-            
-            conflicting_events = query.all()
-            
-            # Проверяем пересечение временных интервалов
-            for conflicting in conflicting_events:
-                if conflicting.time_slot:
-                    if ValidationService.check_time_overlap(
-                        time_slot.time_start,
-                        time_slot.time_end,
-                        conflicting.time_slot.time_start,
-                        conflicting.time_slot.time_end,
-                    ):
-                        return ConflictError(
-                            f"Поток уже имеет занятие в пересекающееся время (событие #{conflicting.id}, {conflicting.time_slot.time_start.strftime('%H:%M')}-{conflicting.time_slot.time_end.strftime('%H:%M')})",
-                            "stream_conflict",
-                        )
+        return None
 
+    @staticmethod
+    def room_type_error(room: Room, work_kind: WorkKind) -> Optional[ConflictError]:
+        """Ошибка несоответствия типа аудитории виду занятия."""
+        # Простая эвристика: спортзал для физкультуры
+        if work_kind.name.lower() in ["физкультура", "спорт"]:
+            if "спорт" not in room.type.lower() and "sport" not in room.type.lower():
+                return ConflictError(
+                    f"Вид занятия '{work_kind.name}' требует спортивную аудиторию",
+                    "room_type_mismatch",
+                )
         return None
 
     @staticmethod
@@ -239,35 +292,11 @@ class ValidationService:
         stream_ids: List[int],
     ) -> Optional[ConflictError]:
         """Проверка вместимости аудитории."""
-        room = db.query(Room).filter(Room.id == room_id).first()
+        room = db.get(Room, room_id)
         if not room:
             return None
-
-        # Подсчет студентов (упрощенно: для MVP считаем по группам)
-        total_students = 0
-
-        if group_ids:
-            groups = db.query(Group).filter(Group.id.in_(group_ids)).all()
-            # В MVP: предполагаем 25 студентов на группу (можно вынести в настройки)
-            total_students += len(groups) * 25
-
-        if stream_ids:
-            # Для потоков считаем все группы в потоке
-            from app.models.stream import StreamMember
-            stream_members = (
-                db.query(StreamMember)
-                .filter(StreamMember.stream_id.in_(stream_ids))
-                .all()
-            )
-            total_students += len(stream_members) * 25
-
-        if total_students > room.capacity:
-            return ConflictError(
-                f"Аудитория не вмещает студентов: {total_students} > {room.capacity}",
-                "capacity_exceeded",
-            )
-
-        return None
+        total_students = ValidationService.count_students(db, group_ids, stream_ids)
+        return ValidationService.capacity_error(room, total_students)
 
     @staticmethod
     def check_room_type(
@@ -276,25 +305,11 @@ class ValidationService:
         work_kind_id: int,
     ) -> Optional[ConflictError]:
         """Проверка соответствия типа аудитории виду занятия."""
-        room = db.query(Room).filter(Room.id == room_id).first()
-        if not room:
+        room = db.get(Room, room_id)
+        work_kind = db.get(WorkKind, work_kind_id)
+        if not room or not work_kind:
             return None
-
-        from app.models import WorkKind
-
-        work_kind = db.query(WorkKind).filter(WorkKind.id == work_kind_id).first()
-        if not work_kind:
-            return None
-
-        # Простая эвристика: спортзал для физкультуры
-        if work_kind.name.lower() in ["физкультура", "спорт"]:
-            if "спорт" not in room.type.lower() and "sport" not in room.type.lower():
-                return ConflictError(
-                    f"Вид занятия '{work_kind.name}' требует спортивную аудиторию",
-                    "room_type_mismatch",
-                )
-
-        return None
+        return ValidationService.room_type_error(room, work_kind)
 
     @staticmethod
     def validate_event(
@@ -307,40 +322,199 @@ class ValidationService:
         stream_ids: List[int],
         work_kind_id: int,
         exclude_event_id: Optional[int] = None,
+        check_conflicts: bool = True,
     ) -> List[ConflictError]:
-        """Полная валидация события."""
+        """Полная валидация события.
+
+        Возвращает все конфликты, а не только первый в каждой категории.
+        Без check_conflicts проверяются только вместимость и тип аудитории:
+        занятость ресурсов гарантирует ограничение в БД (OccupancyService),
+        а предварительная проверка лишь дает подробные сообщения.
+        """
         errors = []
+        if check_conflicts:
+            # Проверка конфликтов по ресурсам
+            errors = ValidationService.find_conflicts(
+                db,
+                time_slot_id,
+                room_id=room_id,
+                lecturer_ids=lecturer_ids,
+                group_ids=group_ids,
+                subgroup_ids=subgroup_ids,
+                stream_ids=stream_ids,
+                exclude_event_id=exclude_event_id,
+            )
 
-        # Проверка конфликтов
-        room_error = ValidationService.check_room_conflict(
-            db, room_id, time_slot_id, exclude_event_id
-        )
-        if room_error:
-            errors.append(room_error)
+        room = db.get(Room, room_id)
+        if room:
+            # Проверка вместимости
+            total_students = ValidationService.count_students(db, group_ids, stream_ids)
+            capacity_error = ValidationService.capacity_error(room, total_students)
+            if capacity_error:
+                errors.append(capacity_error)
 
-        lecturer_error = ValidationService.check_lecturer_conflict(
-            db, lecturer_ids, time_slot_id, exclude_event_id
-        )
-        if lecturer_error:
-            errors.append(lecturer_error)
+            # Проверка типа аудитории
+            work_kind = db.get(WorkKind, work_kind_id)
+            type_error = ValidationService.room_type_error(room, work_kind) if work_kind else None
+            if type_error:
+                errors.append(type_error)
 
-        group_error = ValidationService.check_group_conflict(
-            db, group_ids, subgroup_ids, stream_ids, time_slot_id, exclude_event_id
-        )
-        if group_error:
-            errors.append(group_error)
+        return errors
 
-        # Проверка вместимости
-        capacity_error = ValidationService.check_capacity(
-            db, room_id, group_ids, stream_ids
+    @staticmethod
+    def validate_events(db: Session, events: Sequence) -> List[List[ConflictError]]:
+        """Пакетная валидация событий (EventCreate) по БД и друг с другом.
+
+        Справочники, слоты и занятые события загружаются фиксированным числом
+        запросов на весь пакет. Событие пакета проверяется только против уже
+        принятых событий, стоящих раньше него: из двух конфликтующих
+        отклоняется последнее.
+        """
+        errors: List[List[ConflictError]] = [[] for _ in events]
+        if not events:
+            return errors
+
+        time_slots = ValidationService._load_by_id(db, TimeSlot, {e.time_slot_id for e in events})
+        rooms = ValidationService._load_by_id(db, Room, {e.room_id for e in events})
+        work_kinds = ValidationService._load_by_id(db, WorkKind, {e.work_kind_id for e in events})
+        existing_ids = {
+            "discipline": ValidationService._existing_ids(
+                db, Discipline, {e.discipline_id for e in events}
+            ),
+            "lecturer": ValidationService._existing_ids(
+                db, Lecturer, {i for e in events for i in e.lecturer_ids}
+            ),
+            "group": ValidationService._existing_ids(
+                db, Group, {i for e in events for i in e.group_ids}
+            ),
+            "subgroup": ValidationService._existing_ids(
+                db, Subgroup, {i for e in events for i in e.subgroup_ids}
+            ),
+            "stream": ValidationService._existing_ids(
+                db, Stream, {i for e in events for i in e.stream_ids}
+            ),
+        }
+        stream_ids = {i for e in events for i in e.stream_ids}
+        stream_sizes = dict(
+            db.query(StreamMember.stream_id, func.count(StreamMember.id))
+            .filter(StreamMember.stream_id.in_(stream_ids))
+            .group_by(StreamMember.stream_id)
+            .all()
+        ) if stream_ids else {}
+
+        # Ссылки на несуществующие объекты
+        for index, event in enumerate(events):
+            missing = []
+            if event.time_slot_id not in time_slots:
+                missing.append(f"временной слот #{event.time_slot_id}")
+            if event.room_id not in rooms:
+                missing.append(f"аудитория #{event.room_id}")
+            if event.work_kind_id not in work_kinds:
+                missing.append(f"вид занятия #{event.work_kind_id}")
+            if event.discipline_id not in existing_ids["discipline"]:
+                missing.append(f"дисциплина #{event.discipline_id}")
+            for kind, label, ids in (
+                ("lecturer", "преподаватель", event.lecturer_ids),
+                ("group", "группа", event.group_ids),
+                ("subgroup", "подгруппа", event.subgroup_ids),
+                ("stream", "поток", event.stream_ids),
+            ):
+                missing.extend(f"{label} #{i}" for i in ids if i not in existing_ids[kind])
+            if missing:
+                errors[index].append(
+                    ConflictError(f"Не найдены: {', '.join(missing)}", "not_found")
+                )
+
+        candidates: Dict[int, ScheduleItem] = {}
+        for index, event in enumerate(events):
+            time_slot = time_slots.get(event.time_slot_id)
+            if time_slot:
+                candidates[index] = ScheduleItem(
+                    (_CANDIDATE, index),
+                    time_slot.date,
+                    time_slot.time_start,
+                    time_slot.time_end,
+                    room_id=event.room_id,
+                    lecturer_ids=event.lecturer_ids,
+                    group_ids=event.group_ids,
+                    subgroup_ids=event.subgroup_ids,
+                    stream_ids=event.stream_ids,
+                )
+
+        def union(kind: str) -> Set[int]:
+            return {i for item in candidates.values() for i in item.resources[kind]}
+
+        existing = ValidationService.fetch_scheduled_events(
+            db,
+            dates={item.date for item in candidates.values()},
+            room_ids=union("room"),
+            lecturer_ids=union("lecturer"),
+            group_ids=union("group"),
+            subgroup_ids=union("subgroup"),
+            stream_ids=union("stream"),
         )
-        if capacity_error:
-            errors.append(capacity_error)
+        items = {event.id: ScheduleItem.from_event(event) for event in existing}
+
+        # Конфликты с БД и с более ранними событиями пакета
+        with_db: Dict[int, List[Tuple[str, ScheduleItem, Optional[str]]]] = {}
+        with_batch: Dict[int, List[Tuple[str, int]]] = {}
+        for conflict in ConflictEngine.find_conflicts([*candidates.values(), *items.values()]):
+            first_new = isinstance(conflict.first, tuple)
+            second_new = isinstance(conflict.second, tuple)
+            if first_new and second_new:
+                earlier, later = sorted([conflict.first[1], conflict.second[1]])
+                with_batch.setdefault(later, []).append((conflict.kind, earlier))
+            elif first_new:
+                with_db.setdefault(conflict.first[1], []).append(
+                    (conflict.kind, items[conflict.second], None)
+                )
+            elif second_new:
+                with_db.setdefault(conflict.second[1], []).append(
+                    (conflict.kind, items[conflict.first], None)
+                )
 
-        # Проверка типа аудитории
-        type_error = ValidationService.check_room_type(db, room_id, work_kind_id)
-        if type_error:
-            errors.append(type_error)
+        accepted: Set[int] = set()
+        for index, event in enumerate(events):
+            conflicting = list(with_db.get(index, []))
+            conflicting.extend(
+                (kind, candidates[earlier], f"позиция {earlier} в пакете")
+                for kind, earlier in with_batch.get(index, [])
+                if earlier in accepted
+            )
+            errors[index].extend(ValidationService._conflict_errors(conflicting))
+
+            room = rooms.get(event.room_id)
+            if room:
+                groups_count = len(set(event.group_ids) & existing_ids["group"])
+                members_count = sum(stream_sizes.get(i, 0) for i in set(event.stream_ids))
+                capacity_error = ValidationService.capacity_error(
+                    room, (groups_count + members_count) * STUDENTS_PER_GROUP
+                )
+                if capacity_error:
+                    errors[index].append(capacity_error)
+
+                work_kind = work_kinds.get(event.work_kind_id)
+                type_error = (
+                    ValidationService.room_type_error(room, work_kind) if work_kind else None
+                )
+                if type_error:
+                    errors[index].append(type_error)
+
+            if not errors[index]:
+                accepted.add(index)
 
         return errors
 
+    @staticmethod
+    def _load_by_id(db: Session, model, ids: Set[int]) -> Dict[int, object]:
+        """Объекты модели по набору id одним запросом."""
+        if not ids:
+            return {}
+        return {obj.id: obj for obj in db.query(model).filter(model.id.in_(ids)).all()}
+
+    @staticmethod
+    def _existing_ids(db: Session, model, ids: Set[int]) -> Set[int]:
+        """Какие из id существуют в таблице модели."""
+        if not ids:
+            return set()
+        return {row[0] for row in db.query(model.id).filter(model.id.in_(ids)).all()}
@@ -0,0 +1,54 @@
+"""Задержка инвалидации кэша расписания при большом числе ключей.
+
+Сравниваются прежний KEYS + DEL и обход SCAN + UNLINK (delete_pattern).
+Нужен доступный Redis (settings.REDIS_URL); бенчмарк пишет только ключи
+с префиксом bench_timetable и удаляет их.
+
+Запуск: python -m benchmarks.cache_invalidation [число ключей]
+"""
+import sys
+import time as timer
+from app.services.cache import CacheService
+
+NAMESPACE = "bench_timetable"
+
+
+def populate(cache: CacheService, count: int, batch_size: int = 10000) -> None:
+    """Заполнение count ключами с префиксом NAMESPACE."""
+    pipe = cache.redis_client.pipeline(transaction=False)
+    for i in range(count):
+        pipe.setex(f"{NAMESPACE}:{i}", 600, "[]")
+        if i % batch_size == batch_size - 1:
+            pipe.execute()
+    pipe.execute()
+
+
+def measure(label: str, func) -> None:
+    started = timer.perf_counter()
+    func()
+    elapsed = (timer.perf_counter() - started) * 1000
+    print(f"{label:<22} {elapsed:>10.1f} ms")
+
+
+def legacy_delete_pattern(cache: CacheService, pattern: str) -> int:
+    """Прежняя реализация: KEYS блокирует Redis на время обхода всех ключей."""
+    keys = cache.redis_client.keys(pattern)
+    if keys:
+        return cache.redis_client.delete(*keys)
+    return 0
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    cache = CacheService()
+    print(f"{count} ключей")
+
+    populate(cache, count)
+    measure("KEYS + DEL", lambda: legacy_delete_pattern(cache, f"{NAMESPACE}:*"))
+
+    populate(cache, count)
+    measure("SCAN + UNLINK", lambda: cache.delete_pattern(f"{NAMESPACE}:*"))
+
+
+if __name__ == "__main__":
+    main()
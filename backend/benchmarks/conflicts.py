@@ -0,0 +1,95 @@
+"""Сравнение движка конфликтов с прежним попарным алгоритмом.
+
+Запуск: python -m benchmarks.conflicts [число событий]
+"""
+import random
+import sys
+import time as timer
+from datetime import date, time, timedelta
+from typing import Dict, List
+from app.validators.conflict_engine import ConflictEngine, ScheduleItem
+
+
+class _LegacyEvent:
+    """Минимальная замена ORM события для прежнего алгоритма."""
+
+    def __init__(self, item: ScheduleItem):
+        self.id = item.key
+        self.room_id = item.resources["room"][0]
+        self.date = item.date
+        self.time_start = item.time_start
+        self.time_end = item.time_end
+        self.lecturers = list(item.resources["lecturer"])
+        self.groups = list(item.resources["group"])
+
+
+def legacy_detect_conflicts(event_list: List[_LegacyEvent]) -> Dict[int, List[int]]:
+    """Прежний detect_conflicts из get_timetable: O(n²) с пересборкой множеств."""
+    conflicts = {}
+    for i, event1 in enumerate(event_list):
+        event_conflicts = []
+        for j, event2 in enumerate(event_list):
+            if i == j:
+                continue
+            if event1.date == event2.date and ConflictEngine.intervals_overlap(
+                event1.time_start, event1.time_end, event2.time_start, event2.time_end
+            ):
+                has_conflict = False
+                if event1.room_id == event2.room_id:
+                    has_conflict = True
+                if set(event1.lecturers) & set(event2.lecturers):
+                    has_conflict = True
+                if set(event1.groups) & set(event2.groups):
+                    has_conflict = True
+                if has_conflict:
+                    event_conflicts.append(event2.id)
+        if event_conflicts:
+            conflicts[event1.id] = event_conflicts
+    return conflicts
+
+
+def generate_week(count: int, seed: int = 1) -> List[ScheduleItem]:
+    """Неделя факультета: 6 дней по 8 пар, случайные аудитории и участники."""
+    rng = random.Random(seed)
+    pairs = [(time(8 + i * 2, 0), time(9 + i * 2, 30)) for i in range(7)]
+    monday = date(2025, 11, 17)
+    items = []
+    for key in range(count):
+        start, end = rng.choice(pairs)
+        items.append(
+            ScheduleItem(
+                key,
+                monday + timedelta(days=rng.randrange(6)),
+                start,
+                end,
+                room_id=rng.randint(1, 300),
+                lecturer_ids=[rng.randint(1, 400)],
+                group_ids=rng.sample(range(1, 250), rng.randint(1, 3)),
+                subgroup_ids=[rng.randint(1, 500)] if rng.random() < 0.3 else [],
+                stream_ids=[rng.randint(1, 40)] if rng.random() < 0.2 else [],
+            )
+        )
+    return items
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [500, 1000, 5000]
+    print(f"{'events':>8} {'legacy, s':>12} {'engine, s':>12} {'speedup':>9}")
+    for count in counts:
+        items = generate_week(count)
+        legacy_events = [_LegacyEvent(item) for item in items]
+
+        started = timer.perf_counter()
+        legacy_detect_conflicts(legacy_events)
+        legacy_time = timer.perf_counter() - started
+
+        started = timer.perf_counter()
+        ConflictEngine.conflict_map(items)
+        engine_time = timer.perf_counter() - started
+
+        speedup = legacy_time / engine_time
+        print(f"{count:>8} {legacy_time:>12.3f} {engine_time:>12.3f} {speedup:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
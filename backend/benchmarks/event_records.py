@@ -0,0 +1,103 @@
+"""Чтение событий: ORM объекты против записей EventRecord (SQLAlchemy Core).
+
+Запуск: python -m benchmarks.event_records [число событий ...]
+
+Нужна БД с примененными миграциями. Синтетические данные те же, что в
+benchmarks.timetable_plans, и откатываются после замера. Для каждого
+способа чтения всех событий измеряются:
+- load   — загрузка списка событий (мс);
+- detail — загрузка и словари EventDetail (мс, без поиска конфликтов);
+- ics    — загрузка и текст ICS через ICSWriter (мс);
+- KB/ev  — память, занятая загруженными событиями (tracemalloc), на событие.
+
+Способы: events — ORM Event со связями (EventQueryService), entries — ORM
+TimetableEntry, records — EventRecord из timetable_entries.
+"""
+import gc
+import sys
+import time as timer
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+from sqlalchemy.orm import Session
+from app.db.session import SessionLocal
+from app.services.event_query import EventQueryService
+from app.services.event_records import EventRecord, EventRecordService
+from app.services.ics import ICSWriter
+from app.services.timetable_entries import TimetableEntryService
+from benchmarks.timetable_plans import generate
+
+REPEATS = 3
+
+# Способ чтения: (загрузка списка, словарь EventDetail, запись для ICSWriter)
+PATHS: Dict[str, Tuple[Callable[[Session], List], Callable, Callable]] = {
+    "events": (
+        lambda db: EventQueryService.timetable_query(db).all(),
+        lambda event: TimetableEntryService.to_detail_dict(EventRecord.from_event(event)),
+        EventRecord.from_event,
+    ),
+    "entries": (
+        lambda db: TimetableEntryService.query(db).all(),
+        TimetableEntryService.to_detail_dict,
+        lambda entry: entry,
+    ),
+    "records": (
+        lambda db: list(EventRecordService.timetable(db)),
+        TimetableEntryService.to_detail_dict,
+        lambda record: record,
+    ),
+}
+
+
+def best(db: Session, build: Callable[[Session], object]) -> float:
+    """Лучшее из REPEATS время (мс); сессия очищается перед каждым замером."""
+    times = []
+    for _ in range(REPEATS):
+        db.expunge_all()
+        gc.collect()
+        started = timer.perf_counter()
+        build(db)
+        times.append((timer.perf_counter() - started) * 1000)
+    return min(times)
+
+
+def memory_per_event(db: Session, load: Callable[[Session], List]) -> float:
+    """Память загруженных событий вместе с identity map сессии (КБ на событие)."""
+    db.expunge_all()
+    gc.collect()
+    tracemalloc.start()
+    events = load(db)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return used / 1024 / len(events)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    print(f"{'events':>7} {'path':<8} {'load, ms':>9} {'detail, ms':>11} {'ics, ms':>9} "
+          f"{'KB/ev':>6}")
+    for size in sizes:
+        db = SessionLocal()
+        try:
+            generate(db, size)
+            TimetableEntryService.rebuild(db)
+            for name, (load, detail, record) in PATHS.items():
+                times = [
+                    best(db, load),
+                    best(db, lambda db: [detail(event) for event in load(db)]),
+                    best(
+                        db,
+                        lambda db: "".join(
+                            ICSWriter.iter_calendar(map(record, load(db)), "Бенчмарк")
+                        ),
+                    ),
+                ]
+                memory = memory_per_event(db, load)
+                print(f"{size:>7} {name:<8} {times[0]:>9.1f} {times[1]:>11.1f} "
+                      f"{times[2]:>9.1f} {memory:>6.2f}")
+        finally:
+            db.rollback()
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
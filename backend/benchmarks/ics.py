@@ -0,0 +1,135 @@
+"""Сравнение потоковой генерации ICS с прежней реализацией на icalendar.
+
+Запуск: python -m benchmarks.ics [число событий]
+
+События строятся в памяти (без БД), поэтому измеряется только генерация;
+обе реализации получают их записями EventRecord. Прежняя реализация
+(icalendar_calendar) используется и в тестах совместимости ICSWriter.
+Столбец fragments — сборка ленты из прогретого кэша VEVENT (нужны Redis
+и БД для журнала изменений).
+"""
+import sys
+import time as timer
+import tracemalloc
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List
+import pytz
+from icalendar import Calendar, Event as ICalEvent
+from app.db.session import SessionLocal
+from app.models import Building, Discipline, Event, Group, Lecturer, Room, TimeSlot, WorkKind
+from app.models.event import EventGroup, EventLecturer
+from app.services.event_records import EventRecord
+from app.services.ics import ICSFragmentCache, ICSWriter
+
+
+def icalendar_calendar(events: Iterable[EventRecord], title: str = "Расписание САФУ") -> str:
+    """Генерация ICS через icalendar (весь календарь в памяти), как до ICSWriter."""
+    cal = Calendar()
+    cal.add("prodid", "-//САФУ Расписание//RU")
+    cal.add("version", "2.0")
+    cal.add("calscale", "GREGORIAN")
+    cal.add("method", "PUBLISH")
+
+    moscow_tz = pytz.timezone("Europe/Moscow")
+
+    for event in events:
+        ical_event = ICalEvent()
+        ical_event.add("uid", f"event-{event.event_id}@safu.ru")
+
+        # Время
+        start_dt = moscow_tz.localize(datetime.combine(event.date, event.time_start))
+        end_dt = moscow_tz.localize(datetime.combine(event.date, event.time_end))
+        ical_event.add("dtstart", start_dt)
+        ical_event.add("dtend", end_dt)
+        ical_event.add("dtstamp", datetime.now(moscow_tz))
+
+        ical_event.add("summary", f"{event.discipline_name} ({event.work_kind_name})")
+        ical_event.add("description", ICSWriter.description(event))
+        location = ICSWriter.location(event)
+        if location is not None:
+            ical_event.add("location", location)
+
+        cal.add_component(ical_event)
+
+    return cal.to_ical().decode("utf-8")
+
+
+def generate_events(count: int) -> List[Event]:
+    """Год занятий преподавателя: по 4 пары в день."""
+    building = Building(id=1, name="Главный корпус", address="наб. Северной Двины, 17")
+    room = Room(id=1, number="1220", building=building)
+    discipline = Discipline(id=1, name="Математический анализ")
+    work_kind = WorkKind(id=1, name="Лекция")
+    lecturer = Lecturer(id=1, fio="Иванов Иван Иванович")
+    groups = [Group(id=i, code=f"15110{i}") for i in range(1, 4)]
+    pairs = [(time(8, 20), time(9, 50)), (time(10, 0), time(11, 30)),
+             (time(12, 0), time(13, 30)), (time(13, 40), time(15, 10))]
+
+    events = []
+    for i in range(count):
+        start, end = pairs[i % len(pairs)]
+        time_slot = TimeSlot(
+            id=i, date=date(2025, 9, 1) + timedelta(days=i // len(pairs)),
+            pair_number=i % len(pairs) + 1, time_start=start, time_end=end,
+        )
+        events.append(
+            Event(
+                id=i,
+                status="scheduled",
+                note="Контрольная работа; принести калькулятор" if i % 10 == 0 else None,
+                time_slot=time_slot,
+                discipline=discipline,
+                work_kind=work_kind,
+                room=room,
+                lecturers=[EventLecturer(lecturer=lecturer)],
+                groups=[EventGroup(group=group) for group in groups],
+            )
+        )
+    return events
+
+
+def measure(func):
+    """(время, пиковая память в МБ, результат)."""
+    tracemalloc.start()
+    started = timer.perf_counter()
+    result = func()
+    elapsed = timer.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, result
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [500, 2000, 10000]
+    print(
+        f"{'events':>8} {'icalendar, s':>13} {'MB':>7} {'writer, s':>10} {'MB':>7} "
+        f"{'speedup':>8} {'fragments, s':>13}"
+    )
+    for count in counts:
+        events = generate_events(count)
+        records = [EventRecord.from_event(event) for event in events]
+        legacy_time, legacy_mem, legacy = measure(lambda: icalendar_calendar(records))
+        # Потоковая запись: части сразу отдаются клиенту, в памяти не накапливаются
+        writer_time, writer_mem, size = measure(
+            lambda: sum(len(chunk) for chunk in ICSWriter.iter_calendar(records, "Бенчмарк"))
+        )
+        assert legacy.count("BEGIN:VEVENT") == count and size > 0
+
+        # Первый проход заполняет кэш фрагментов, второй измеряется
+        with SessionLocal() as db:
+            for _ in ICSFragmentCache.iter_calendar(db, records, "Бенчмарк"):
+                pass
+            started = timer.perf_counter()
+            cached = "".join(ICSFragmentCache.iter_calendar(db, records, "Бенчмарк"))
+            fragments_time = timer.perf_counter() - started
+        assert cached.count("BEGIN:VEVENT") == count
+
+        print(
+            f"{count:>8} {legacy_time:>13.3f} {legacy_mem:>7.1f} "
+            f"{writer_time:>10.3f} {writer_mem:>7.1f} {legacy_time / writer_time:>7.1f}x "
+            f"{fragments_time:>13.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
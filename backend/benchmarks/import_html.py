@@ -0,0 +1,140 @@
+"""Сравнение пакетного импорта HTML с прежним построчным get-or-create.
+
+Запуск: python -m benchmarks.import_html [число строк]
+
+Нужна БД с примененными миграциями; все изменения откатываются.
+"""
+import random
+import sys
+import time as timer
+from datetime import date, timedelta
+from typing import Iterator, List
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.db.session import SessionLocal, engine
+from app.models import Building, Discipline, Event, Group, Lecturer, Room, TimeSlot, WorkKind
+from app.models.event import EventGroup, EventLecturer
+from app.services.parser import DEFAULT_BUILDING, ParsedRow, ParseResult, ParserService
+
+
+def generate_rows(count: int, seed: int = 1) -> Iterator[str]:
+    """Строки <tr> факультета: семестр занятий, по строке на событие."""
+    rng = random.Random(seed)
+    kinds = ["Лекция", "Практика", "Лабораторная"]
+    for _ in range(count):
+        day = date(2025, 9, 1) + timedelta(days=rng.randrange(120))
+        group = f"15{rng.randrange(250):04d}"
+        if rng.random() < 0.2:
+            group += f"-{rng.randint(1, 2)}"
+        room = str(rng.randint(100, 400))
+        if rng.random() < 0.05:
+            room += f"-{int(room) + 2}"
+        cells = [
+            day.strftime("%d.%m.%Y"),
+            str(rng.randint(1, 8)),
+            f"Дисциплина {rng.randrange(300)}",
+            rng.choice(kinds),
+            f"Преподаватель {rng.randrange(400)} И.О.",
+            group,
+            room,
+        ]
+        yield "<tr>" + "".join(f"<td>{cell}</td>" for cell in cells) + "</tr>"
+
+
+def generate_html(count: int, seed: int = 1) -> str:
+    """HTML факультета из count строк (см. generate_rows)."""
+    rows = "\n".join(generate_rows(count, seed))
+    return "<html><body><table>" + rows + "</table></body></html>"
+
+
+def legacy_import(db: Session, rows: List[ParsedRow]) -> int:
+    """Прежний импорт: SELECT и flush на каждую сущность и событие."""
+
+    def get_or_create(model, defaults=None, **filters):
+        instance = db.query(model).filter_by(**filters).first()
+        if instance is None:
+            instance = model(**filters, **(defaults or {}))
+            db.add(instance)
+            db.flush()
+        return instance
+
+    created = 0
+    for row in rows:
+        discipline = get_or_create(Discipline, name=row.discipline)
+        work_kind = get_or_create(WorkKind, {"color_hex": "#6c757d"}, name=row.work_kind)
+        lecturer = get_or_create(Lecturer, fio=row.lecturer)
+        group = get_or_create(Group, {"name": row.group}, code=row.group)
+        building = get_or_create(
+            Building,
+            {"name": DEFAULT_BUILDING["name"], "address": DEFAULT_BUILDING["address"]},
+            code=DEFAULT_BUILDING["code"],
+        )
+        room = get_or_create(
+            Room, {"capacity": 30, "type": "lecture"}, building_id=building.id, number=row.room
+        )
+        time_start, time_end = ParserService.PAIR_TIMES[row.pair_number]
+        time_slot = get_or_create(
+            TimeSlot,
+            {"time_start": time_start, "time_end": time_end},
+            date=row.event_date,
+            pair_number=row.pair_number,
+        )
+        db_event = Event(
+            discipline_id=discipline.id,
+            work_kind_id=work_kind.id,
+            room_id=room.id,
+            time_slot_id=time_slot.id,
+            status="scheduled",
+        )
+        db.add(db_event)
+        db.flush()
+        db.add(EventLecturer(event_id=db_event.id, lecturer_id=lecturer.id))
+        db.add(EventGroup(event_id=db_event.id, group_id=group.id))
+        created += 1
+    db.flush()
+    return created
+
+
+def run(func):
+    """(время, число SQL запросов, результат) с откатом изменений."""
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    db = SessionLocal()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        started = timer.perf_counter()
+        result = func(db)
+        elapsed = timer.perf_counter() - started
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+        db.rollback()
+        db.close()
+    return elapsed, len(statements), result
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 5000]
+    print(
+        f"{'rows':>7} {'legacy, s':>10} {'queries':>8} {'bulk, s':>8} {'queries':>8} "
+        f"{'speedup':>8}  phases"
+    )
+    for count in counts:
+        html = generate_html(count)
+        rows = ParserService.parse_rows(html, ParseResult())
+        legacy_time, legacy_queries, legacy_created = run(lambda db: legacy_import(db, rows))
+        bulk_time, bulk_queries, result = run(lambda db: ParserService.parse_html(db, html))
+        assert result.events_created == legacy_created == count
+
+        # Разбор HTML входит во время bulk, но не legacy
+        phases = " ".join(f"{phase}={seconds:.3f}" for phase, seconds in result.timings.items())
+        print(
+            f"{count:>7} {legacy_time:>10.3f} {legacy_queries:>8} {bulk_time:>8.3f} "
+            f"{bulk_queries:>8} {legacy_time / bulk_time:>7.1f}x  {phases}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Память потокового разбора HTML в сравнении с деревом BeautifulSoup.
+
+Запуск: python -m benchmarks.import_memory [размер файла в МБ ...]
+
+Синтетический файл пишется во временный каталог. Каждый режим выполняется
+в отдельном процессе, чтобы пиковый RSS не смешивался. BeautifulSoup
+запускается только на файлах до SOUP_MAX_MB. БД не используется.
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time as timer
+from bs4 import BeautifulSoup
+from app.services.parser import ParseResult, ParserService
+from benchmarks.import_html import generate_rows
+
+CHUNK_SIZE = 1024 * 1024
+SOUP_MAX_MB = 50
+
+
+def write_file(path: str, size_mb: int) -> None:
+    """HTML-таблица размером не меньше size_mb мегабайт."""
+    limit = size_mb * 1024 * 1024
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<html><body><table>\n")
+        seed = 0
+        while written < limit:
+            seed += 1
+            for row in generate_rows(10000, seed=seed):
+                written += len(row.encode()) + 1
+                f.write(row + "\n")
+                if written >= limit:
+                    break
+        f.write("</table></body></html>\n")
+
+
+def rss_mb() -> float:
+    """Текущий RSS процесса, МБ."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def run_stream(path: str) -> None:
+    samples = []
+    rows = 0
+    with open(path, "rb") as f:
+        chunks = iter(lambda: f.read(CHUNK_SIZE), b"")
+        for _ in ParserService.iter_rows(chunks, ParseResult()):
+            rows += 1
+            if rows % 100000 == 0:
+                samples.append(rss_mb())
+    # RSS в середине и в конце разбора: при потоковом разборе они совпадают
+    middle = samples[len(samples) // 2] if samples else rss_mb()
+    print(rows, f"{middle:.1f}", f"{rss_mb():.1f}")
+
+
+def run_soup(path: str) -> None:
+    with open(path, "rb") as f:
+        content = f.read().decode("utf-8")
+    soup = BeautifulSoup(content, "lxml")
+    rows = sum(1 for table in soup.find_all("table") for _ in table.find_all("tr"))
+    print(rows, "-", f"{rss_mb():.1f}")
+
+
+def child(mode: str, path: str) -> None:
+    started = timer.perf_counter()
+    {"stream": run_stream, "soup": run_soup}[mode](path)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{timer.perf_counter() - started:.2f}", f"{peak:.1f}")
+
+
+def measure(mode: str, path: str):
+    """(строк, RSS в середине, RSS в конце, время, пиковый RSS) из дочернего процесса."""
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.import_memory", "--child", mode, path],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    return output
+
+
+def main():
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], sys.argv[3])
+        return
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 50, 200]
+    print(
+        f"{'file, MB':>9} {'mode':>7} {'rows':>9} {'time, s':>8} "
+        f"{'RSS mid':>8} {'RSS end':>8} {'peak RSS':>9}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"timetable_{size}.html")
+            write_file(path, size)
+            file_mb = os.path.getsize(path) / 1024 / 1024
+            modes = ["stream", "soup"] if size <= SOUP_MAX_MB else ["stream"]
+            for mode in modes:
+                rows, middle, end, elapsed, peak = measure(mode, path)
+                print(
+                    f"{file_mb:>9.0f} {mode:>7} {rows:>9} {elapsed:>8} "
+                    f"{middle:>8} {end:>8} {peak:>9}"
+                )
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
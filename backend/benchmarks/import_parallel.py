@@ -0,0 +1,56 @@
+"""Скорость извлечения строк HTML: один поток против пула процессов.
+
+Запуск: python -m benchmarks.import_parallel [размер файла в МБ] [число процессов ...]
+
+Синтетический файл пишется во временный каталог. Измеряется только
+извлечение строк (HTML -> ParsedRow) без записи в БД — та часть импорта,
+которая распараллеливается. Ускорение ограничено числом ядер машины.
+"""
+import os
+import sys
+import tempfile
+import time as timer
+from app.services.parser import FILE_CHUNK_SIZE, ParseResult, ParserService
+from benchmarks.import_memory import write_file
+
+
+def run_stream(path: str) -> int:
+    with open(path, "rb") as f:
+        chunks = iter(lambda: f.read(FILE_CHUNK_SIZE), b"")
+        return sum(1 for _ in ParserService.iter_rows(chunks, ParseResult()))
+
+
+def run_parallel(path: str, processes: int) -> int:
+    return sum(1 for _ in ParserService.iter_rows_parallel(path, ParseResult(), processes))
+
+
+def main():
+    args = [int(arg) for arg in sys.argv[1:]]
+    size_mb = args[0] if args else 64
+    counts = args[1:] or sorted({2, 4, os.cpu_count() or 1})
+    print(f"file {size_mb} MB, cores {os.cpu_count()}")
+    print(f"{'mode':>12} {'rows':>9} {'time, s':>8} {'rows/s':>9} {'speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "timetable.html")
+        write_file(path, size_mb)
+
+        started = timer.perf_counter()
+        rows = run_stream(path)
+        base = timer.perf_counter() - started
+        print(f"{'stream':>12} {rows:>9} {base:>8.2f} {rows / base:>9.0f} {1:>7.2f}x")
+
+        for processes in counts:
+            # Время включает запуск процессов пула
+            started = timer.perf_counter()
+            parallel_rows = run_parallel(path, processes)
+            elapsed = timer.perf_counter() - started
+            assert parallel_rows == rows
+            print(
+                f"{f'parallel {processes}':>12} {parallel_rows:>9} {elapsed:>8.2f} "
+                f"{parallel_rows / elapsed:>9.0f} {base / elapsed:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Тело ответа расписания: словари Python против JSON, собранного в Postgres.
+
+Запуск: python -m benchmarks.timetable_json [число событий ...]
+
+Нужна БД с примененными миграциями. Для каждого размера генерируются
+синтетические данные benchmarks.timetable_plans (откатываются после
+замера), и строится тело ответа GET /api/timetable без фильтров (все
+события) и за неделю:
+- events  — запрос по таблицам событий, ORM и словари EventDetail;
+- entries — строки timetable_entries, ORM и словари EventDetail;
+- sql     — json_build_object/json_agg в Postgres, в Python только байты.
+"""
+import sys
+import time as timer
+from typing import Callable, List
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+from app.db.session import SessionLocal
+from app.schemas import EventDetail
+from app.services.event_query import EventQueryService
+from app.services.event_records import EventRecord
+from app.services.timetable_entries import TimetableEntryService
+from benchmarks.timetable_plans import filters, generate
+
+REPEATS = 3
+_EVENT_LIST = TypeAdapter(List[EventDetail])
+
+
+def from_events(db: Session, **filters) -> bytes:
+    events = EventQueryService.timetable_query(db, **filters)
+    details = [
+        TimetableEntryService.to_detail_dict(record, ids)
+        for record, ids in TimetableEntryService.with_conflicts(map(EventRecord.from_event, events))
+    ]
+    return _EVENT_LIST.dump_json(_EVENT_LIST.validate_python(details))
+
+
+def from_entries(db: Session, **filters) -> bytes:
+    entries = TimetableEntryService.query(db, **filters)
+    details = [
+        TimetableEntryService.to_detail_dict(entry, ids)
+        for entry, ids in TimetableEntryService.with_conflicts(entries)
+    ]
+    return _EVENT_LIST.dump_json(_EVENT_LIST.validate_python(details))
+
+
+def from_sql(db: Session, **filters) -> bytes:
+    return TimetableEntryService.json_array(db, **filters)
+
+
+def best(db: Session, build: Callable[..., bytes], **filters) -> float:
+    """Лучшее из REPEATS время построения тела ответа (мс)."""
+    times = []
+    for _ in range(REPEATS):
+        db.expunge_all()
+        started = timer.perf_counter()
+        build(db, **filters)
+        times.append((timer.perf_counter() - started) * 1000)
+    return min(times)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    print(f"{'events':>7} {'filter':<6} {'rows':>6} {'events, ms':>11} {'entries, ms':>12} "
+          f"{'sql, ms':>9} {'sql vs entries':>15}")
+    for size in sizes:
+        db = SessionLocal()
+        try:
+            ids = generate(db, size)
+            TimetableEntryService.rebuild(db)
+            cases = [("all", {}), ("week", dict(filters(ids))["week"])]
+            for name, case in cases:
+                rows = len(_EVENT_LIST.validate_json(from_sql(db, **case)))
+                times = [best(db, build, **case) for build in (from_events, from_entries, from_sql)]
+                print(
+                    f"{size:>7} {name:<6} {rows:>6} {times[0]:>11.1f} {times[1]:>12.1f} "
+                    f"{times[2]:>9.1f} {times[1] / times[2]:>14.1f}x"
+                )
+        finally:
+            db.rollback()
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Планы запросов расписания (EXPLAIN ANALYZE) с индексами миграции 005 и без них.
+
+Запуск: python -m benchmarks.timetable_plans [число событий]
+
+Нужна БД с примененными миграциями. Синтетические данные (год слотов,
+2000 групп, 800 преподавателей, по умолчанию 300 тыс. событий) и
+замена индексов на прежние одноколоночные делаются в одной
+транзакции, которая в конце откатывается.
+"""
+import sys
+from datetime import date
+from typing import Any, Dict, Iterator, List, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.db.session import SessionLocal, engine
+from app.services.event_query import EventQueryService
+from app.services.parser import EVENT_LINKS
+
+GROUPS = 2000
+LECTURERS = 800
+STREAMS = 60
+ROOMS = 400
+DISCIPLINES = 300
+FIRST_DATE = date(2030, 1, 1)
+DAYS = 365
+PAGE_SIZE = 100
+REPEATS = 3
+
+# Индексы до миграции 005 (DDL для сравнения)
+LEGACY_INDEXES = [
+    "DROP INDEX ix_time_slots_date_time",
+    "ALTER TABLE time_slots DROP CONSTRAINT uq_time_slots_date_pair_number",
+    "CREATE INDEX ix_time_slots_date ON time_slots (date)",
+    "DROP INDEX ix_events_scheduled_time_slot_id",
+] + [
+    statement
+    for model, _, column in EVENT_LINKS
+    for statement in (
+        f"DROP INDEX ix_{model.__tablename__}_{column}_event_id",
+        f"CREATE INDEX ix_{model.__tablename__}_{column} ON {model.__tablename__} ({column})",
+    )
+]
+
+
+def insert_ids(db: Session, sql: str, **params) -> int:
+    """Первый id строк, вставленных INSERT ... SELECT ... RETURNING id."""
+    return min(db.execute(text(sql + " RETURNING id"), params).scalars())
+
+
+def generate(db: Session, events: int) -> Dict[str, int]:
+    """Синтетическое расписание; возвращает первые id сущностей для фильтров."""
+    db.execute(text("SELECT setseed(0.5)"))
+    building = insert_ids(
+        db, "INSERT INTO buildings (name, code, address) VALUES ('Бенч', 'BENCH', 'Бенч')"
+    )
+    ids = {
+        "building": building,
+        "room": insert_ids(
+            db,
+            "INSERT INTO rooms (building_id, number, capacity, type, active) "
+            "SELECT :building, g::text, 30, 'lecture', true FROM generate_series(1, :n) g",
+            building=building,
+            n=ROOMS,
+        ),
+        "discipline": insert_ids(
+            db,
+            "INSERT INTO disciplines (name, active) "
+            "SELECT 'Бенч ' || g, true FROM generate_series(1, :n) g",
+            n=DISCIPLINES,
+        ),
+        "work_kind": insert_ids(
+            db,
+            "INSERT INTO work_kinds (name, color_hex, active) VALUES ('Бенч', '#6c757d', true)",
+        ),
+        "group": insert_ids(
+            db,
+            "INSERT INTO groups (code, name, active) "
+            "SELECT 'BENCH' || g, 'Бенч ' || g, true FROM generate_series(1, :n) g",
+            n=GROUPS,
+        ),
+        "lecturer": insert_ids(
+            db,
+            "INSERT INTO lecturers (fio, active) "
+            "SELECT 'Бенч ' || g, true FROM generate_series(1, :n) g",
+            n=LECTURERS,
+        ),
+        "stream": insert_ids(
+            db,
+            "INSERT INTO streams (name, active) "
+            "SELECT 'Бенч ' || g, true FROM generate_series(1, :n) g",
+            n=STREAMS,
+        ),
+        "time_slot": insert_ids(
+            db,
+            "INSERT INTO time_slots (date, pair_number, time_start, time_end, timezone) "
+            "SELECT CAST(:first AS date) + d, p, make_time(7 + p, 30, 0), "
+            "make_time(9 + p, 0, 0), 'Europe/Moscow' "
+            "FROM generate_series(0, :days - 1) d, generate_series(1, 8) p",
+            first=FIRST_DATE,
+            days=DAYS,
+        ),
+    }
+    ids["event"] = insert_ids(
+        db,
+        "INSERT INTO events (discipline_id, work_kind_id, room_id, time_slot_id, status) "
+        "SELECT :discipline + floor(random() * :disciplines)::int, :work_kind, "
+        "       :room + floor(random() * :rooms)::int, "
+        "       :time_slot + floor(random() * :slots)::int, "
+        "       CASE WHEN random() < 0.1 THEN 'cancelled' ELSE 'scheduled' END "
+        "FROM generate_series(1, :n)",
+        discipline=ids["discipline"],
+        disciplines=DISCIPLINES,
+        work_kind=ids["work_kind"],
+        room=ids["room"],
+        rooms=ROOMS,
+        time_slot=ids["time_slot"],
+        slots=DAYS * 8,
+        n=events,
+    )
+    for table, column, first, count, share in (
+        ("event_groups", "group_id", ids["group"], GROUPS, 1.0),
+        ("event_lecturers", "lecturer_id", ids["lecturer"], LECTURERS, 1.0),
+        ("event_streams", "stream_id", ids["stream"], STREAMS, 0.2),
+    ):
+        db.execute(
+            text(
+                f"INSERT INTO {table} (event_id, {column}) "
+                f"SELECT id, :first + floor(random() * :count)::int FROM events "
+                f"WHERE id >= :event AND random() < :share"
+            ),
+            {"first": first, "count": count, "event": ids["event"], "share": share},
+        )
+    db.execute(text("ANALYZE"))
+    return ids
+
+
+def filters(ids: Dict[str, int]) -> List[Tuple[str, Dict[str, Any]]]:
+    """Фильтры страницы расписания: неделя по каждому ресурсу и семестр группы."""
+    week = {"date_from": date(2030, 3, 4), "date_to": date(2030, 3, 10)}
+    return [
+        ("week", week),
+        ("group, week", {**week, "group_id": ids["group"]}),
+        ("lecturer, week", {**week, "lecturer_id": ids["lecturer"]}),
+        ("stream, week", {**week, "stream_id": ids["stream"]}),
+        ("room, week", {**week, "room_id": ids["room"]}),
+        ("building, week", {**week, "building_id": ids["building"]}),
+        (
+            "group, semester",
+            {"date_from": date(2030, 2, 1), "date_to": date(2030, 6, 30), "group_id": ids["group"]},
+        ),
+    ]
+
+
+def index_names(plan: Dict[str, Any]) -> Iterator[str]:
+    if "Index Name" in plan:
+        yield plan["Index Name"]
+    for child in plan.get("Plans", []):
+        yield from index_names(child)
+
+
+def explain(db: Session, **filters) -> Tuple[float, List[str]]:
+    """Лучшее из REPEATS время выполнения (мс) основного запроса страницы и его индексы."""
+    statement = EventQueryService.timetable_query(db, **filters).limit(PAGE_SIZE).statement
+    compiled = statement.compile(dialect=engine.dialect)
+    best = None
+    for _ in range(REPEATS):
+        (plan,) = db.connection().exec_driver_sql(
+            f"EXPLAIN (ANALYZE, FORMAT JSON) {compiled}", compiled.params
+        ).scalar()
+        if best is None or plan["Execution Time"] < best["Execution Time"]:
+            best = plan
+    return best["Execution Time"], sorted(set(index_names(best["Plan"])))
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    db = SessionLocal()
+    try:
+        ids = generate(db, events)
+        cases = filters(ids)
+
+        db.begin_nested()
+        for statement in LEGACY_INDEXES:
+            db.execute(text(statement))
+        db.execute(text("ANALYZE"))
+        legacy = [explain(db, **case) for _, case in cases]
+        db.rollback()
+
+        print(f"{events} events, first {PAGE_SIZE} rows of each timetable page")
+        print(f"{'filter':<16} {'before, ms':>10} {'after, ms':>10} {'speedup':>8}  indexes after")
+        for (name, case), (before, _) in zip(cases, legacy):
+            after, indexes = explain(db, **case)
+            print(
+                f"{name:<16} {before:>10.2f} {after:>10.2f} {before / after:>7.1f}x  "
+                f"{', '.join(indexes)}"
+            )
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Выдача расписания: запрос по таблицам событий против модели чтения timetable_entries.
+
+Запуск: python -m benchmarks.timetable_read_model [число событий]
+
+Нужна БД с примененными миграциями. Синтетические данные те же, что в
+benchmarks.timetable_plans, и откатываются в конце. Измеряется полное
+построение ответа: запрос, поиск конфликтов и словари EventDetail.
+"""
+import sys
+import time as timer
+from typing import Callable, List
+from sqlalchemy.orm import Session
+from app.db.session import SessionLocal
+from app.services.event_query import EventQueryService
+from app.services.event_records import EventRecord
+from app.services.timetable_entries import TimetableEntryService
+from benchmarks.timetable_plans import filters, generate
+
+REPEATS = 3
+
+
+def from_events(db: Session, **filters) -> List[dict]:
+    events = EventQueryService.timetable_query(db, **filters)
+    return [
+        TimetableEntryService.to_detail_dict(record, ids)
+        for record, ids in TimetableEntryService.with_conflicts(map(EventRecord.from_event, events))
+    ]
+
+
+def from_entries(db: Session, **filters) -> List[dict]:
+    entries = TimetableEntryService.query(db, **filters)
+    return [
+        TimetableEntryService.to_detail_dict(entry, ids)
+        for entry, ids in TimetableEntryService.with_conflicts(entries)
+    ]
+
+
+def best(db: Session, build: Callable[..., List[dict]], **filters) -> float:
+    """Лучшее из REPEATS время построения ответа (мс)."""
+    times = []
+    for _ in range(REPEATS):
+        db.expunge_all()
+        started = timer.perf_counter()
+        build(db, **filters)
+        times.append((timer.perf_counter() - started) * 1000)
+    return min(times)
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    db = SessionLocal()
+    try:
+        ids = generate(db, events)
+        started = timer.perf_counter()
+        TimetableEntryService.rebuild(db)
+        print(f"{events} events, read model rebuilt in {timer.perf_counter() - started:.1f} s")
+        print(f"{'filter':<16} {'rows':>6} {'events, ms':>11} {'entries, ms':>12} {'speedup':>8}")
+        for name, case in filters(ids):
+            rows = len(from_entries(db, **case))
+            assert rows == len(from_events(db, **case))
+            before = best(db, from_events, **case)
+            after = best(db, from_entries, **case)
+            print(f"{name:<16} {rows:>6} {before:>11.1f} {after:>12.1f} {before / after:>7.1f}x")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 """Конфигурация pytest."""
 import pytest
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from app.db.session import Base, get_db
 from app.main import app
@@ -25,6 +26,26 @@ def db():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(scope="function")
+def count_statements(db):
+    """Подсчет SQL запросов, выполненных через тестовую БД."""
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return counter
+
+
 @pytest.fixture(scope="function")
 def client(db):
     """Тестовый клиент FastAPI."""
@@ -0,0 +1,204 @@
+"""Тесты кэша и тегов кэша расписания."""
+import hashlib
+import json
+import random
+import threading
+import time as timer
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time
+import pytest
+from sqlalchemy.orm import Session
+from app.models import Building, Room, TimeSlot
+from app.services.cache import (
+    CacheService,
+    LocalCache,
+    cache_result,
+    decode_value,
+    encode_value,
+    get_serializer,
+    make_cache_key,
+    cache_service,
+)
+from app.services.cache_tags import CacheTagService
+from app.services.response_cache import ResponseCacheService
+
+
+def test_range_matches():
+    """Диапазон дат записи сравнивается с датами изменения, концы могут быть открыты."""
+    dates = {"2025-11-17"}
+    assert CacheService._range_matches("2025-11-17|2025-11-23", dates)
+    assert CacheService._range_matches("|", dates)
+    assert CacheService._range_matches("2025-11-01|", dates)
+    assert not CacheService._range_matches("2025-11-18|2025-11-23", dates)
+    assert not CacheService._range_matches("|2025-11-16", dates)
+
+
+def test_local_cache_lru_and_ttl():
+    """LRU процесса вытесняет давно не читанные записи и не отдает истекшие."""
+    local = LocalCache(maxsize=2, ttl=60)
+    local.set("a", [])
+    local.set("b", 2)
+    assert local.get("a") == (True, [])
+    local.set("c", 3)
+    assert local.get("b") == (False, None)
+    assert local.evictions == 1
+
+    local.set("a", 1, ttl=0)
+    assert local.get("a") == (False, None)
+
+
+def _fresh_key(cache: CacheService) -> str:
+    key = f"test:flight:{uuid.uuid4().hex}"
+    cache.delete(key)
+    return key
+
+
+def test_get_or_set_single_flight():
+    """Одновременные промахи по одному ключу вызывают producer один раз."""
+    cache = CacheService()
+    key = _fresh_key(cache)
+    calls = []
+
+    def producer():
+        calls.append(1)
+        timer.sleep(0.2)
+        return {"value": 1}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: cache.get_or_set(key, producer, ttl=60), range(8)))
+    assert calls == [1]
+    assert results == [{"value": 1}] * 8
+
+
+def test_get_or_set_waits_for_other_process():
+    """Пока ключ пересчитывает другой процесс (блокировка в Redis), producer не вызывается."""
+    cache = CacheService()
+    key = _fresh_key(cache)
+    lock_key = cache._lock_key(key)
+    cache.redis_client.set(lock_key, "other", px=5000)
+
+    def other_process():
+        timer.sleep(0.2)
+        cache.redis_client.setex(key, 60, json.dumps({"value": "other"}))
+        cache.redis_client.delete(lock_key)
+
+    thread = threading.Thread(target=other_process)
+    thread.start()
+    try:
+        assert cache.get_or_set(key, lambda: pytest.fail("producer called"), ttl=60) == {
+            "value": "other"
+        }
+    finally:
+        thread.join()
+    assert cache.stats()["lock_waits"] == 1
+
+
+def test_get_or_set_early_refresh(monkeypatch):
+    """XFetch: дорогое значение пересчитывается до истечения TTL, дешевое — нет."""
+    monkeypatch.setattr(random, "random", lambda: 0.5)
+    cache = CacheService()
+    key = _fresh_key(cache)
+    calls = []
+
+    def producer():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_set(key, producer, ttl=60) == 1
+    # Пересчет занял 1 мс: до конца TTL далеко, значение берется из Redis
+    cache.redis_client.setex(cache._delta_key(key), 60, "0.001")
+    cache.local.clear()
+    assert cache.get_or_set(key, producer, ttl=60) == 1
+
+    # Пересчет длиннее оставшегося TTL: значение обновляется заранее
+    cache.redis_client.setex(cache._delta_key(key), 60, "1000")
+    cache.local.clear()
+    assert cache.redis_client.pttl(key) > 0
+    assert cache.get_or_set(key, producer, ttl=60) == 2
+    assert calls == [1, 1]
+    assert cache.stats()["early_refreshes"] == 1
+
+
+def test_event_state_tags(db):
+    """Теги изменения включают корпус аудитории и даты слотов до и после."""
+    building = Building(name="Тест", code="T", address="Тест")
+    db.add(building)
+    db.flush()
+    room = Room(building_id=building.id, number="101", capacity=30, type="lecture")
+    slots = [
+        TimeSlot(
+            date=date(2025, 11, day), pair_number=1, time_start=time(8, 30), time_end=time(10, 0)
+        )
+        for day in (17, 18)
+    ]
+    db.add(room)
+    db.add_all(slots)
+    db.commit()
+
+    before = {"room_id": room.id, "time_slot_id": slots[0].id, "group_ids": [1], "lecturer_ids": []}
+    after = {**before, "time_slot_id": slots[1].id, "lecturer_ids": [7], "stream_ids": [3]}
+    tags, dates = CacheTagService.for_event_states(db, [before, after, None])
+
+    assert tags == {
+        "group:1",
+        "lecturer:7",
+        "stream:3",
+        f"room:{room.id}",
+        f"building:{building.id}",
+    }
+    assert dates == {date(2025, 11, 17), date(2025, 11, 18)}
+    assert CacheTagService.for_filters(group_id=1, stream_id=3) == ["group:1", "stream:3"]
+
+
+def test_cache_result_key_and_encoding():
+    """Ключ не зависит от сессии БД и процесса, большие значения сжимаются."""
+    assert make_cache_key("rooms", {"b": 2, "a": 1}) == make_cache_key("rooms", {"a": 1, "b": 2})
+    digest = hashlib.sha256(b'{"a":1}').hexdigest()[:32]
+    assert make_cache_key("rooms", {"a": 1}) == f"rooms:{digest}"
+
+    codec = get_serializer("json")
+    value = [{"id": i, "name": "Аудитория"} for i in range(200)]
+    encoded = encode_value(value, codec, compress_min_bytes=1024)
+    assert encoded[:1] == b"z"
+    assert decode_value(encoded, codec) == value
+    assert decode_value(encode_value([], codec, compress_min_bytes=1024), codec) == []
+    with pytest.raises(ValueError):
+        get_serializer("pickle")
+
+
+def test_cache_result_decorator(db):
+    """Повторный вызов с другой сессией берется из кэша, инвалидация по тегу сбрасывает его."""
+    calls = []
+
+    @cache_result("test_rooms", ttl=60, tags=[CacheTagService.reference("test_rooms")])
+    def list_rooms(building_id: int, db: Session):
+        calls.append(building_id)
+        return [{"building_id": building_id}]
+
+    CacheTagService.invalidate_reference("test_rooms")
+    assert list_rooms(1, db) == [{"building_id": 1}]
+    assert list_rooms(1, db=None) == [{"building_id": 1}]
+    assert list_rooms(2, db) == [{"building_id": 2}]
+    assert calls == [1, 2]
+
+    assert CacheTagService.invalidate_reference("test_rooms") == 2
+    list_rooms(1, db)
+    assert calls == [1, 2, 1]
+
+
+def test_timetable_etag(client):
+    """Повторный запрос с If-None-Match получает 304 без тела."""
+    cache_service.delete_pattern("timetable:*")
+    response = client.get("/api/timetable", params={"date_from": "2025-11-17"})
+    assert response.status_code == 200
+    assert response.json() == []
+    etag = response.headers["etag"]
+
+    response = client.get(
+        "/api/timetable", params={"date_from": "2025-11-17"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert ResponseCacheService.etag_matches(f'"other", W/{etag}', etag)
+    assert not ResponseCacheService.etag_matches('"other"', etag)
@@ -0,0 +1,73 @@
+"""Тесты движка поиска конфликтов."""
+import random
+from datetime import date, time
+from app.validators.conflict_engine import ConflictEngine, ScheduleItem
+
+DAY = date(2025, 11, 17)
+
+
+def test_overlapping_events_sharing_room():
+    """Пересекающиеся события в одной аудитории конфликтуют."""
+    items = [
+        ScheduleItem(1, DAY, time(8, 30), time(10, 0), room_id=1),
+        ScheduleItem(2, DAY, time(9, 30), time(11, 0), room_id=1),
+        ScheduleItem(3, DAY, time(9, 30), time(11, 0), room_id=2),
+    ]
+    conflicts = ConflictEngine.find_conflicts(items)
+    assert [(c.conflict_type, c.first, c.second) for c in conflicts] == [("room_conflict", 1, 2)]
+    assert ConflictEngine.conflict_map(items) == {1: [2], 2: [1]}
+
+
+def test_adjacent_and_other_day_events_do_not_conflict():
+    """Смежные интервалы и другие даты не конфликтуют."""
+    items = [
+        ScheduleItem(1, DAY, time(8, 30), time(10, 0), lecturer_ids=[5]),
+        ScheduleItem(2, DAY, time(10, 0), time(11, 30), lecturer_ids=[5]),
+        ScheduleItem(3, date(2025, 11, 18), time(8, 30), time(10, 0), lecturer_ids=[5]),
+    ]
+    assert ConflictEngine.find_conflicts(items) == []
+
+
+def test_every_shared_resource_is_reported():
+    """Конфликт фиксируется по каждому общему ресурсу, включая подгруппы и потоки."""
+    resources = {"group_ids": [1], "subgroup_ids": [2], "stream_ids": [3]}
+    items = [
+        ScheduleItem(1, DAY, time(8, 30), time(10, 0), **resources),
+        ScheduleItem(2, DAY, time(8, 30), time(10, 0), **resources),
+    ]
+    kinds = sorted(c.kind for c in ConflictEngine.find_conflicts(items))
+    assert kinds == ["group", "stream", "subgroup"]
+
+
+def test_matches_pairwise_comparison():
+    """Результат совпадает с попарным сравнением всех событий."""
+    rng = random.Random(42)
+    items = []
+    for key in range(300):
+        start = rng.randrange(8 * 60, 20 * 60, 10)
+        end = start + rng.choice([45, 90, 180])
+        items.append(
+            ScheduleItem(
+                key,
+                date(2025, 11, rng.randint(17, 19)),
+                time(start // 60, start % 60),
+                time(min(end, 23 * 60) // 60, min(end, 23 * 60) % 60),
+                room_id=rng.randint(1, 15),
+                lecturer_ids=rng.sample(range(1, 30), rng.randint(0, 2)),
+                group_ids=rng.sample(range(1, 40), rng.randint(0, 3)),
+            )
+        )
+
+    expected = {}
+    for a in items:
+        for b in items:
+            if a.key == b.key or a.date != b.date:
+                continue
+            if not ConflictEngine.intervals_overlap(
+                a.time_start, a.time_end, b.time_start, b.time_end
+            ):
+                continue
+            if any(set(a.resources[kind]) & set(b.resources[kind]) for kind in a.resources):
+                expected.setdefault(a.key, []).append(b.key)
+
+    assert ConflictEngine.conflict_map(items) == {k: sorted(v) for k, v in expected.items()}
@@ -0,0 +1,391 @@
+"""Тесты построения запросов событий."""
+import json
+import pytest
+from datetime import date, time, timedelta
+from app.models import (
+    Building,
+    Room,
+    Lecturer,
+    Group,
+    Subgroup,
+    Stream,
+    Discipline,
+    WorkKind,
+    TimeSlot,
+    Event,
+    TimetableEntry,
+)
+from app.models.event import EventLecturer, EventGroup, EventSubgroup, EventStream
+from app.api.routes.timetable import NEXT_CURSOR_HEADER
+from app.core.config import settings
+from app.services.cache import cache_service
+from app.services.event_query import EventQueryService
+from app.services.event_records import EventRecord, EventRecordService
+from app.services.ics import ICSService
+from app.services.timetable_entries import TimetableEntryService
+
+# Основной запрос + по одному SELECT ... IN на каждую коллекцию
+MAX_STATEMENTS = 5
+
+
+def create_events(db, count: int, group: Group):
+    """Создание count событий группы, каждое в своей аудитории и со своими связями."""
+    discipline = Discipline(name=f"Тест {group.code}", short_name="Т")
+    work_kind = WorkKind(name=f"Лекция {group.code}", color_hex="#28a745")
+    stream = Stream(name=f"Поток {group.code}")
+    db.add_all([discipline, work_kind, stream])
+    db.flush()
+
+    for i in range(count):
+        building = Building(
+            name=f"Корпус {group.code}-{i}", code=f"{group.code}{i}", address="Тест"
+        )
+        db.add(building)
+        db.flush()
+        room = Room(building_id=building.id, number=str(100 + i), capacity=30, type="lecture")
+        lecturer = Lecturer(fio=f"Преподаватель {group.code}-{i}")
+        subgroup = Subgroup(group_id=group.id, code=f"{group.code}-{i}")
+        slot_date = date(2025, 11, 17) + timedelta(days=i % 6)
+        time_slot = db.query(TimeSlot).filter_by(date=slot_date, pair_number=1).first()
+        if time_slot is None:
+            time_slot = TimeSlot(
+                date=slot_date,
+                pair_number=1,
+                time_start=time(8, 30),
+                time_end=time(10, 0),
+                timezone="Europe/Moscow",
+            )
+        db.add_all([room, lecturer, subgroup, time_slot])
+        db.flush()
+
+        event = Event(
+            discipline_id=discipline.id,
+            work_kind_id=work_kind.id,
+            room_id=room.id,
+            time_slot_id=time_slot.id,
+            status="scheduled",
+        )
+        db.add(event)
+        db.flush()
+        db.add(EventLecturer(event_id=event.id, lecturer_id=lecturer.id))
+        db.add(EventGroup(event_id=event.id, group_id=group.id))
+        db.add(EventSubgroup(event_id=event.id, subgroup_id=subgroup.id))
+        db.add(EventStream(event_id=event.id, stream_id=stream.id))
+    db.commit()
+
+
+def test_timetable_query_statement_count_is_bounded(db, count_statements):
+    """Число запросов на выдачу расписания не зависит от количества событий."""
+    small_group = Group(code="SMALL", name="Малая")
+    large_group = Group(code="LARGE", name="Большая")
+    db.add_all([small_group, large_group])
+    db.flush()
+    create_events(db, 2, small_group)
+    create_events(db, 25, large_group)
+
+    cases = ((small_group.id, "SMALL", 2), (large_group.id, "LARGE", 25))
+    counts = {}
+    for group_id, code, expected in cases:
+        db.expunge_all()
+        with count_statements() as statements:
+            events = EventQueryService.timetable_query(
+                db,
+                date_from=date(2025, 11, 17),
+                date_to=date(2025, 11, 23),
+                group_id=group_id,
+            ).all()
+            details = [
+                TimetableEntryService.to_detail_dict(EventRecord.from_event(event))
+                for event in events
+            ]
+        assert len(details) == expected
+        assert all(d["room"]["building"] and d["lecturers"] and d["streams"] for d in details)
+        counts[code] = len(statements)
+
+    assert counts["LARGE"] <= MAX_STATEMENTS
+    assert counts["SMALL"] == counts["LARGE"]
+
+
+def test_ics_statement_count_is_bounded(db, count_statements):
+    """Генерация ICS не делает запросов на каждое событие."""
+    group = Group(code="ICS", name="ICS")
+    db.add(group)
+    db.flush()
+    create_events(db, 20, group)
+    TimetableEntryService.rebuild(db)
+    db.commit()
+    group_id = group.id
+    db.expunge_all()
+
+    with count_statements() as statements:
+        ics_content = ICSService.generate_ics_for_group(db, group_id)
+
+    assert ics_content.count("BEGIN:VEVENT") == 20
+    # Запрос группы для заголовка, записей событий и ревизий (один на порцию)
+    assert len(statements) <= 3
+
+
+def test_unknown_strategy_rejected():
+    """Неизвестная стратегия загрузки — ошибка конфигурации."""
+    with pytest.raises(ValueError):
+        EventQueryService.load_options({"lecturers": "subquery"})
+    with pytest.raises(ValueError):
+        EventQueryService.load_options({"attachments": "selectin"})
+
+
+def test_timetable_keyset_pagination(db):
+    """Страницы по курсору обходят все события в порядке (дата, начало, id) без повторов."""
+    group = Group(code="PAGE", name="Страницы")
+    db.add(group)
+    db.flush()
+    create_events(db, 13, group)
+
+    seen = []
+    after = None
+    while True:
+        page = EventQueryService.timetable_query(db, group_id=group.id, after=after).limit(5).all()
+        if not page:
+            break
+        seen.extend(page)
+        key = (page[-1].time_slot.date, page[-1].time_slot.time_start, page[-1].id)
+        after = EventQueryService.decode_cursor(EventQueryService.encode_key(key))
+
+    keys = [(e.time_slot.date, e.time_slot.time_start, e.id) for e in seen]
+    assert len(keys) == 13
+    assert keys == sorted(keys)
+    with pytest.raises(ValueError):
+        EventQueryService.decode_cursor("not-a-cursor")
+
+
+def test_compact_timetable_matches_details(db):
+    """Компактный формат восстанавливается в те же данные, что и список EventDetail."""
+    group = Group(code="COMPACT", name="Компакт")
+    db.add(group)
+    db.flush()
+    create_events(db, 8, group)
+    TimetableEntryService.rebuild(db)
+
+    pairs = list(TimetableEntryService.with_conflicts(TimetableEntryService.query(db)))
+    details = [TimetableEntryService.to_detail_dict(entry, ids) for entry, ids in pairs]
+    compact = TimetableEntryService.to_compact(pairs)
+
+    # Каждая сущность передается один раз
+    assert len(compact["disciplines"]) == 1
+    assert len(compact["streams"]) == 1
+    assert len(compact["events"]["id"]) == 8
+
+    by_id = {
+        name: {x["id"]: x for x in items} for name, items in compact.items() if name != "events"
+    }
+    columns = compact["events"]
+    for i, detail in enumerate(details):
+        room = dict(by_id["rooms"][columns["room_id"][i]])
+        room["building"] = by_id["buildings"][room.pop("building_id")]
+        assert detail["id"] == columns["id"][i]
+        assert detail["discipline"] == by_id["disciplines"][columns["discipline_id"][i]]
+        assert detail["room"] == room
+        assert detail["time_slot"] == by_id["time_slots"][columns["time_slot_id"][i]]
+        assert detail["lecturers"] == [by_id["lecturers"][x] for x in columns["lecturer_ids"][i]]
+        assert detail["subgroups"] == [by_id["subgroups"][x] for x in columns["subgroup_ids"][i]]
+        assert detail["conflicting_event_ids"] == columns["conflicting_event_ids"][i]
+
+
+def test_timetable_schema_declares_compact(client):
+    """Схема OpenAPI расписания описывает и список EventDetail, и TimetableCompact."""
+    responses = client.get("/openapi.json").json()["paths"]["/api/timetable"]["get"]["responses"]
+    variants = responses["200"]["content"]["application/json"]["schema"]["anyOf"]
+    assert {"$ref": "#/components/schemas/TimetableCompact"} in variants
+    assert {"type": "array", "items": {"$ref": "#/components/schemas/EventDetail"}} in variants
+
+
+def test_timetable_entries_match_event_query(db):
+    """Модель чтения дает те же данные и конфликты, что и запрос по таблицам событий."""
+    group = Group(code="ENTRY", name="Модель чтения")
+    db.add(group)
+    db.flush()
+    create_events(db, 9, group)
+    TimetableEntryService.rebuild(db)
+    db.commit()
+
+    event = db.query(Event).order_by(Event.id).first()
+    lecturer_id = event.lecturers[0].lecturer_id
+    stream_id = event.streams[0].stream_id
+    building_id = event.room.building_id
+    cases = [
+        {},
+        {"date_from": date(2025, 11, 18), "date_to": date(2025, 11, 19)},
+        {"group_id": group.id},
+        {"lecturer_id": lecturer_id},
+        {"stream_id": stream_id},
+        {"room_id": event.room_id},
+        {"building_id": building_id},
+    ]
+    for filters in cases:
+        events = EventQueryService.timetable_query(db, **filters)
+        pairs = list(TimetableEntryService.with_conflicts(map(EventRecord.from_event, events)))
+        entry_pairs = list(
+            TimetableEntryService.with_conflicts(TimetableEntryService.query(db, **filters))
+        )
+        assert [TimetableEntryService.to_detail_dict(*pair) for pair in entry_pairs] == [
+            TimetableEntryService.to_detail_dict(*pair) for pair in pairs
+        ]
+        assert TimetableEntryService.to_compact(entry_pairs) == TimetableEntryService.to_compact(
+            pairs
+        )
+    # События группы — в одном потоке, в одну дату они конфликтуют
+    entries = TimetableEntryService.query(db)
+    assert any(ids for _, ids in TimetableEntryService.with_conflicts(entries))
+
+
+def test_event_records_match_orm(client, db):
+    """Записи EventRecord дают те же данные, что и ORM события, включая отмененные."""
+    group = Group(code="RECORD", name="Записи")
+    db.add(group)
+    db.flush()
+    create_events(db, 6, group)
+    TimetableEntryService.rebuild(db)
+    events = EventQueryService.timetable_query(db, group_id=group.id).all()
+    events[0].status = "cancelled"
+    TimetableEntryService.sync(db, [events[0].id])
+    db.commit()
+
+    records = list(EventRecordService.timetable(db, group_id=group.id))
+    assert records == [EventRecord.from_event(event) for event in events[1:]]
+    after = (records[1].date, records[1].time_start, records[1].event_id)
+    assert list(EventRecordService.timetable(db, after=after, limit=2)) == records[2:4]
+
+    for event in events[:2]:
+        record = EventRecordService.get_event(db, event.id)
+        assert record == EventRecord.from_event(event)
+        response = client.get(f"/api/events/{event.id}")
+        assert response.json() == json.loads(
+            json.dumps(
+                TimetableEntryService.to_detail_dict(EventRecord.from_event(event)), default=str
+            )
+        )
+    assert EventRecordService.get_event(db, -1) is None
+
+
+def test_timetable_entries_follow_event_writes(client, db):
+    """Создание, изменение и отмена события через API обновляют модель чтения."""
+    group = Group(code="WRITE", name="Запись")
+    db.add(group)
+    db.flush()
+    create_events(db, 1, group)
+    event = db.query(Event).one()
+    time_slot = TimeSlot(
+        date=date(2025, 11, 17), pair_number=2, time_start=time(10, 10), time_end=time(11, 40)
+    )
+    db.add(time_slot)
+    db.commit()
+    payload = {
+        "discipline_id": event.discipline_id,
+        "work_kind_id": event.work_kind_id,
+        "room_id": event.room_id,
+        "time_slot_id": time_slot.id,
+        "lecturer_ids": [],
+        "group_ids": [],
+    }
+
+    created = client.post("/api/events", json=payload)
+    assert created.status_code == 200
+    event_id = created.json()["id"]
+    entry = db.get(TimetableEntry, event_id)
+    assert entry.group_ids == [] and entry.note is None
+
+    lecturer = Lecturer(fio="Новый преподаватель")
+    db.add(lecturer)
+    db.commit()
+    updated = client.put(
+        f"/api/events/{event_id}",
+        json={"note": "Перенос", "lecturer_ids": [lecturer.id], "group_ids": [group.id]},
+    )
+    assert updated.status_code == 200
+    db.expire_all()
+    entry = db.get(TimetableEntry, event_id)
+    assert (entry.note, entry.lecturer_fios, entry.group_codes) == (
+        "Перенос",
+        ["Новый преподаватель"],
+        ["WRITE"],
+    )
+    page = client.get("/api/timetable", params={"group_id": group.id, "limit": 10})
+    assert [detail["id"] for detail in page.json()] == [event_id]
+    assert page.json()[0]["lecturers"] == [{"id": lecturer.id, "fio": "Новый преподаватель"}]
+
+    assert client.delete(f"/api/events/{event_id}").status_code == 200
+    db.expire_all()
+    assert db.get(TimetableEntry, event_id) is None
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"limit": 4},
+        {"format": "ndjson"},
+    ],
+)
+def test_timetable_json_in_db_matches_python(client, db, monkeypatch, params):
+    """JSON, собранный в Postgres, совпадает с ответом, собранным в Python."""
+    group = Group(code="JSON", name="JSON")
+    db.add(group)
+    db.flush()
+    create_events(db, 9, group)
+    TimetableEntryService.rebuild(db)
+    db.commit()
+
+    def fetch(json_in_db: bool) -> list:
+        monkeypatch.setattr(settings, "TIMETABLE_JSON_IN_DB", json_in_db)
+        cache_service.delete_pattern("timetable:*")
+        details, request = [], {**params, "group_id": group.id}
+        while True:
+            response = client.get("/api/timetable", params=request)
+            assert response.status_code == 200
+            if params.get("format") == "ndjson":
+                details.extend(json.loads(line) for line in response.text.splitlines())
+            else:
+                details.extend(response.json())
+            if NEXT_CURSOR_HEADER not in response.headers:
+                return details
+            request["cursor"] = response.headers[NEXT_CURSOR_HEADER]
+
+    details = fetch(True)
+    assert details == fetch(False)
+    assert len(details) == 9
+    assert any(detail["conflicting_event_ids"] for detail in details)
+
+
+def test_timetable_json_page_conflicts_scan_page_dates(db):
+    """Конфликты страницы JSON ищутся только среди строк в даты этой страницы."""
+    group = Group(code="PAGE", name="PAGE")
+    db.add(group)
+    db.flush()
+    # 6 дат по 5 событий; у каждого события 5 ресурсов
+    create_events(db, 30, group)
+    TimetableEntryService.rebuild(db)
+    db.commit()
+
+    params = {
+        "group_id": group.id,
+        "after_date": date.min,
+        "after_time_start": time.min,
+        "after_event_id": 0,
+        "limit": 3,
+    }
+    statement = TimetableEntryService._json_rows_statement(("group_id",), True)
+    compiled = statement.compile(dialect=db.bind.dialect)
+    (plan,) = db.connection().exec_driver_sql(
+        f"EXPLAIN (ANALYZE, FORMAT JSON) {compiled}", compiled.construct_params(params)
+    ).scalar()
+
+    def cte_rows(node: dict, name: str) -> int:
+        if node.get("Subplan Name") == f"CTE {name}":
+            return node["Actual Rows"] * node["Actual Loops"]
+        return sum(cte_rows(child, name) for child in node.get("Plans", []))
+
+    # Страница — 3 события первой даты: ресурсы только 5 событий этой даты
+    assert cte_rows(plan["Plan"], "entries") == 3
+    assert cte_rows(plan["Plan"], "resources") == 5 * 5
+    rows = TimetableEntryService.json_rows(db, limit=3, group_id=group.id).all()
+    assert len(rows) == 3
+    assert {row.date for row in rows} == {date(2025, 11, 17)}
@@ -0,0 +1,118 @@
+"""Тесты API событий: пакетное создание."""
+from datetime import date, time
+from app.models import (
+    Building,
+    ChangeLog,
+    Discipline,
+    Event,
+    EventOccupancy,
+    Lecturer,
+    Room,
+    TimeSlot,
+    TimetableEntry,
+    WorkKind,
+)
+
+
+def _bulk_fixture(db):
+    """Аудитория, преподаватель, два пересекающихся слота и один свободный."""
+    building = Building(name="Тест", code="T", address="Тест")
+    db.add(building)
+    db.flush()
+    room = Room(building_id=building.id, number="101", capacity=30, type="lecture")
+    lecturer = Lecturer(fio="Иванов И.И.")
+    discipline = Discipline(name="Тест", short_name="Т")
+    work_kind = WorkKind(name="Лекция", color_hex="#28a745")
+    slots = [
+        TimeSlot(date=date(2025, 11, 17), pair_number=pair, time_start=start, time_end=end)
+        for pair, start, end in (
+            (1, time(8, 30), time(10, 0)),
+            (2, time(9, 30), time(11, 0)),
+            (3, time(12, 0), time(13, 30)),
+        )
+    ]
+    db.add_all([room, lecturer, discipline, work_kind, *slots])
+    db.commit()
+    payload = {
+        "discipline_id": discipline.id,
+        "work_kind_id": work_kind.id,
+        "room_id": room.id,
+        "lecturer_ids": [lecturer.id],
+    }
+    # Второе событие пересекается с первым по аудитории и преподавателю
+    return [{**payload, "time_slot_id": slot.id} for slot in slots]
+
+
+def test_bulk_create_partial(client, db):
+    """Без atomic создаются прошедшие проверку события, по каждому — свой результат."""
+    events = _bulk_fixture(db)
+    events.append({**events[0], "time_slot_id": -1})
+
+    response = client.post("/api/events/bulk", json={"events": events, "reason": "Пакет"})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["rejected"]) == (2, 2)
+    results = body["results"]
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    statuses = [result["status"] for result in results]
+    assert statuses == ["created", "rejected", "created", "rejected"]
+    assert results[1]["event_id"] is None
+    assert results[1]["errors"][0].startswith("Аудитория занята")
+    assert results[3]["errors"]
+
+    created = [results[0]["event_id"], results[2]["event_id"]]
+    assert sorted(event.id for event in db.query(Event)) == sorted(created)
+    assert sorted(entry.event_id for entry in db.query(TimetableEntry)) == sorted(created)
+    assert {row.event_id for row in db.query(EventOccupancy)} == set(created)
+    logs = db.query(ChangeLog).all()
+    assert sorted(log.entity_id for log in logs) == sorted(created)
+    assert {log.reason for log in logs} == {"Пакет"}
+
+
+def test_bulk_create_atomic(client, db):
+    """С atomic одно отклоненное событие отменяет весь пакет."""
+    events = _bulk_fixture(db)
+
+    response = client.post("/api/events/bulk", json={"events": events, "atomic": True})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["rejected"]) == (0, 1)
+    assert [result["status"] for result in body["results"]] == ["skipped", "rejected", "skipped"]
+    assert all(result["event_id"] is None for result in body["results"])
+    assert db.query(Event).count() == 0
+    assert db.query(ChangeLog).count() == 0
+    assert db.query(EventOccupancy).count() == 0
+
+    # Без конфликтующего события пакет создается целиком
+    response = client.post(
+        "/api/events/bulk", json={"events": [events[0], events[2]], "atomic": True}
+    )
+    assert response.json()["created"] == 2
+    assert db.query(Event).count() == 2
+
+
+def test_bulk_create_single_commit(client, db, monkeypatch, count_statements):
+    """Пакет записывается одним коммитом: события и журнал — по одному INSERT."""
+    events = _bulk_fixture(db)
+    # Два непересекающихся события
+    batch = [events[0], events[2]]
+    commits = []
+    commit = db.commit
+
+    def counting_commit():
+        commits.append(1)
+        commit()
+
+    monkeypatch.setattr(db, "commit", counting_commit)
+    with count_statements() as statements:
+        response = client.post("/api/events/bulk", json={"events": batch})
+    assert response.json()["created"] == 2
+    assert len(commits) == 1
+
+    def inserts(table: str) -> int:
+        return sum(1 for statement in statements if statement.startswith(f"INSERT INTO {table} "))
+
+    assert inserts("events") == 1
+    assert inserts("event_lecturers") == 1
+    assert inserts("change_log") == 1
+    assert db.query(ChangeLog).count() == 2
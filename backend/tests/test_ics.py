@@ -1,5 +1,5 @@
 """Тесты генерации ICS."""
-import pytest
+import uuid
 from datetime import date, time
 from app.models import (
     Building,
@@ -11,8 +11,17 @@ from app.models import (
     TimeSlot,
     Event,
 )
+from icalendar import Calendar
 from app.models.event import EventLecturer, EventGroup
-from app.services.ics import ICSService
+from app.services.cache import cache_service
+from app.services.cache_tags import CacheTagService
+from app.services.calendar_feed import CalendarFeedService
+from app.services.change_log import ChangeLogService
+from app.services.event_query import EventQueryService
+from app.services.event_records import EventRecord
+from app.services.ics import ICSService, ICSWriter
+from app.services.timetable_entries import TimetableEntryService
+from benchmarks.ics import icalendar_calendar
 
 
 def test_ics_generation(db):
@@ -61,6 +70,7 @@ def test_ics_generation(db):
     db.flush()
     db.add(EventLecturer(event_id=event.id, lecturer_id=lecturer.id))
     db.add(EventGroup(event_id=event.id, group_id=group.id))
+    TimetableEntryService.sync(db, [event.id])
     db.commit()
 
     # Генерируем ICS
@@ -72,3 +82,207 @@ def test_ics_generation(db):
     assert "Тест" in ics_content
     assert "Тестов Т.Т." in ics_content
 
+
+def test_ics_writer_folding_and_escaping():
+    """Длинные строки сворачиваются по 75 октетов, спецсимволы TEXT экранируются."""
+    assert ICSWriter.escape_text("a;b,c\\d\ne") == r"a\;b\,c\\d\ne"
+
+    line = "DESCRIPTION:" + "Примечание, очень длинное; " * 10
+    folded = ICSWriter.fold(line)
+    physical = folded.split("\r\n")[:-1]
+    assert all(len(part.encode("utf-8")) <= 75 for part in physical)
+    assert all(part.startswith(" ") for part in physical[1:])
+    assert "".join(part[1:] if i else part for i, part in enumerate(physical)) == line
+
+
+def test_ics_writer_matches_icalendar(db):
+    """Потоковый ICS разбирается icalendar в те же события, что и прежняя генерация."""
+    building = Building(name="Корпус", code="K", address="наб. Северной Двины, 17")
+    db.add(building)
+    db.flush()
+    room = Room(building_id=building.id, number="1220", capacity=30, type="lecture")
+    discipline = Discipline(name="Математический анализ; часть 1, " * 4, short_name="МА")
+    work_kind = WorkKind(name="Лекция", color_hex="#28a745")
+    time_slot = TimeSlot(
+        date=date(2025, 11, 17), pair_number=1, time_start=time(8, 30), time_end=time(10, 0)
+    )
+    db.add_all([room, discipline, work_kind, time_slot])
+    db.flush()
+    event = Event(
+        discipline_id=discipline.id,
+        work_kind_id=work_kind.id,
+        room_id=room.id,
+        time_slot_id=time_slot.id,
+        status="scheduled",
+        note="Строка 1\nСтрока 2 \\ конец",
+    )
+    db.add(event)
+    db.commit()
+
+    events = EventQueryService.timetable_query(db).all()
+    records = [EventRecord.from_event(event) for event in events]
+    streamed = Calendar.from_ical(ICSService.generate_ics_for_events(records))
+    legacy = Calendar.from_ical(icalendar_calendar(records))
+
+    [streamed_event] = streamed.walk("VEVENT")
+    [legacy_event] = legacy.walk("VEVENT")
+    for prop in ("UID", "SUMMARY", "DESCRIPTION", "LOCATION"):
+        assert str(streamed_event[prop]) == str(legacy_event[prop])
+    for prop in ("DTSTART", "DTEND"):
+        assert streamed_event.decoded(prop) == legacy_event.decoded(prop)
+
+
+def _create_group_events(db, code, count):
+    """Группа с count событиями в один день; note событий уникальны для запуска."""
+    run = uuid.uuid4().hex
+    building = Building(name="Корпус", code="K", address="Тест")
+    db.add(building)
+    db.flush()
+    room = Room(building_id=building.id, number="101", capacity=30, type="lecture")
+    group = Group(code=code, name=code)
+    discipline = Discipline(name="Тест", short_name="Т")
+    work_kind = WorkKind(name="Лекция", color_hex="#28a745")
+    db.add_all([room, group, discipline, work_kind])
+    db.flush()
+    events = []
+    for pair in range(1, count + 1):
+        time_slot = TimeSlot(
+            date=date(2025, 11, 17), pair_number=pair, time_start=time(7 + pair * 2, 0),
+            time_end=time(8 + pair * 2, 30),
+        )
+        db.add(time_slot)
+        db.flush()
+        event = Event(
+            discipline_id=discipline.id, work_kind_id=work_kind.id, room_id=room.id,
+            time_slot_id=time_slot.id, status="scheduled", note=f"{run}-{pair}",
+        )
+        db.add(event)
+        db.flush()
+        db.add(EventGroup(event_id=event.id, group_id=group.id))
+        events.append(event)
+    TimetableEntryService.sync(db, [event.id for event in events])
+    db.commit()
+    return run, group, events
+
+
+def test_ics_fragments_rerender_only_changed_events(db, monkeypatch):
+    """После изменения события заново отрисовывается только его VEVENT."""
+    run, group, events = _create_group_events(db, "FRAG", 3)
+
+    rendered = []
+    render_vevent = ICSWriter.render_vevent
+    monkeypatch.setattr(
+        ICSWriter,
+        "render_vevent",
+        staticmethod(
+            lambda fields, dtstamp: rendered.append(fields[0]) or render_vevent(fields, dtstamp)
+        ),
+    )
+
+    first = ICSService.generate_ics_for_group(db, group.id)
+    assert sorted(rendered) == sorted(event.id for event in events)
+
+    rendered.clear()
+    assert ICSService.generate_ics_for_group(db, group.id) == first
+    assert rendered == []
+
+    events[1].note = f"{run}-changed"
+    TimetableEntryService.sync(db, [events[1].id])
+    db.commit()
+    changed = ICSService.generate_ics_for_group(db, group.id)
+    assert rendered == [events[1].id]
+    assert f"{run}-changed" in changed.replace("\r\n ", "")
+
+
+def test_ics_conditional_get_and_sequence(client, db):
+    """Лента отдает 304 по ETag и Last-Modified; изменение события повышает SEQUENCE."""
+    run, group, events = _create_group_events(db, "COND", 2)
+    ChangeLogService.log_event_change(db, events[0].id, None, "Создание", None, {"group_ids": []})
+    params = {"group_id": group.id}
+
+    response = client.get("/api/calendar/ics", params=params)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+    assert "SEQUENCE:0" in response.text
+    assert "LAST-MODIFIED:" in response.text
+
+    response = client.get("/api/calendar/ics", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    response = client.get(
+        "/api/calendar/ics", params=params, headers={"If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 304
+
+    events[0].note = f"{run}-changed"
+    TimetableEntryService.sync(db, [events[0].id])
+    db.commit()
+    ChangeLogService.log_event_change(db, events[0].id, None, "Правка", None, None)
+
+    response = client.get("/api/calendar/ics", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    vevent = next(
+        block for block in response.text.replace("\r\n ", "").split("BEGIN:VEVENT")
+        if f"{run}-changed" in block
+    )
+    assert "SEQUENCE:1" in vevent
+
+
+def test_feed_version_follows_events_that_left_feed(db):
+    """Last-Modified ленты учитывает событие, которое из нее ушло (по diff_before)."""
+    run, group, events = _create_group_events(db, "LEFT", 2)
+    etag, _ = ICSService.feed_version(db, group_id=group.id)
+
+    old_state = ChangeLogService.get_event_state(db, events[0].id)
+    db.query(EventGroup).filter(EventGroup.event_id == events[0].id).delete()
+    TimetableEntryService.sync(db, [events[0].id])
+    db.commit()
+    change = ChangeLogService.log_event_change(
+        db, events[0].id, None, "Перенос", old_state, {"group_ids": []}
+    )
+
+    new_etag, last_modified = ICSService.feed_version(db, group_id=group.id)
+    assert new_etag != etag
+    assert last_modified == change.change_at
+    assert ICSService.generate_ics_for_group(db, group.id).count("BEGIN:VEVENT") == 1
+
+
+def test_subscription_feed_served_from_snapshot(client, db, count_statements):
+    """Лента по токену отдается из снимка без запросов к БД и пересобирается после изменений."""
+    run, group, events = _create_group_events(db, "FEED", 2)
+    feed = ("group", group.id)
+    cache_service.delete(CalendarFeedService.snapshot_key(feed))
+
+    response = client.get(
+        "/api/calendar/subscribe", params={"filter_kind": "group", "filter_id": group.id}
+    )
+    ics_url = response.json()["ics_url"]
+    assert ics_url.endswith(f"/api/calendar/feed/{response.json()['token']}.ics")
+    path = ics_url[ics_url.index("/api/"):]
+
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.text.count("BEGIN:VEVENT") == 2
+    etag = response.headers["etag"]
+
+    with count_statements() as statements:
+        assert client.get(path).content == response.content
+        assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+    assert statements == []
+
+    old_state = ChangeLogService.get_event_state(db, events[0].id)
+    events[0].note = f"{run}-changed"
+    TimetableEntryService.sync(db, [events[0].id])
+    db.commit()
+    ChangeLogService.log_event_change(db, events[0].id, None, "Правка", old_state, None)
+    CacheTagService.invalidate_event_states(db, [old_state], [events[0].id])
+    assert CalendarFeedService.refresh_dirty(db) >= 1
+    cache_service.local.clear()
+
+    response = client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert f"{run}-changed" in response.text.replace("\r\n ", "")
+    assert client.get("/api/calendar/feed/unknown.ics").status_code == 404
@@ -1,7 +1,15 @@
 """Тесты парсера HTML."""
+import io
+import os
+import time
 import pytest
-from app.services.parser import ParserService
-from app.models import Building, Room, Discipline, WorkKind, Lecturer, Group
+from datetime import datetime, timedelta, timezone
+from app.services.parser import ParseResult, ParserService, split_row_ranges
+from sqlalchemy.orm import joinedload
+from app.models import Building, Room, Discipline, WorkKind, Lecturer, Group, Event, ChangeLog
+from app.models import ImportJobStatus
+from app.core.config import settings
+from app.services.import_jobs import INTERRUPTED_ERROR, ImportJobService
 
 
 def test_parser_basic(db):
@@ -37,3 +45,359 @@ def test_parser_basic(db):
     assert result.events_created >= 0  # Может быть 0 если парсер не распознал формат
     # В реальности нужно тестировать с правильным форматом HTML
 
+
+def test_parser_bulk_import(db, count_statements):
+    """Сущности создаются один раз на файл, число запросов не зависит от числа строк."""
+    row = "<tr>" + "<td>{}</td>" * 3 + "<td>Лекция</td>" + "<td>{}</td>" * 3 + "</tr>"
+    rows = [
+        row.format("17.11.2025", 1, "Информатика", "Минеева Т.А.", "521428", "301"),
+        row.format("17.11.2025", 2, "Информатика", "Минеева Т.А.", "521428-1", "305-309"),
+        row.format("18.11.2025", 1, "Физика", "Петров П.П.", "521429", "301"),
+        row.format("31.11.2025", 1, "Физика", "Петров П.П.", "521429", "301"),
+        row.format("18.11.2025", 9, "Физика", "Петров П.П.", "521429", "301"),
+    ]
+    html_content = "<table>" + "".join(rows) + "</table>"
+
+    with count_statements() as statements:
+        result = ParserService.parse_html(db, html_content)
+    db.commit()
+
+    assert result.events_created == 3
+    assert [error["type"] for error in result.errors] == ["date_parse", "invalid_pair"]
+    assert [warning["type"] for warning in result.warnings] == ["room_range"]
+    assert result.entities_created == {
+        "buildings": 1,
+        "rooms": 2,
+        "lecturers": 2,
+        "groups": 2,
+        "subgroups": 1,
+        "streams": 0,
+        "disciplines": 2,
+        "work_kinds": 1,
+    }
+    assert set(result.timings) == {"parse", "preload", "entities", "events"}
+    # + занятость ресурсов (три запроса на пакет) и модель чтения расписания (два)
+    assert len(statements) <= 23
+    assert db.query(Group).filter(Group.code == "521428").count() == 1
+    assert {state["group_ids"][0] for state in result.event_states} == {
+        group.id for group in db.query(Group)
+    }
+
+    # Повторный импорт находит все сущности в словарях
+    result = ParserService.parse_html(db, html_content)
+    db.commit()
+    assert result.events_created == 3
+    assert not any(result.entities_created.values())
+    assert db.query(Lecturer).count() == 2
+
+
+def test_parser_streaming_chunks():
+    """Разбор частями дает те же строки, что и целиком, включая разрезанные символы."""
+    html_content = (
+        "<p>Расписание</p><table><tr><th>Дата</th><th>Пара</th></tr>"
+        + "".join(
+            f"<tr><td>1{day}.11.2025</td><td> 2 </td><td>Инфор<b>матика</b></td>"
+            f"<td>Лекция</td><td>Минеева Т.А.</td><td>521428</td><td>301-302</td></tr>"
+            for day in range(3)
+        )
+        + "</table><tr><td>вне таблицы</td></tr>"
+    )
+    data = html_content.encode("utf-8")
+    result = ParseResult()
+    rows = list(ParserService.iter_rows((data[i:i + 7] for i in range(0, len(data), 7)), result))
+
+    assert rows == ParserService.parse_rows(html_content, ParseResult())
+    assert len(rows) == 3
+    assert rows[0].discipline == "Информатика"
+    assert rows[0].pair_number == 2
+    assert rows[0].room == "301"
+    assert len(result.warnings) == 3
+
+
+def test_parser_differential_import(db):
+    """Повторный импорт пишет только изменения: вставки, обновления и отмены."""
+    row = "<tr><td>{}.11.2025</td><td>{}</td><td>Информатика</td><td>Лекция</td>" \
+          "<td>{}</td><td>521428</td><td>{}</td></tr>"
+    rows = {
+        "a": (17, 1, "Минеева Т.А.", "301"),
+        "b": (18, 2, "Минеева Т.А.", "301"),
+        "c": (19, 3, "Минеева Т.А.", "301"),
+    }
+
+    def html(*values):
+        return "<table>" + "".join(row.format(*value) for value in values) + "</table>"
+
+    first = ParserService.parse_html(db, html(*rows.values()), differential=True)
+    db.commit()
+    assert first.events_created == 3
+
+    again = ParserService.parse_html(db, html(*rows.values()), differential=True)
+    db.commit()
+    assert (again.events_created, again.events_updated, again.events_cancelled) == (0, 0, 0)
+    assert again.events_unchanged == 3
+    assert db.query(Event).count() == 3
+
+    # Аудитория и преподаватель "a" изменились, "b" убрана (в ее день у группы другая пара),
+    # "d" и "e" новые
+    changed = ParserService.parse_html(
+        db,
+        html(
+            (17, 1, "Иванов И.И.", "305"),
+            (18, 5, "Минеева Т.А.", "301"),
+            rows["c"],
+            (20, 4, "Минеева Т.А.", "301"),
+        ),
+        differential=True,
+    )
+    db.commit()
+    assert changed.events_created == 2
+    assert changed.events_updated == 1
+    assert changed.events_cancelled == 1
+    assert changed.events_unchanged == 1
+    assert db.query(Event).count() == 5
+
+    events = {
+        event.time_slot.pair_number: event
+        for event in db.query(Event).options(joinedload(Event.time_slot))
+    }
+    assert events[1].room.number == "305"
+    assert [link.lecturer.fio for link in events[1].lecturers] == ["Иванов И.И."]
+    assert events[2].status == "cancelled"
+    assert events[3].status == "scheduled"
+
+    logs = db.query(ChangeLog).filter(ChangeLog.source == "import").all()
+    # 3 + 2 созданных, 1 измененное, 1 отмененное
+    assert len(logs) == 7
+    update_log = next(log for log in logs if log.entity_id == events[1].id and log.diff_before)
+    assert update_log.diff_after["room_id"] == events[1].room_id
+    assert set(changed.changed_event_ids) == {events[1].id, events[2].id}
+
+
+def test_parser_differential_import_other_groups(db):
+    """Файл одних групп не отменяет события других групп тех же дат и дней вне файла."""
+    row = "<tr><td>{}.11.2025</td><td>{}</td><td>Информатика</td><td>Лекция</td>" \
+          "<td>Минеева Т.А.</td><td>{}</td><td>301</td></tr>"
+
+    def html(*values):
+        return "<table>" + "".join(row.format(*value) for value in values) + "</table>"
+
+    first = ParserService.parse_html(
+        db, html((17, 1, "521428"), (18, 1, "521428")), differential=True
+    )
+    db.commit()
+    assert first.events_created == 2
+
+    # Файл другой группы на ту же дату
+    other = ParserService.parse_html(db, html((17, 2, "521429")), differential=True)
+    db.commit()
+    assert (other.events_created, other.events_cancelled) == (1, 0)
+
+    # Повторный файл первой группы только за 17.11: событие 18.11 вне файла и остается
+    again = ParserService.parse_html(db, html((17, 1, "521428")), differential=True)
+    db.commit()
+    assert (again.events_unchanged, again.events_created, again.events_cancelled) == (1, 0, 0)
+    assert db.query(Event).filter(Event.status == "cancelled").count() == 0
+    assert db.query(Event).count() == 3
+
+
+def test_parser_reuses_entities_of_concurrent_import(db):
+    """Группа, вид работ и корпус, созданные параллельным импортом, не ломают импорт."""
+    from app.services.parser import DEFAULT_BUILDING, ImportEngine
+    from tests.conftest import TestingSessionLocal
+
+    html = (
+        "<table>"
+        "<tr><td>17.11.2025</td><td>1</td><td>Информатика</td><td>Лекция</td>"
+        "<td>Петров П.П.</td><td>521428</td><td></td></tr>"
+        "<tr><td>17.11.2025</td><td>2</td><td>Информатика</td><td>Семинар</td>"
+        "<td>Петров П.П.</td><td>521429</td><td>301</td></tr>"
+        "</table>"
+    )
+
+    def concurrent_import(result):
+        # Другой импорт создает те же сущности после загрузки справочников
+        if result.rows_processed != 1:
+            return
+        with TestingSessionLocal() as other:
+            other.add_all([
+                Group(code="521429", name="521429"),
+                WorkKind(name="Семинар", color_hex="#ffc107"),
+                Building(**DEFAULT_BUILDING),
+            ])
+            other.commit()
+
+    result = ParseResult()
+    engine = ImportEngine(db, result, batch_size=1, on_batch=concurrent_import)
+    engine.run(ParserService.iter_rows([html.encode("utf-8")], result))
+    db.commit()
+    # Строка без аудитории создает только справочники, не событие
+    assert result.events_created == 1
+    assert db.query(Group).count() == 2
+    assert db.query(WorkKind).count() == 2
+    assert db.query(Building).count() == 1
+    event = db.query(Event).one()
+    assert event.work_kind_id == db.query(WorkKind).filter_by(name="Семинар").one().id
+
+
+def test_parser_reports_occupancy_overlaps(db):
+    """Пересечение с уже существующим событием попадает в предупреждения, поток — нет."""
+    row = "<tr><td>17.11.2025</td><td>{}</td><td>Информатика</td><td>Лекция</td>" \
+          "<td>{}</td><td>{}</td><td>{}</td></tr>"
+
+    def html(*values):
+        return "<table>" + "".join(row.format(*value) for value in values) + "</table>"
+
+    ParserService.parse_html(db, html((1, "Минеева Т.А.", "521428", "301")))
+    db.commit()
+    existing = db.query(Event).one()
+
+    # Аудитория 301 в 1 паре занята; 2 пара — поток двух групп в одной аудитории
+    result = ParserService.parse_html(
+        db,
+        html(
+            (1, "Петров П.П.", "521429", "301"),
+            (2, "Петров П.П.", "521429", "305"),
+            (2, "Петров П.П.", "521430", "305"),
+        ),
+    )
+    db.commit()
+    assert result.events_created == 3
+    overlaps = [w for w in result.warnings if w["type"] == "occupancy_overlap"]
+    assert len(overlaps) == 1
+    assert overlaps[0]["conflicting_event_id"] == existing.id
+    assert overlaps[0]["resources"] == ["room"]
+
+
+def test_import_stream_events_stay_editable(client, db):
+    """События групп потока после импорта редактируются без ложного конфликта."""
+    html = "<table>" + "".join(
+        f"<tr><td>17.11.2025</td><td>1</td><td>Информатика</td><td>Лекция</td>"
+        f"<td>Петров П.П.</td><td>{group}</td><td>301</td></tr>"
+        for group in ("521428", "521429")
+    ) + "</table>"
+    ParserService.parse_html(db, html)
+    db.commit()
+    first, second = db.query(Event).order_by(Event.id).all()
+    lecturer_id = db.query(Lecturer).one().id
+
+    # Аудитория и преподаватель потока записаны за первым событием
+    for event in (first, second):
+        response = client.put(f"/api/events/{event.id}", json={"note": "Перенос"})
+        assert response.status_code == 200
+    # Пересчет занятости в строгом режиме: общие ресурсы слота — не конфликт
+    response = client.put(f"/api/events/{second.id}", json={"lecturer_ids": [lecturer_id]})
+    assert response.status_code == 200
+    db.expire_all()
+    assert db.get(Event, second.id).note == "Перенос"
+
+
+def test_parser_parallel_ranges(tmp_path):
+    """Разбор по диапазонам в пуле процессов дает те же строки и в том же порядке."""
+    row = "<tr><td>{day}.11.2025</td><td>{pair}</td><td>Информатика</td><td>Лекция</td>" \
+          "<td>Минеева Т.А.</td><td>521428</td><td>301</td></TR >"
+    tables = [
+        "<table>" + "".join(row.format(day=10 + t, pair=pair) for pair in (1, 2, 3, 9)) + "</table>"
+        for t in range(4)
+    ]
+    html_content = "<html><body><p>Расписание</p>" + "\n".join(tables) + "</body></html>"
+    path = tmp_path / "timetable.html"
+    path.write_bytes(html_content.encode("utf-8"))
+
+    ranges = split_row_ranges(str(path), 150)
+    assert len(ranges) > 4
+    data = path.read_bytes()
+    assert all(data[start:start + 3] == b"<tr" for start, _ in ranges[1:])
+
+    result = ParseResult()
+    offsets = []
+    rows = list(
+        ParserService.iter_rows_parallel(str(path), result, 2, offsets.append, range_bytes=150)
+    )
+    expected = ParseResult()
+    assert rows == ParserService.parse_rows(html_content, expected)
+    assert len(rows) == 12
+    assert result.errors == expected.errors
+    assert len(result.errors) == 4
+    assert offsets == [end for _, end in ranges]
+
+
+def test_import_job(client):
+    """Загрузка возвращает задачу, импорт выполняется в фоне с отчетом о ходе."""
+    row = "<tr><td>17.11.2025</td><td>{}</td><td>Информатика</td><td>Лекция</td>" \
+          "<td>Минеева Т.А.</td><td>521428</td><td>301</td></tr>"
+    html_content = "<table>" + "".join(row.format(pair) for pair in (1, 2, 9)) + "</table>"
+
+    response = client.post(
+        "/api/import/html", files={"file": ("timetable.html", html_content.encode("utf-8"))}
+    )
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] in ("pending", "running", "completed")
+    assert job["differential"] is False
+    assert job["bytes_total"] == len(html_content.encode("utf-8"))
+
+    deadline = time.monotonic() + 10
+    while job["status"] in ("pending", "running") and time.monotonic() < deadline:
+        time.sleep(0.05)
+        job = client.get(f"/api/import/jobs/{job['id']}").json()
+
+    assert job["status"] == "completed"
+    assert job["rows_processed"] == 2
+    assert job["events_created"] == 2
+    assert job["errors_count"] == 1
+    assert job["errors"][0]["type"] == "invalid_pair"
+    assert job["bytes_processed"] == job["bytes_total"]
+    assert job["eta_seconds"] == 0
+    assert job["rows_per_second"] > 0
+    assert client.get("/api/import/status").json()["id"] == job["id"]
+    assert client.get("/api/import/jobs/0").status_code == 404
+
+
+def test_import_jobs_interrupted_by_restart(db):
+    """Задачи без сигнала владельца отмечаются failed, файлы удаляются; задачи живых — нет."""
+    jobs = [
+        ImportJobService.create(db, "timetable.html", io.BytesIO(b"<table></table>"))
+        for _ in range(5)
+    ]
+    (
+        (pending, pending_path),
+        (running, running_path),
+        (completed, completed_path),
+        (alive, alive_path),
+        (own, own_path),
+    ) = jobs
+    expired = datetime.now(timezone.utc) - timedelta(
+        seconds=settings.IMPORT_HEARTBEAT_TIMEOUT + 60
+    )
+    # Задачи остановленного процесса, его последний сигнал — давно
+    for job in (pending, running, completed):
+        job.owner = "stopped:1:00000000"
+        job.heartbeat_at = expired
+    running.status = ImportJobStatus.RUNNING
+    completed.status = ImportJobStatus.COMPLETED
+    # Задача другой живой реплики: сигнал свежий
+    alive.owner = "replica:1:00000000"
+    alive.status = ImportJobStatus.RUNNING
+    # Задача этого процесса, которую его пул еще не начал
+    own.heartbeat_at = expired
+    db.commit()
+    os.remove(running_path)  # файл мог быть уже удален
+
+    assert ImportJobService.heartbeat(db) == 1
+    assert ImportJobService.fail_interrupted(db) == 2
+    for job in (pending, running):
+        db.refresh(job)
+        assert job.status == ImportJobStatus.FAILED
+        assert job.error == INTERRUPTED_ERROR
+        assert job.finished_at is not None
+        assert ImportJobService.describe(job).eta_seconds is None
+    assert not os.path.exists(pending_path)
+    for job, status, path in (
+        (completed, ImportJobStatus.COMPLETED, completed_path),
+        (alive, ImportJobStatus.RUNNING, alive_path),
+        (own, ImportJobStatus.PENDING, own_path),
+    ):
+        db.refresh(job)
+        assert job.status == status
+        assert os.path.exists(path)
+        os.remove(path)
@@ -179,3 +179,211 @@ def test_capacity_check(db):
     error2 = ValidationService.check_capacity(db, room.id, [group1.id], [])
     # В MVP может быть предупреждение, но не ошибка для одной группы
 
+
+def test_validate_event_reports_all_conflicts_in_bounded_queries(db, count_statements):
+    """Все конфликты находятся за фиксированное число запросов."""
+    building = Building(name="Тест", code="T", address="Тест")
+    db.add(building)
+    db.flush()
+
+    room = Room(building_id=building.id, number="101", capacity=30, type="lecture")
+    lecturer = Lecturer(fio="Тестов Т.Т.")
+    group = Group(code="TEST", name="Тест")
+    discipline = Discipline(name="Тест", short_name="Т")
+    work_kind = WorkKind(name="Лекция", color_hex="#28a745")
+    db.add_all([room, lecturer, group, discipline, work_kind])
+    db.flush()
+
+    slots = [
+        TimeSlot(
+            date=date(2025, 11, 17),
+            pair_number=pair,
+            time_start=start,
+            time_end=end,
+            timezone="Europe/Moscow",
+        )
+        for pair, start, end in (
+            (1, time(8, 30), time(10, 0)),
+            (2, time(9, 0), time(10, 30)),
+            (3, time(9, 30), time(11, 0)),
+        )
+    ]
+    db.add_all(slots)
+    db.flush()
+
+    # Два события, пересекающиеся с третьим слотом по аудитории, преподавателю и группе
+    for slot in slots[:2]:
+        event = Event(
+            discipline_id=discipline.id,
+            work_kind_id=work_kind.id,
+            room_id=room.id,
+            time_slot_id=slot.id,
+            status="scheduled",
+        )
+        db.add(event)
+        db.flush()
+        db.add(EventLecturer(event_id=event.id, lecturer_id=lecturer.id))
+        db.add(EventGroup(event_id=event.id, group_id=group.id))
+    db.commit()
+    ids = dict(room=room.id, lecturer=lecturer.id, group=group.id, work_kind=work_kind.id)
+    slot_id = slots[2].id
+    db.expunge_all()
+
+    with count_statements() as statements:
+        errors = ValidationService.validate_event(
+            db=db,
+            room_id=ids["room"],
+            time_slot_id=slot_id,
+            lecturer_ids=[ids["lecturer"]],
+            group_ids=[ids["group"]],
+            subgroup_ids=[],
+            stream_ids=[],
+            work_kind_id=ids["work_kind"],
+        )
+
+    conflict_types = [e.conflict_type for e in errors]
+    assert conflict_types == [
+        "room_conflict",
+        "room_conflict",
+        "lecturer_conflict",
+        "lecturer_conflict",
+        "group_conflict",
+        "group_conflict",
+    ]
+    # Слот, события с связями, аудитория, вместимость, вид занятия
+    assert len(statements) <= 5
+
+
+def test_validate_events_checks_batch_against_itself(db):
+    """Событие пакета, конфликтующее с более ранним принятым, отклоняется."""
+    from app.schemas import EventCreate
+
+    building = Building(name="Тест", code="T", address="Тест")
+    db.add(building)
+    db.flush()
+
+    room = Room(building_id=building.id, number="101", capacity=30, type="lecture")
+    discipline = Discipline(name="Тест", short_name="Т")
+    work_kind = WorkKind(name="Лекция", color_hex="#28a745")
+    db.add_all([room, discipline, work_kind])
+    db.flush()
+
+    time_slot = TimeSlot(
+        date=date(2025, 11, 17),
+        pair_number=1,
+        time_start=time(8, 30),
+        time_end=time(10, 0),
+        timezone="Europe/Moscow",
+    )
+    db.add(time_slot)
+    db.commit()
+
+    payload = dict(
+        discipline_id=discipline.id,
+        work_kind_id=work_kind.id,
+        room_id=room.id,
+        time_slot_id=time_slot.id,
+    )
+    errors = ValidationService.validate_events(
+        db,
+        [
+            EventCreate(**payload),
+            EventCreate(**payload),
+            EventCreate(**{**payload, "time_slot_id": time_slot.id + 100}),
+        ],
+    )
+
+    assert errors[0] == []
+    assert [e.conflict_type for e in errors[1]] == ["room_conflict"]
+    assert [e.conflict_type for e in errors[2]] == ["not_found"]
+
+
+def _occupancy_fixture(db):
+    """Аудитория, преподаватель и два пересекающихся по времени слота."""
+    building = Building(name="Тест", code="T", address="Тест")
+    db.add(building)
+    db.flush()
+    room = Room(building_id=building.id, number="101", capacity=30, type="lecture")
+    lecturer = Lecturer(fio="Иванов И.И.")
+    discipline = Discipline(name="Тест", short_name="Т")
+    work_kind = WorkKind(name="Лекция", color_hex="#28a745")
+    slots = [
+        TimeSlot(
+            date=date(2025, 11, 17), pair_number=pair, time_start=start, time_end=end
+        )
+        for pair, start, end in ((1, time(8, 30), time(10, 0)), (2, time(9, 30), time(11, 0)))
+    ]
+    db.add_all([room, lecturer, discipline, work_kind, *slots])
+    db.commit()
+    return {
+        "discipline_id": discipline.id,
+        "work_kind_id": work_kind.id,
+        "room_id": room.id,
+        "lecturer_ids": [lecturer.id],
+    }, slots
+
+
+def test_occupancy_rejects_overlap_without_precheck(client, db, monkeypatch):
+    """Пересечение отклоняет ограничение БД, даже если проверка перед записью отключена."""
+    from app.core.config import settings
+    from app.models import EventOccupancy
+
+    payload, slots = _occupancy_fixture(db)
+    first = client.post("/api/events", json={**payload, "time_slot_id": slots[0].id})
+    assert first.status_code == 200
+    assert db.query(EventOccupancy).filter_by(event_id=first.json()["id"]).count() == 2
+
+    monkeypatch.setattr(settings, "SCHEDULE_CONFLICT_PRECHECK", False)
+    second = client.post("/api/events", json={**payload, "time_slot_id": slots[1].id})
+    assert second.status_code == 400
+    assert second.json()["detail"]["errors"][0].startswith("Аудитория занята")
+    assert db.query(Event).count() == 1
+
+    # Отмена освобождает ресурсы
+    assert client.delete(f"/api/events/{first.json()['id']}").status_code == 200
+    third = client.post("/api/events", json={**payload, "time_slot_id": slots[1].id})
+    assert third.status_code == 200
+
+
+def test_occupancy_serializes_concurrent_writes(db):
+    """Из двух одновременных транзакций, занимающих ресурс, фиксируется только первая."""
+    import threading
+    from app.services.occupancy import OccupancyService
+    from tests.conftest import TestingSessionLocal
+
+    payload, slots = _occupancy_fixture(db)
+    sessions = [TestingSessionLocal(), TestingSessionLocal()]
+    outcome = {}
+
+    def create(index: int) -> None:
+        session = sessions[index]
+        event = Event(
+            discipline_id=payload["discipline_id"],
+            work_kind_id=payload["work_kind_id"],
+            room_id=payload["room_id"],
+            time_slot_id=slots[index].id,
+            status="scheduled",
+        )
+        session.add(event)
+        session.flush()
+        try:
+            OccupancyService.sync(session, [event.id])
+            outcome[index] = "ok"
+        except ConflictError as e:
+            session.rollback()
+            outcome[index] = e.conflict_type
+
+    try:
+        create(0)
+        # Вторая транзакция ждет первую на ограничении исключения
+        second = threading.Thread(target=create, args=(1,))
+        second.start()
+        second.join(timeout=0.5)
+        assert second.is_alive()
+        sessions[0].commit()
+        second.join(timeout=10)
+        assert outcome == {0: "ok", 1: "room_conflict"}
+    finally:
+        for session in sessions:
+            session.rollback()
+            session.close()
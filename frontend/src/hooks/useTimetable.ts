@@ -1,8 +1,56 @@
 import { useQuery } from '@tanstack/react-query'
-import { api, EventDetail } from '../lib/api'
+import { api, CompactTimetable, EventDetail } from '../lib/api'
 import { useFiltersStore } from '../store/filters'
 import { logger } from '../utils/logger'
 
+const indexById = <T extends { id: number }>(items: T[]): Map<number, T> =>
+  new Map(items.map((item) => [item.id, item]))
+
+const pick = <T,>(index: Map<number, T>, ids: number[]): T[] =>
+  ids.map((id) => index.get(id)).filter((item): item is T => item !== undefined)
+
+// Восстановление списка EventDetail из компактного ответа
+export const decodeCompactTimetable = (data: CompactTimetable): EventDetail[] => {
+  const disciplines = indexById(data.disciplines)
+  const workKinds = indexById(data.work_kinds)
+  const rooms = indexById(data.rooms)
+  const buildings = indexById(data.buildings)
+  const timeSlots = indexById(data.time_slots)
+  const lecturers = indexById(data.lecturers)
+  const groups = indexById(data.groups)
+  const subgroups = indexById(data.subgroups)
+  const streams = indexById(data.streams)
+  const columns = data.events
+
+  return columns.id.map((id, i) => {
+    const room = rooms.get(columns.room_id[i])
+    const conflicts = columns.conflicting_event_ids[i]
+    return {
+      id,
+      discipline_id: columns.discipline_id[i],
+      work_kind_id: columns.work_kind_id[i],
+      room_id: columns.room_id[i],
+      time_slot_id: columns.time_slot_id[i],
+      status: columns.status[i],
+      note: columns.note[i] ?? undefined,
+      discipline: disciplines.get(columns.discipline_id[i]),
+      work_kind: workKinds.get(columns.work_kind_id[i]),
+      room: room && {
+        id: room.id,
+        number: room.number,
+        building: buildings.get(room.building_id),
+      },
+      time_slot: timeSlots.get(columns.time_slot_id[i]),
+      lecturers: pick(lecturers, columns.lecturer_ids[i]),
+      groups: pick(groups, columns.group_ids[i]),
+      subgroups: pick(subgroups, columns.subgroup_ids[i]),
+      streams: pick(streams, columns.stream_ids[i]),
+      has_conflict: conflicts.length > 0,
+      conflicting_event_ids: conflicts,
+    }
+  })
+}
+
 export const useTimetable = () => {
   const filters = useFiltersStore()
 
@@ -28,17 +76,19 @@ export const useTimetable = () => {
       if (filters.roomId) params.append('room_id', filters.roomId.toString())
       if (filters.buildingId) params.append('building_id', filters.buildingId.toString())
       if (filters.streamId) params.append('stream_id', filters.streamId.toString())
+      params.append('format', 'compact')
 
       const url = `/api/timetable?${params.toString()}`
       logger.log('[useTimetable] Fetching timetable:', url)
       
       try {
-        const response = await api.get<EventDetail[]>('/api/timetable', { params })
+        const response = await api.get<CompactTimetable>('/api/timetable', { params })
+        const events = decodeCompactTimetable(response.data)
         logger.log('[useTimetable] Response received:', {
-          count: response.data?.length || 0,
-          firstEvent: response.data?.[0] || null,
+          count: events.length,
+          firstEvent: events[0] || null,
         })
-        return response.data
+        return events
       } catch (error) {
         logger.error('[useTimetable] Error fetching timetable:', error)
         throw error
@@ -87,6 +87,39 @@ export interface EventDetail {
   conflicting_event_ids?: number[]
 }
 
+// Ответ /api/timetable?format=compact: сущности без повторов, события столбцами
+export interface CompactTimetable {
+  disciplines: Array<{ id: number; name: string }>
+  work_kinds: Array<{ id: number; name: string; color_hex: string }>
+  rooms: Array<{ id: number; number: string; building_id: number }>
+  buildings: Array<{ id: number; name: string; address: string }>
+  time_slots: Array<{
+    id: number
+    date: string
+    pair_number: number
+    time_start: string
+    time_end: string
+  }>
+  lecturers: Array<{ id: number; fio: string }>
+  groups: Array<{ id: number; code: string }>
+  subgroups: Array<{ id: number; code: string }>
+  streams: Array<{ id: number; name: string }>
+  events: {
+    id: number[]
+    discipline_id: number[]
+    work_kind_id: number[]
+    room_id: number[]
+    time_slot_id: number[]
+    status: string[]
+    note: Array<string | null>
+    lecturer_ids: number[][]
+    group_ids: number[][]
+    subgroup_ids: number[][]
+    stream_ids: number[][]
+    conflicting_event_ids: number[][]
+  }
+}
+
 export interface Building {
   id: number
   name: string
@@ -120,3 +153,23 @@ export interface WorkKind {
   color_hex: string
 }
 
+
+// Задача импорта (/api/import/html, /api/import/jobs/{id})
+export interface ImportJob {
+  id: number
+  filename: string
+  status: 'pending' | 'running' | 'completed' | 'failed'
+  differential: boolean
+  bytes_total: number
+  bytes_processed: number
+  rows_processed: number
+  events_created: number
+  events_updated: number
+  events_cancelled: number
+  events_unchanged: number
+  errors_count: number
+  warnings_count: number
+  error?: string | null
+  rows_per_second?: number | null
+  eta_seconds?: number | null
+}
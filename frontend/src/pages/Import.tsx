@@ -1,10 +1,30 @@
-import { useState } from 'react'
-import { api } from '../lib/api'
+import { useEffect, useState } from 'react'
+import { api, ImportJob } from '../lib/api'
+
+// Интервал опроса состояния задачи импорта, мс
+const POLL_INTERVAL = 1000
 
 export default function Import() {
   const [file, setFile] = useState<File | null>(null)
+  const [differential, setDifferential] = useState(true)
   const [uploading, setUploading] = useState(false)
-  const [result, setResult] = useState<any>(null)
+  const [job, setJob] = useState<ImportJob | null>(null)
+  const [error, setError] = useState<string | null>(null)
+
+  const running = job !== null && (job.status === 'pending' || job.status === 'running')
+
+  useEffect(() => {
+    if (!job || !running) return
+    const timer = setTimeout(async () => {
+      try {
+        const response = await api.get<ImportJob>(`/api/import/jobs/${job.id}`)
+        setJob(response.data)
+      } catch (e: any) {
+        setError(e.response?.data?.detail || 'Ошибка получения статуса импорта')
+      }
+    }, POLL_INTERVAL)
+    return () => clearTimeout(timer)
+  }, [job, running])
 
   const handleFileChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     if (e.target.files && e.target.files[0]) {
@@ -16,8 +36,11 @@ export default function Import() {
     if (!file) return
 
     setUploading(true)
+    setError(null)
+    setJob(null)
     const formData = new FormData()
     formData.append('file', file)
+    formData.append('differential', String(differential))
 
     try {
       const response = await api.post('/api/import/html', formData, {
@@ -25,9 +48,9 @@ export default function Import() {
           'Content-Type': 'multipart/form-data',
         },
       })
-      setResult(response.data)
-    } catch (error: any) {
-      setResult({ error: error.response?.data?.detail || 'Ошибка загрузки' })
+      setJob(response.data)
+    } catch (e: any) {
+      setError(e.response?.data?.detail || 'Ошибка загрузки')
     } finally {
       setUploading(false)
     }
@@ -48,24 +71,51 @@ export default function Import() {
             className="border rounded px-3 py-2"
           />
         </div>
+        <label className="flex items-center gap-2 mb-4 text-sm text-gray-700">
+          <input
+            type="checkbox"
+            checked={differential}
+            onChange={(e) => setDifferential(e.target.checked)}
+          />
+          Обновить только изменившиеся занятия
+        </label>
         <button
           onClick={handleUpload}
-          disabled={!file || uploading}
+          disabled={!file || uploading || running}
           className="bg-blue-600 text-white px-6 py-2 rounded hover:bg-blue-700 disabled:bg-gray-400"
         >
-          {uploading ? 'Загрузка...' : 'Загрузить'}
+          {uploading ? 'Загрузка...' : running ? 'Импорт...' : 'Загрузить'}
         </button>
 
-        {result && (
+        {error && <div className="mt-6 p-4 bg-gray-50 rounded text-red-600">{error}</div>}
+
+        {job && (
           <div className="mt-6 p-4 bg-gray-50 rounded">
-            {result.error ? (
-              <div className="text-red-600">{result.error}</div>
+            {job.status === 'failed' ? (
+              <div className="text-red-600">Ошибка импорта: {job.error}</div>
             ) : (
               <div>
-                <p className="font-semibold">Импорт завершен</p>
-                <p>Создано событий: {result.events_created}</p>
-                <p>Ошибок: {result.errors_count}</p>
-                <p>Предупреждений: {result.warnings_count}</p>
+                <p className="font-semibold">
+                  {job.status === 'completed' ? 'Импорт завершен' : 'Импорт выполняется'}
+                </p>
+                {running && job.bytes_total > 0 && (
+                  <p>
+                    Обработано: {Math.round((job.bytes_processed / job.bytes_total) * 100)}%
+                    {job.eta_seconds != null && `, осталось ~${Math.ceil(job.eta_seconds)} с`}
+                  </p>
+                )}
+                <p>Строк: {job.rows_processed}</p>
+                {job.rows_per_second != null && <p>Строк в секунду: {job.rows_per_second}</p>}
+                <p>Создано событий: {job.events_created}</p>
+                {job.differential && (
+                  <>
+                    <p>Изменено событий: {job.events_updated}</p>
+                    <p>Отменено событий: {job.events_cancelled}</p>
+                    <p>Без изменений: {job.events_unchanged}</p>
+                  </>
+                )}
+                <p>Ошибок: {job.errors_count}</p>
+                <p>Предупреждений: {job.warnings_count}</p>
               </div>
             )}
           </div>